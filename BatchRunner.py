@@ -0,0 +1,279 @@
+# файл: BatchRunner.py
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import math
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# константы пакетного расчета
+MAX_WORKERS = None   # количество процессов (None - по числу ядер)
+CHUNK_SIZE = None    # сценариев на одну задачу процесса (None - по 4 задачи на процесс)
+START_DATE = "2024-06-01"  # начало моделирования, если в сценарии не задано
+YEARS = 1            # длина горизонта, лет, если в сценарии не задан конец
+
+# Движки моделей, если в сценарии engine не задан
+ENGINES = {"gtes": "numpy", "grid": "segments", "heat": "segments"}
+
+# Столбцы результата, общие для всех сценариев (строковые и числовые)
+TEXT_COLUMNS = ("name", "model", "engine", "start", "end", "error")
+NUMBER_COLUMNS = ("ok", "seconds", "hours")
+
+
+def add_years(date, years):
+    "Дата через years лет; с 29 февраля в невисокосный год - на 28 февраля"
+    try:
+        return date.replace(year=date.year + years)
+    except ValueError:
+        return date.replace(year=date.year + years, day=28)
+
+
+def horizon(scenario):
+    "Начало и конец горизонта сценария: start и end (ISO) или years лет от start"
+    start = datetime.datetime.fromisoformat(scenario.get("start", START_DATE))
+    if "end" in scenario:
+        end = datetime.datetime.fromisoformat(scenario["end"])
+    else:
+        end = add_years(start, scenario.get("years", YEARS))
+    if end < start:
+        raise ValueError(f"Конец горизонта {end} раньше начала {start}")
+    return start, end
+
+
+def select_data(data, names=None, changes=None):
+    """
+    Исходные данные объектов (список словарей) для сценария: только объекты с именами
+    из names (None - все) и с измененными полями changes {имя: {поле: значение}}.
+    Сами словари данных не изменяются.
+    """
+    changes = changes or {}
+    return [dict(item, **changes.get(item["name"], {})) for item in data
+            if names is None or item["name"] in names]
+
+
+def check_names(scenario, *datasets):
+    "ValueError, если в consumers или consumer_changes есть имена, которых нет в данных"
+    known = {item["name"] for data in datasets for item in data}
+    unknown = ((set(scenario.get("consumers") or ()) | set(scenario.get("consumer_changes", {})))
+               - known)
+    if unknown:
+        raise ValueError(f"Неизвестные объекты: {', '.join(sorted(unknown))}")
+
+
+def run_gtes(scenario, start, end, engine):
+    import PowerPlantModel
+
+    specs = dict(PowerPlantModel.gtu_specs, **scenario.get("gtu_specs", {}))
+    load_factors = scenario.get("load_factors") or [
+        PowerPlantModel.load_factors[i % len(PowerPlantModel.load_factors)]
+        for i in range(specs['кол-во'])]
+    if len(load_factors) != specs['кол-во']:
+        raise ValueError(f"Загрузок {len(load_factors)}, а ГТУ {specs['кол-во']}")
+    model = PowerPlantModel.GTESModel(specs, load_factors, engine=engine)
+    cost = model.simulate(start, end)
+    return {
+        "gtes_cost": cost,
+        "energy_mwh": model.total_energy_generated,
+        "maintenance_cost": model.total_maintenance_cost,
+        "salary_cost": model.total_salary_cost,
+        "to_count": sum(gtu.to_counter for gtu in model.gtus),
+        "kr_count": sum(gtu.kr_counter for gtu in model.gtus),
+        "n_gtu": specs['кол-во'],
+        "gtu_power": specs['мощность'],
+        "to_period": specs['ТО_периодичность'],
+        "to_price": specs['ТО_стоимость'],
+        "kr_period": specs['КР_периодичность'],
+        "kr_price": specs['КР_стоимость'],
+    }
+
+
+def run_grid(scenario, start, end, engine):
+    import LineFromGrid
+
+    check_names(scenario, LineFromGrid.objects_data, LineFromGrid.well_clusters_data)
+    names = scenario.get("consumers")
+    changes = scenario.get("consumer_changes")
+    consumers = LineFromGrid.build_consumers(
+        select_data(LineFromGrid.objects_data, names, changes),
+        select_data(LineFromGrid.well_clusters_data, names, changes))
+    model = LineFromGrid.PowerGridModel(consumers, engine=engine)
+    model.simulate(start, end)
+    return {
+        "power_loss_kwh": model.total_power_loss_kwh,
+        "personnel_cost": model.total_personnel_cost,
+        "consumption_mwh": sum(consumer.total_power_consumption for consumer in consumers),
+        "n_consumers": len(consumers),
+    }
+
+
+def run_heat(scenario, start, end, engine):
+    import HeatSystemModel
+
+    check_names(scenario, HeatSystemModel.objects_data, HeatSystemModel.well_clusters_data)
+    names = scenario.get("consumers")
+    changes = scenario.get("consumer_changes")
+    objects, boiler_plants = HeatSystemModel.build_heat_objects(
+        select_data(HeatSystemModel.objects_data, names, changes),
+        select_data(HeatSystemModel.well_clusters_data, names, changes))
+    model = HeatSystemModel.HeatModel(
+        objects, boiler_plants, fuel_cost=scenario.get("fuel_cost", HeatSystemModel.fuel_cost),
+        engine=engine)
+    model.simulate(start, end)
+    return {
+        "fuel": model.total_fuel_consumption,
+        "heat_loss": model.total_heat_loss,
+        "heat_fuel_cost": model.total_cost,
+        "n_consumers": len(objects),
+    }
+
+
+# Модели сценариев: ключ "model" в манифесте -> функция расчета. Кроме общих столбцов,
+# каждая модель пишет свои величины под своими именами (gtes_cost - полная стоимость ГТЭС,
+# heat_fuel_cost - стоимость топлива котельных), чтобы в одном столбце не оказались
+# несравнимые величины разных моделей
+RUNNERS = {"gtes": run_gtes, "grid": run_grid, "heat": run_heat}
+
+
+def run_scenario(scenario):
+    """
+    Расчет одного сценария (в процессе пула). Вывод моделей в консоль отключается.
+    Ошибка сценария не прерывает пакет: она записывается в результат, ok = 0.
+    Возвращает словарь значений строки результата.
+    """
+    model = scenario.get("model", "")
+    row = {"name": scenario.get("name", ""), "model": model,
+           "engine": scenario.get("engine", ENGINES.get(model, "")), "start": "", "end": "", "error": "",
+           "ok": 0, "seconds": math.nan, "hours": math.nan}
+    started = time.perf_counter()
+    try:
+        if model not in RUNNERS:
+            raise ValueError(f"Неизвестная модель: {model}. Доступны: {', '.join(RUNNERS)}")
+        start, end = horizon(scenario)
+        row["start"], row["end"] = start.isoformat(), end.isoformat()
+        row["hours"] = (end - start) // datetime.timedelta(hours=1) + 1
+        with contextlib.redirect_stdout(io.StringIO()):
+            row.update(RUNNERS[model](scenario, start, end, row["engine"]))
+        row["ok"] = 1
+    except Exception as error:
+        row["error"] = "".join(traceback.format_exception_only(type(error), error)).strip()
+    row["seconds"] = time.perf_counter() - started
+    return row
+
+
+def load_manifest(path):
+    """
+    Манифест сценариев (JSON): {"defaults": {...}, "scenarios": [{...}, ...]}.
+    Поля сценария: name, model (gtes, grid или heat), engine, start, end или years;
+    для gtes - gtu_specs (изменения к PowerPlantModel.gtu_specs) и load_factors;
+    для grid и heat - consumers (имена объектов, по умолчанию все) и consumer_changes
+    {имя объекта: {поле: значение}}, для heat - fuel_cost. Значения из defaults
+    подставляются во все сценарии, где они не заданы. Сценарии без имени получают
+    номер. Возвращает список сценариев.
+    """
+    with open(path, encoding="utf-8") as file:
+        manifest = json.load(file)
+    if isinstance(manifest, list):
+        manifest = {"scenarios": manifest}
+    defaults = manifest.get("defaults", {})
+    scenarios = []
+    for i, scenario in enumerate(manifest.get("scenarios", [])):
+        scenario = dict(defaults, **scenario)
+        scenario.setdefault("name", f"{i:04d}")
+        scenarios.append(scenario)
+    return scenarios
+
+
+def run_batch(scenarios, max_workers=MAX_WORKERS, chunksize=CHUNK_SIZE, progress=None):
+    """
+    Расчет сценариев в пуле процессов. Результаты возвращаются в порядке сценариев,
+    progress(готово, всего) вызывается по мере завершения. max_workers=1 - расчет
+    в текущем процессе без пула.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1 or len(scenarios) < 2:
+        rows = []
+        for scenario in scenarios:
+            rows.append(run_scenario(scenario))
+            if progress is not None:
+                progress(len(rows), len(scenarios))
+        return rows
+
+    # Мелкие задачи по несколько сценариев: процессы не простаивают в конце пакета,
+    # даже если сценарии сильно отличаются по длительности
+    chunksize = chunksize or max(1, len(scenarios) // (4 * max_workers))
+    rows = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for row in executor.map(run_scenario, scenarios, chunksize=chunksize):
+            rows.append(row)
+            if progress is not None:
+                progress(len(rows), len(scenarios))
+    return rows
+
+
+def to_columns(rows):
+    """
+    Результаты по столбцам: строка на сценарий, столбец на величину. Текстовые
+    столбцы - массивы строк, числовые - float64 (NaN, если у модели такой величины нет).
+    """
+    names = list(TEXT_COLUMNS + NUMBER_COLUMNS)
+    for row in rows:
+        names += [key for key in row if key not in names]
+    columns = {}
+    for name in names:
+        if name in TEXT_COLUMNS:
+            columns[name] = np.array([row.get(name, "") for row in rows], dtype=str)
+        else:
+            columns[name] = np.array([row.get(name, math.nan) for row in rows], dtype=float)
+    return columns
+
+
+def save_results(path, rows):
+    "Запись результатов в сжатый .npz: массив на столбец"
+    np.savez_compressed(path, **to_columns(rows))
+
+
+def load_results(path):
+    "Столбцы результатов из .npz: {имя столбца: массив}"
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+def main(argv=None):
+    # Пакетный расчет: python -m BatchRunner scenarios.json [--output results.npz]
+    parser = argparse.ArgumentParser(description="Пакетный расчет сценариев моделей")
+    parser.add_argument("manifest", help="манифест сценариев JSON")
+    parser.add_argument("--output", default="results.npz", help="куда записать результаты .npz")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS,
+                        help="количество процессов (по умолчанию по числу ядер)")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE,
+                        help="сценариев на одну задачу процесса")
+    args = parser.parse_args(argv)
+
+    scenarios = load_manifest(args.manifest)
+    started = time.perf_counter()
+
+    def progress(done, total):
+        print(f"\rГотово {done} из {total}", end="", flush=True)
+
+    rows = run_batch(scenarios, args.workers, args.chunksize, progress)
+    print(f"\nРасчет {len(rows)} сценариев занял {time.perf_counter() - started:.2f} с")
+
+    save_results(args.output, rows)
+    print(f"Результаты записаны в {args.output}")
+
+    failed = [row for row in rows if not row["ok"]]
+    for row in failed:
+        print(f"Ошибка в сценарии {row['name']}: {row['error']}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,292 @@
+# файл: Benchmarks.py
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+
+# константы замеров
+SEED = 42                     # зерно генератора случайных чисел для ГА
+START_DATE = datetime.datetime(2024, 6, 1)  # начало моделирования
+HORIZONS_YEARS = (1, 5)       # длины горизонта моделирования, лет
+FLEET_SIZES = (9, 27)         # количество ГТУ в ГТЭС
+POPULATION_SIZES = (10, 10000)  # размеры популяции ГА
+CHECKED_INDIVIDUALS = 10      # сколько потомков ГА сверять с эталонным циклом
+REPEAT = 3                    # повторов замера, в результат идет лучшее время
+THRESHOLD = 0.25              # допустимое замедление относительно базового замера (доля)
+MIN_SLOWDOWN = 0.001          # замедление меньше этого (секунды) считается шумом
+RTOL = 1e-9                   # допустимое относительное отклонение от эталонного движка "loop"
+# Загрузки ГТУ с долгим простоем большинства машин: много смен резерва, выбор резервной
+# ГТУ зависит от точного часа ТО (по кругу на весь парк)
+RESERVE_LOAD_FACTORS = [0.05, 0, 0, 0.1, 0, 0, 0, 0.05, 0.05]
+
+
+def horizon(years):
+    "Конец горизонта моделирования длиной years лет от START_DATE"
+    return START_DATE.replace(year=START_DATE.year + years)
+
+
+def fleet_specs(n_gtu, base_load_factors=None):
+    """
+    gtu_specs из PowerPlantModel с другим количеством ГТУ и загрузки к ним по кругу
+    из base_load_factors (по умолчанию PowerPlantModel.load_factors)
+    """
+    import PowerPlantModel
+
+    specs = dict(PowerPlantModel.gtu_specs, **{'кол-во': n_gtu})
+    base_load_factors = base_load_factors or PowerPlantModel.load_factors
+    load_factors = [base_load_factors[i % len(base_load_factors)] for i in range(n_gtu)]
+    return specs, load_factors
+
+
+def measure(run, repeat=REPEAT):
+    """
+    Лучшее время из repeat вызовов run() в секундах и результат последнего вызова.
+    Вывод моделей в консоль на время замера отключается.
+    """
+    best = None
+    result = None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            result = run()
+            elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+# Сценарии. Каждый принимает параметры конфигурации и возвращает величины для сверки
+# движков между собой {имя: число}
+
+def run_gtes(engine, years, gtu, loads="default"):
+    from PowerPlantModel import GTESModel
+
+    specs, load_factors = fleet_specs(gtu, RESERVE_LOAD_FACTORS if loads == "reserve" else None)
+    model = GTESModel(specs, load_factors, engine=engine)
+    cost = model.simulate(START_DATE, horizon(years))
+    return {
+        "стоимость": cost,
+        "выработка": model.total_energy_generated,
+        "ТО/КР": model.total_maintenance_cost,
+    }
+
+
+def run_heat(engine, years):
+    from HeatSystemModel import HeatModel, build_heat_objects, fuel_cost
+
+    objects, boiler_plants = build_heat_objects()
+    model = HeatModel(objects, boiler_plants, fuel_cost=fuel_cost, engine=engine)
+    model.simulate(START_DATE, horizon(years))
+    return {
+        "топливо": model.total_fuel_consumption,
+        "теплопотери": model.total_heat_loss,
+        "стоимость": model.total_cost,
+    }
+
+
+def run_grid(engine, years):
+    from LineFromGrid import PowerGridModel, build_consumers
+
+    consumers = build_consumers()
+    model = PowerGridModel(consumers, engine=engine)
+    model.simulate(START_DATE, horizon(years))
+    return {
+        "потери": model.total_power_loss_kwh,
+        "ЗП": model.total_personnel_cost,
+        "потребление": sum(consumer.total_power_consumption for consumer in consumers),
+    }
+
+
+def run_energy_system(engine, years):
+    from EnergySystemModel import build_energy_system
+
+    model = build_energy_system(engine=engine)
+    model.simulate(START_DATE, horizon(years))
+    return {
+        "генерация": model.total_power_generated,
+        "потребление": model.total_power_consumed,
+        "топливо ГТЭС": model.total_fuel_consumption,
+        "топливо котельных": model.total_heat_fuel_consumption,
+        "ЗП": model.total_salary_cost,
+        "ТО/КР": model.total_maintenance_cost,
+    }
+
+
+def run_ga_generation(years, n_gtu, population_size, seed=SEED):
+    """
+    Одно поколение генетического алгоритма Optimization.GeneticOptimizer: оценка
+    начальной популяции, отбор, скрещивание, мутация и оценка потомков пакетным
+    populationFitness. Кэш расписаний ГТУ сбрасывается, поэтому каждый замер
+    начинается с пустого кэша.
+    Возвращает стоимости потомков и сами потомки (для сверки с эталонным циклом).
+    """
+    import functools
+
+    import Optimization
+
+    specs, _ = fleet_specs(n_gtu)
+    Optimization._fleetBatches.clear()
+    evaluate = functools.partial(Optimization.populationFitness, specs=specs,
+                                 start_date=START_DATE, end_date=horizon(years))
+    optimizer = Optimization.GeneticOptimizer(evaluate, n_genes=n_gtu,
+                                              population_size=population_size, seed=seed)
+    optimizer.start()
+    optimizer.step()
+    return optimizer.fitness.tolist(), optimizer.population.tolist()
+
+
+def deviation(value, reference):
+    "Относительное отклонение value от эталона reference"
+    if value == reference:
+        return 0.0
+    return abs(value - reference) / max(abs(reference), 1e-300)
+
+
+def check(name, values, reference, rtol=RTOL):
+    "Сверка величин values с эталонными reference, запись для отчета"
+    worst = max(deviation(values[key], reference[key]) for key in reference)
+    return {"name": name, "ok": worst <= rtol, "deviation": worst}
+
+
+def run_benchmarks(horizons=HORIZONS_YEARS, fleet_sizes=FLEET_SIZES,
+                   population_sizes=POPULATION_SIZES, repeat=REPEAT):
+    """
+    Замеры всех точек входа на всех конфигурациях. Для моделей с несколькими движками
+    каждый движок сверяется с эталонным "loop" на той же конфигурации.
+    Возвращает отчет {"meta": ..., "results": [...], "checks": [...]}.
+    """
+    from EnergySystemModel import EnergySystemModel
+    from HeatSystemModel import HeatModel
+    from LineFromGrid import PowerGridModel
+    from PowerPlantModel import GTESModel
+    from Optimization import simulateFitness
+
+    results = []
+    checks = []
+
+    def record(name, params, run):
+        seconds, values = measure(run, repeat)
+        results.append({"name": f"{name}[{format_params(params)}]", "params": params,
+                        "seconds": seconds})
+        print(f"{results[-1]['name']:<60} {seconds:10.4f} с")
+        return values
+
+    def compare_engines(name, engines, params, scenario):
+        reference = None
+        for engine in engines:
+            values = record(name, dict(params, engine=engine),
+                            lambda: scenario(engine, **params))
+            if reference is None:
+                reference = values
+            else:
+                checks.append(check(f"{name}[{format_params(dict(params, engine=engine))}]",
+                                    values, reference))
+
+    for years in horizons:
+        for n_gtu in fleet_sizes:
+            compare_engines("GTESModel.simulate", GTESModel.engines,
+                            {"years": years, "gtu": n_gtu}, run_gtes)
+            compare_engines("GTESModel.simulate", GTESModel.engines,
+                            {"years": years, "gtu": n_gtu, "loads": "reserve"}, run_gtes)
+
+        compare_engines("HeatModel.simulate", HeatModel.engines, {"years": years}, run_heat)
+        compare_engines("PowerGridModel.simulate", PowerGridModel.engines, {"years": years},
+                        run_grid)
+        compare_engines("EnergySystemModel.simulate", EnergySystemModel.engines,
+                        {"years": years}, run_energy_system)
+
+        for n_gtu in fleet_sizes:
+            for population_size in population_sizes:
+                params = {"years": years, "gtu": n_gtu, "population": population_size}
+                costs, offspring = record(
+                    "Optimization.generation", params,
+                    lambda: run_ga_generation(years, n_gtu, population_size))
+                # Эталон - отдельная модель с движком "loop" на первых потомков
+                specs, _ = fleet_specs(n_gtu)
+                reference = [simulateFitness(individual, specs, START_DATE, horizon(years),
+                                             engine="loop")[0]
+                             for individual in offspring[:CHECKED_INDIVIDUALS]]
+                checks.append(check(f"Optimization.generation[{format_params(params)}]",
+                                    dict(enumerate(costs)), dict(enumerate(reference))))
+
+    return {"meta": environment(repeat), "results": results, "checks": checks}
+
+
+def format_params(params):
+    return ",".join(f"{key}={value}" for key, value in params.items())
+
+
+def environment(repeat=REPEAT):
+    return {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "seed": SEED,
+        "repeat": repeat,
+    }
+
+
+def compare(report, baseline, threshold=THRESHOLD, min_slowdown=MIN_SLOWDOWN):
+    """
+    Сравнение с базовым отчетом: замеры, ставшие медленнее более чем на threshold
+    (доля от базового времени) и не меньше чем на min_slowdown секунд.
+    Замеры, которых нет в базовом отчете, не сравниваются.
+    Возвращает список (имя, базовое время, текущее время).
+    """
+    base = {result["name"]: result["seconds"] for result in baseline["results"]}
+    regressions = []
+    for result in report["results"]:
+        before = base.get(result["name"])
+        if before is None:
+            continue
+        slowdown = result["seconds"] - before
+        if slowdown > before * threshold and slowdown >= min_slowdown:
+            regressions.append((result["name"], before, result["seconds"]))
+    return regressions
+
+
+def main(argv=None):
+    # Запуск замеров: python -m Benchmarks [--output файл.json] [--baseline файл.json]
+    parser = argparse.ArgumentParser(description="Замеры производительности моделей")
+    parser.add_argument("--output", default="benchmarks.json", help="куда записать отчет JSON")
+    parser.add_argument("--baseline", help="базовый отчет JSON для сравнения")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="допустимое замедление, доля (по умолчанию %(default)s)")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="повторов каждого замера")
+    parser.add_argument("--quick", action="store_true",
+                        help="только первый горизонт, размер ГТЭС и размер популяции")
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        report = run_benchmarks(HORIZONS_YEARS[:1], FLEET_SIZES[:1], POPULATION_SIZES[:1],
+                                args.repeat)
+    else:
+        report = run_benchmarks(repeat=args.repeat)
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print(f"Отчет записан в {args.output}")
+
+    failed = [item for item in report["checks"] if not item["ok"]]
+    for item in failed:
+        print(f"Расхождение с эталоном: {item['name']}, отклонение {item['deviation']:.3g}")
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            regressions = compare(report, json.load(file), args.threshold)
+        for name, before, after in regressions:
+            print(f"Замедление: {name}: {before:.4f} с -> {after:.4f} с")
+
+    return 1 if failed or regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
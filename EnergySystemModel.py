@@ -2,20 +2,44 @@
 
 import datetime
 
+from SegmentEngine import month_starts, split_horizon
+
 class EnergySystemModel:
-    def __init__(self, consumers, network, power_plant):
+    # "loop" - расчет по шагам, "segments" - расчет целыми интервалами (в пределах месяца),
+    # на которых нагрузка потребителей постоянна
+    engines = ("loop", "segments")
+    # Фазы расчета для Profiling: (название, класс, метод). Фазы сети, ГТЭС и
+    # теплоснабжения добавляются из их моделей
+    profile_phases = (
+        ("шаг общей модели", "EnergySystemModel", "_step"),
+        ("сутки теплоснабжения", "EnergySystemModel", "_advance_heat"),
+    )
+
+    def __init__(self, consumers, network, power_plant, heat_model=None, engine="loop"):
         """
         consumers: список (или другой контейнер) объектов-потребителей,
-                   у которых есть метод calculate_power_demand(date_time) -> float (МВт).
-        network:   объект модели сети (NetworkGridModel), где есть метод calc_generation_needed.
-        power_plant: объект модели ГТЭС (GTESModel), где есть метод generate().
+                   у которых есть метод calculate_power_demand(date_time) -> float (кВт)
+                   и имя name.
+        network:   объект модели сети (PowerGridModel), где есть метод
+                   calc_generation_needed({имя: кВт}, время, hours) -> МВт.
+        power_plant: объект модели ГТЭС (GTESModel), где есть метод
+                   generate(МВт, время, hours) -> (выданные МВт, топливо м3).
+        heat_model: модель теплоснабжения (HeatModel) с методами begin/step, необязательна.
+                   Ее сутки считаются на той же оси времени, когда до них доходит расчет.
+        engine:    движок расчета, одно из значений engines.
         """
+        if engine not in self.engines:
+            raise ValueError(f"Неизвестный движок моделирования: {engine}. "
+                             f"Доступны: {', '.join(self.engines)}")
+        self.engine = engine
         self.consumers = consumers
         self.network = network
         self.power_plant = power_plant
+        self.heat_model = heat_model
 
         # Для накопления итоговых результатов:
         self.total_fuel_consumption = 0.0
+        self.total_heat_fuel_consumption = 0.0  # Топливо котельных
         self.total_power_generated = 0.0
         self.total_power_consumed = 0.0
         self.total_unserved = 0.0  # Сколько не смогли покрыть, если такое возможно
@@ -25,77 +49,175 @@ class EnergySystemModel:
         self.total_salary_cost = 0.0
         self.total_maintenance_cost = 0.0
 
-    def simulate(self, start_date, end_date, time_step_hours=1):
+        # Начало следующих суток расчета модели теплоснабжения
+        self.next_heat_time = None
+        self.end_date = None
+
+    def simulate(self, start_date, end_date, time_step_hours=1, load_profile=None):
         """
-        Почасовая модель:
-        1) Суммируем нагрузку потребителей
+        Почасовая модель, все подмодели идут по одной оси времени за один проход:
+        1) Суммируем нагрузку потребителей (один раз за шаг)
         2) Модель сети считает, сколько МВт нужно выдать, учитывая потери, PF и т.п.
         3) ГТЭС генерирует (с учётом состояния ГТУ)
         4) Снова учитываем фактический отпуск, считаем реальное покрытие спроса
-        5) Накопление итоговых показателей
+        5) Накопление итоговых показателей, сутки модели теплоснабжения
+
+        load_profile: итерируемый график нагрузки - пары (метка времени, нагрузки
+                      потребителей), например LoadProfileReader. Если задан, нагрузка
+                      берется из него (строки вне [start_date, end_date] пропускаются),
+                      а не из calculate_power_demand. Строки читаются по одной,
+                      весь график в память не загружается.
         """
+        self._begin(start_date, end_date)
+        if load_profile is not None:
+            return self._simulate_profile(start_date, end_date, load_profile)
+        if self.engine == "segments":
+            return self._simulate_segments(start_date, end_date, time_step_hours)
 
         current_time = start_date
         last_month = None
 
         while current_time <= end_date:
             # -- (1) Сбор нагрузки всех потребителей --
-            total_consumers_load_mw = 0.0
+            demands = {}
             for consumer in self.consumers:
-                demand_mw = consumer.calculate_power_demand(current_time)
-                total_consumers_load_mw += demand_mw
-
-            # -- (2) Сеть считает требуемую генерацию (учитывая потери, PF и т.д.) --
-            required_generation_mw = self.network.calc_generation_needed(
-                total_consumers_load_mw,
-                current_time
-            )
-            # Здесь, при желании, можно получить и потребную мощность в МВА,
-            # если network внутри учитывает cosφ = 0.97 и т.д.
-
-            # -- (3) ГТЭС пытается выдать запрошенную мощность --
-            actual_generation_mw, fuel_consumed = self.power_plant.generate(
-                required_generation_mw,
-                current_time
-            )
-
-            # Суммируем общий расход топлива
-            self.total_fuel_consumption += fuel_consumed
-
-            # -- (4) Фактическое покрытие нагрузки + учёт потерь --
-            # Для простоты допустим, что всё, что выдала ГТЭС, сеть смогла довести до потребителей
-            # (считая, что потери уже были заложены в required_generation_mw).
-            # Если хотим обратно проверить "достаточно ли" подали, можно условно сказать:
-            if actual_generation_mw < required_generation_mw:
-                # Не хватает для полной компенсации
-                # Потребители могут недополучить часть энергии.
-                # Но как распределять недопоставку — отдельный вопрос (пропорционально?)
-                unserved = required_generation_mw - actual_generation_mw
-                self.total_unserved += unserved
-                # Тогда фактическое потребление снизилось
-                actual_consumption = total_consumers_load_mw - unserved
-            else:
-                unserved = 0.0
-                actual_consumption = total_consumers_load_mw
-
-            self.total_power_generated += actual_generation_mw
-            self.total_power_consumed += actual_consumption
-
-            # -- (5) Учёт расходов на персонал, ТО/КР и т.п. --
-            # Можно раз в месяц (при переходе месяца) увеличивать total_salary_cost
-            if current_time.month != last_month:
-                last_month = current_time.month
-                # Допустим, в power_plant хранится zp = 150000*20,
-                # а в network хранится zp = 130000*30
-                self.total_salary_cost += (self.power_plant.personnel_salary
-                                           + self.network.personnel_salary)
-                # ТО/КР: если внутри power_plant есть счётчик total_maintenance_cost
-                self.total_maintenance_cost += self.power_plant.total_maintenance_cost
-                # (затем обнуляем в power_plant, если нужно, или храним нарастающим итогом)
+                demands[consumer.name] = consumer.calculate_power_demand(current_time)
+
+            last_month = self._step(current_time, demands, last_month,
+                                    hours=time_step_hours)
 
             # -- Двигаем время --
             current_time += datetime.timedelta(hours=time_step_hours)
 
+        self._finish()
+
+    def _simulate_profile(self, start_date, end_date, load_profile):
+        """
+        Шаги 2-5 для нагрузки из графика: строки обрабатываются по мере чтения.
+        Столбцы сопоставляются потребителям по именам из заголовка графика
+        (load_profile.consumers), без заголовка - по порядку consumers.
+        """
+        last_month = None
+        names = None
+
+        for current_time, loads in load_profile:
+            if current_time < start_date:
+                continue
+            if current_time > end_date:
+                break
+            if names is None:
+                # Заголовок графика известен после чтения первой строки
+                names = getattr(load_profile, "consumers", None) or [
+                    consumer.name for consumer in self.consumers]
+            # -- (1) Нагрузка потребителей из графика --
+            last_month = self._step(current_time, dict(zip(names, loads)), last_month)
+
+        self._finish()
+
+    def _simulate_segments(self, start_date, end_date, time_step_hours=1):
+        """
+        Те же шаги 1-5, но по интервалам: нагрузка потребителей меняется только со сменой
+        месяца, поэтому горизонт делится по началам месяцев. Нагрузка и требуемая генерация
+        считаются один раз на интервал, а ГТЭС получает длительность интервала
+        (generate(..., hours=...)) и сама учитывает события ТО/КР внутри него.
+        Суммы по шагам заменяются произведением на длительность интервала.
+        """
+        segments = split_horizon(start_date, end_date,
+                                 datetime.timedelta(hours=time_step_hours),
+                                 month_starts(start_date, end_date))
+        last_month = None
+
+        for segment in segments:
+            # -- (1) Нагрузка потребителей постоянна на всем интервале --
+            demands = {}
+            for consumer in self.consumers:
+                demands[consumer.name] = consumer.calculate_power_demand(segment.start)
+
+            last_month = self._step(segment.start, demands, last_month,
+                                    hours=segment.steps * time_step_hours)
+
+        self._finish()
+
+    def _begin(self, start_date, end_date):
+        self.end_date = end_date
+        self.next_heat_time = start_date
+        self.maintenance_cost_at_start = self.power_plant.total_maintenance_cost
+        if self.heat_model is not None:
+            self.heat_model.begin(start_date, end_date)
+
+    def _step(self, current_time, demands, last_month, hours=1):
+        """
+        Шаги 2-5 для интервала длительностью hours часов с постоянной нагрузкой,
+        начинающегося в current_time. demands - нагрузка потребителей {имя: кВт}.
+        Итоги генерации, потребления и недопоставки - энергия, МВт*ч: мощность на hours.
+        Возвращает месяц последнего начисления ЗП.
+        """
+        total_consumers_load_mw = sum(demands.values()) / 1000
+
+        # -- (2) Сеть считает требуемую генерацию (учитывая потери, PF и т.д.) --
+        required_generation_mw = self.network.calc_generation_needed(
+            demands,
+            current_time,
+            hours
+        )
+        # Здесь, при желании, можно получить и потребную мощность в МВА,
+        # если network внутри учитывает cosφ = 0.97 и т.д.
+
+        # -- (3) ГТЭС пытается выдать запрошенную мощность --
+        actual_generation_mw, fuel_consumed = self.power_plant.generate(
+            required_generation_mw,
+            current_time,
+            hours
+        )
+
+        # Суммируем общий расход топлива
+        self.total_fuel_consumption += fuel_consumed
+
+        # -- (4) Фактическое покрытие нагрузки + учёт потерь --
+        # Для простоты допустим, что всё, что выдала ГТЭС, сеть смогла довести до потребителей
+        # (считая, что потери уже были заложены в required_generation_mw).
+        # Если хотим обратно проверить "достаточно ли" подали, можно условно сказать:
+        if actual_generation_mw < required_generation_mw:
+            # Не хватает для полной компенсации
+            # Потребители могут недополучить часть энергии.
+            # Но как распределять недопоставку — отдельный вопрос (пропорционально?)
+            unserved = required_generation_mw - actual_generation_mw
+            self.total_unserved += unserved * hours
+            # Тогда фактическое потребление снизилось
+            actual_consumption = total_consumers_load_mw - unserved
+        else:
+            unserved = 0.0
+            actual_consumption = total_consumers_load_mw
+
+        self.total_power_generated += actual_generation_mw * hours
+        self.total_power_consumed += actual_consumption * hours
+
+        # -- (5) Учёт расходов на персонал, ТО/КР и т.п. --
+        # Можно раз в месяц (при переходе месяца) увеличивать total_salary_cost
+        if current_time.month != last_month:
+            last_month = current_time.month
+            # Допустим, в power_plant хранится zp = 150000*20,
+            # а в network хранится zp = 130000*30
+            self.total_salary_cost += (self.power_plant.personnel_salary
+                                       + self.network.personnel_salary)
+
+        # Сутки модели теплоснабжения, начавшиеся внутри этого интервала
+        self._advance_heat(current_time + datetime.timedelta(hours=hours))
+
+        return last_month
+
+    def _advance_heat(self, until):
+        if self.heat_model is None:
+            return
+        while self.next_heat_time < until and self.next_heat_time <= self.end_date:
+            self.total_heat_fuel_consumption += self.heat_model.step(self.next_heat_time)
+            self.next_heat_time += datetime.timedelta(days=1)
+
+    def _finish(self):
+        # ТО/КР: счётчик total_maintenance_cost в power_plant нарастающий,
+        # в итог идет прирост за этот расчет
+        self.total_maintenance_cost += (self.power_plant.total_maintenance_cost
+                                        - self.maintenance_cost_at_start)
         # После цикла выводим итоги
         self.print_summary()
 
@@ -105,5 +227,39 @@ class EnergySystemModel:
         print(f"Суммарное потребление: {self.total_power_consumed:.2f} МВт*ч")
         print(f"Непокрытый спрос: {self.total_unserved:.2f} МВт*ч")
         print(f"Общий расход топлива (ПНГ/СОГ): {self.total_fuel_consumption:.2f} м3")
+        if self.heat_model is not None:
+            print(f"Расход топлива котельными: {self.total_heat_fuel_consumption:.2f} м3")
         print(f"Итоговые расходы на ЗП: {self.total_salary_cost:.2f} руб.")
         print(f"Итоговые расходы на ТО/КР: {self.total_maintenance_cost:.2f} руб.")
+
+
+def build_energy_system(load_factors=None, engine="loop"):
+    """
+    Модель месторождения по исходным данным модулей: потребители и сеть (LineFromGrid),
+    ГТЭС (PowerPlantModel), теплоснабжение (HeatSystemModel).
+    """
+    import HeatSystemModel
+    import LineFromGrid
+    import PowerPlantModel
+
+    consumers = LineFromGrid.build_consumers()
+    network = LineFromGrid.PowerGridModel(consumers)
+    power_plant = PowerPlantModel.GTESModel(
+        PowerPlantModel.gtu_specs, load_factors or PowerPlantModel.load_factors)
+    objects, boiler_plants = HeatSystemModel.build_heat_objects()
+    heat_model = HeatSystemModel.HeatModel(objects, boiler_plants,
+                                           fuel_cost=HeatSystemModel.fuel_cost)
+    return EnergySystemModel(consumers, network, power_plant, heat_model, engine=engine)
+
+
+def main():
+    # Пример расчета: python -m EnergySystemModel
+    model = build_energy_system()
+
+    start_date = datetime.datetime(2024, 6, 1)
+    end_date = datetime.datetime(2025, 6, 1)
+    model.simulate(start_date, end_date)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,9 @@
 import datetime
 
+import numpy as np
+
+from SegmentEngine import month_starts, split_horizon
+
 
 class HeatingObject:
     def __init__(
@@ -155,8 +159,102 @@ class ClimateData:
     }
 
 
+class ClimateSeries:
+    """
+    Почасовой ряд температуры наружного воздуха (данные метеостанции) в бинарном файле.
+
+    Файл: заголовок из 32 байт (метка формата, начало ряда в часах от 1970-01-01,
+    шаг в часах, число значений) и далее значения float32. Файл отображается в память
+    (np.memmap), поэтому с диска читается только тот участок, который нужен расчету,
+    а значения берутся по целочисленному номеру шага.
+    """
+
+    magic = b"CLIMHR01"
+    header_size = 32
+    epoch = datetime.datetime(1970, 1, 1)
+
+    def __init__(self, path):
+        self.path = path
+        header = np.fromfile(path, dtype=np.int64, count=4)
+        if len(header) < 4 or header[:1].tobytes() != self.magic:
+            raise ValueError(f"{path}: не файл почасового ряда температур")
+        self.start_date = self.epoch + datetime.timedelta(hours=int(header[1]))
+        self.step = datetime.timedelta(hours=int(header[2]))
+        # Среднесуточные значения считаются по целым суткам шагов
+        if self.step <= datetime.timedelta(0) or datetime.timedelta(days=1) % self.step:
+            raise ValueError(f"{path}: шаг ряда {self.step} не делит сутки на целое число шагов")
+        self.values = np.memmap(
+            path,
+            dtype=np.float32,
+            mode="r",
+            offset=self.header_size,
+            shape=(int(header[3]),),
+        )
+
+    @classmethod
+    def write(cls, path, start_date, temperatures, step_hours=1):
+        "Сохраняет ряд температур (°C) с шагом step_hours, начиная с start_date"
+        temperatures = np.asarray(temperatures, dtype=np.float32)
+        start_hour = (start_date - cls.epoch) // datetime.timedelta(hours=1)
+        header = np.array(
+            [0, start_hour, step_hours, len(temperatures)], dtype=np.int64
+        )
+        header[:1] = np.frombuffer(cls.magic, dtype=np.int64)
+        with open(path, "wb") as file:
+            file.write(header.tobytes())
+            file.write(temperatures.tobytes())
+        return cls(path)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        return float(self.values[index])
+
+    def index(self, date):
+        "Номер шага ряда, в который попадает момент date"
+        return (date - self.start_date) // self.step
+
+    def daily_means(self, start_date, n_days):
+        "Среднесуточные температуры для n_days суток, начиная с момента start_date"
+        steps_per_day = datetime.timedelta(days=1) // self.step
+        first = self.index(start_date)
+        last = first + n_days * steps_per_day
+        if first < 0 or last > len(self.values):
+            raise ValueError(
+                f"Ряд температур {self.path} не покрывает период с {start_date} "
+                f"на {n_days} сут."
+            )
+        window = np.asarray(self.values[first:last], dtype=float)
+        return window.reshape(n_days, steps_per_day).mean(axis=1)
+
+
 class HeatModel:
-    def __init__(self, objects, boiler_plants, fuel_cost=1200):
+    # "loop" - эталонный расчет по дням и объектам,
+    # "numpy" - расчет сразу для всех дней и объектов массивами (дни x объекты),
+    # "segments" - расчет целыми интервалами с постоянной температурой и признаком
+    # отопительного периода
+    engines = ("loop", "numpy", "segments")
+    # Фазы расчета для Profiling: (название, класс, метод)
+    profile_phases = (
+        ("температуры", "HeatModel", "generate_temperature_data"),
+        ("сутки", "HeatModel", "step"),
+        ("теплопотребление", "HeatingObject", "calculate_heat_demand"),
+        ("топливо котельных", "BoilerPlant", "calculate_fuel_consumption"),
+        ("теплопотери сетей", "HeatingNetwork", "calculate_heat_loss"),
+        ("движок numpy", "HeatModel", "_simulate_numpy"),
+        ("движок segments", "HeatModel", "_simulate_segments"),
+    )
+
+    def __init__(
+        self, objects, boiler_plants, fuel_cost=1200, engine="loop", climate=None
+    ):
+        if engine not in self.engines:
+            raise ValueError(
+                f"Неизвестный движок моделирования: {engine}. "
+                f"Доступны: {', '.join(self.engines)}"
+            )
+        self.engine = engine
         self.objects = objects
         self.boiler_plants = boiler_plants
         self.fuel_cost = fuel_cost  # руб/м3
@@ -164,20 +262,24 @@ class HeatModel:
         self.total_fuel_consumption = 0
         self.total_heat_loss = 0
         self.total_cost = 0
-        self.temperature_data = {}
+        # ClimateSeries с реальным почасовым рядом. Если не задан, берутся
+        # среднемесячные температуры ClimateData
+        self.climate = climate
+        # Температура по номеру суток от начала моделирования
+        self.temperature_data = np.empty(0)
+        # Состояние расчета по шагам (begin/step)
+        self.start_date = None
+        self.temperatures = []
+        self.networks = []
 
     def generate_temperature_data(self, start_date, end_date):
-        current_date = start_date
-        while current_date <= end_date:
-            month = current_date.month
-            temperature = ClimateData.average_temperatures.get(month)
-            if temperature is not None:
-                self.temperature_data[current_date.strftime("%Y-%m-%d")] = temperature
-            else:
-                self.temperature_data[current_date.strftime("%Y-%m-%d")] = (
-                    ClimateData.average_temperature_heating_period
-                )
-            current_date += datetime.timedelta(days=1)
+        n_days = max(0, (end_date - start_date) // datetime.timedelta(days=1) + 1)
+        if self.climate is not None:
+            self.temperature_data = self.climate.daily_means(start_date, n_days)
+        else:
+            dates = np.datetime64(start_date.date(), "D") + np.arange(n_days)
+            self.temperature_data = self.monthly_temperatures(dates)
+        return self.temperature_data
 
     def is_heating_period(self, date):
         "Определяет, является ли текущая дата частью отопительного периода"
@@ -193,12 +295,51 @@ class HeatModel:
         else:
             return date.date() >= start_date or date.date() <= end_date
 
-    def simulate(self, start_date, end_date):
+    def heating_period_flags(self, dates):
+        "Векторный аналог is_heating_period для массива дат datetime64[D]"
+        years = dates.astype("datetime64[Y]").astype("datetime64[M]")
+        start_dates = (years + (ClimateData.heating_start_month - 1)).astype(
+            "datetime64[D]"
+        ) + (ClimateData.heating_start_day - 1)
+        end_dates = start_dates + ClimateData.heating_period_duration
+
+        return np.where(
+            start_dates <= end_dates,
+            (start_dates <= dates) & (dates <= end_dates),
+            (dates >= start_dates) | (dates <= end_dates),
+        )
 
-        self.generate_temperature_data(start_date, end_date)
+    def heating_period_changes(self, start_date, end_date):
+        "Моменты, в которые может смениться признак отопительного периода"
+        points = []
+        for year in range(start_date.year, end_date.year + 1):
+            first_day = datetime.datetime(
+                year, ClimateData.heating_start_month, ClimateData.heating_start_day
+            )
+            points.append(first_day)
+            points.append(
+                first_day
+                + datetime.timedelta(days=ClimateData.heating_period_duration + 1)
+            )
+        # Смена года (1 января) уже входит в начала месяцев
+        return points
+
+    def monthly_temperatures(self, dates):
+        "Среднемесячные температуры для массива дат datetime64[D]"
+        months = dates.astype("datetime64[M]").astype(np.int64) % 12 + 1
+        table = np.array(
+            [
+                ClimateData.average_temperatures.get(
+                    month, ClimateData.average_temperature_heating_period
+                )
+                for month in range(13)
+            ],
+            dtype=float,
+        )
+        return table[months]
 
-        current_date = start_date
-        networks = [
+    def create_networks(self):
+        return [
             HeatingNetwork(
                 obj.distance,
                 pipe_diameter=0.45,
@@ -207,21 +348,166 @@ class HeatModel:
             )
             for obj in self.objects
         ]
+
+    def simulate(self, start_date, end_date):
+        if self.engine == "numpy":
+            return self._simulate_numpy(start_date, end_date)
+        if self.engine == "segments":
+            return self._simulate_segments(start_date, end_date)
+
+        self.begin(start_date, end_date)
+
+        current_date = start_date
         while current_date <= end_date:
+            self.step(current_date)
+            current_date += datetime.timedelta(days=1)
+
+        self.print_results(self.networks)
 
-            temperature = self.temperature_data[current_date.strftime("%Y-%m-%d")]
+    def begin(self, start_date, end_date):
+        """
+        Подготовка к расчету по шагам: температуры на период и тепловые сети.
+        После нее step можно вызывать из общей модели (EnergySystemModel)
+        """
+        self.generate_temperature_data(start_date, end_date)
+        self.start_date = start_date
+        self.temperatures = self.temperature_data.tolist()
+        self.networks = self.create_networks()
+
+    def step(self, current_date):
+        "Расчет одних суток, начинающихся в current_date. Возвращает расход топлива за сутки"
+        day = (current_date - self.start_date) // datetime.timedelta(days=1)
+        temperature = self.temperatures[day]
+
+        heating_period = self.is_heating_period(current_date)
+        day_fuel = 0
+        # Рассчитываем потребление и потери для каждого объекта
+        for obj, plant, network in zip(self.objects, self.boiler_plants, self.networks):
+            heat_demand = obj.calculate_heat_demand(temperature, heating_period)
+            fuel_consumption = plant.calculate_fuel_consumption(heat_demand)
+            # Передаем температуры теплоносителя
+            heat_loss = network.calculate_heat_loss(
+                temperature,
+                heat_demand,
+                plant.supply_temperature,
+                plant.return_temperature,
+            )
 
-            heating_period = self.is_heating_period(current_date)
-            # Рассчитываем потребление и потери для каждого объекта
+            obj.total_fuel_consumption += fuel_consumption
+            obj.total_heat_loss += heat_loss
+
+            self.total_fuel_consumption += fuel_consumption
+            self.total_heat_loss += heat_loss
+            self.total_cost += fuel_consumption * self.fuel_cost
+
+            network.total_heat_loss += heat_loss
+            day_fuel += fuel_consumption
+
+        return day_fuel
+
+    def _simulate_numpy(self, start_date, end_date):
+        # Спрос, топливо и потери считаются массивами (дни x объекты). Суммы копятся
+        # через np.add.accumulate в том же порядке, что и в цикле по дням и объектам,
+        # поэтому итоги совпадают с движком "loop"
+        n_days = max(0, (end_date - start_date) // datetime.timedelta(days=1) + 1)
+        dates = np.datetime64(start_date.date(), "D") + np.arange(n_days)
+        temperature = self.generate_temperature_data(start_date, end_date)[:, None]
+        heating_period = self.heating_period_flags(dates)[:, None]
+
+        networks = self.create_networks()
+        # Как и zip в цикле: объекты без своей котельной не рассчитываются
+        units = list(zip(self.objects, self.boiler_plants, networks))
+        heating_load = np.array([obj.heating_load for obj, _, _ in units], dtype=float)
+        fuel_factor = np.array(
+            [plant.fuel_heat_value * plant.efficiency for _, plant, _ in units],
+            dtype=float,
+        )
+        average_temperature = np.array(
+            [
+                (plant.supply_temperature + plant.return_temperature) / 2
+                for _, plant, _ in units
+            ],
+            dtype=float,
+        )
+        length = np.array([network.length for _, _, network in units], dtype=float)
+
+        design_temperature = ClimateData.design_temperature_heating
+        heat_demand = np.where(
+            heating_period,
+            heating_load
+            * np.maximum(
+                0,
+                (design_temperature - temperature)
+                / (design_temperature - ClimateData.average_temperature_heating_period),
+            ),
+            heating_load * 0.1,
+        )
+        fuel_consumption = (heat_demand * 4186.8) / fuel_factor
+        heat_loss = 0.05 * (average_temperature - temperature) * length * heat_demand
+
+        object_fuel = self._accumulate(
+            [obj.total_fuel_consumption for obj, _, _ in units], fuel_consumption
+        )
+        object_loss = self._accumulate(
+            [obj.total_heat_loss for obj, _, _ in units], heat_loss
+        )
+        network_loss = self._accumulate(
+            [network.total_heat_loss for _, _, network in units], heat_loss
+        )
+        for i, (obj, _, network) in enumerate(units):
+            obj.total_fuel_consumption = float(object_fuel[i])
+            obj.total_heat_loss = float(object_loss[i])
+            network.total_heat_loss = float(network_loss[i])
+
+        self.total_fuel_consumption = float(
+            self._accumulate([self.total_fuel_consumption], fuel_consumption.reshape(-1, 1))[0]
+        )
+        self.total_heat_loss = float(
+            self._accumulate([self.total_heat_loss], heat_loss.reshape(-1, 1))[0]
+        )
+        self.total_cost = float(
+            self._accumulate(
+                [self.total_cost], (fuel_consumption * self.fuel_cost).reshape(-1, 1)
+            )[0]
+        )
+
+        self.print_results(networks)
+
+    def _simulate_segments(self, start_date, end_date):
+        # Среднемесячная температура и признак отопительного периода меняются только
+        # на границах месяцев и отопительного периода. Между ними суточные значения
+        # одинаковы, поэтому каждый интервал считается один раз и умножается на число
+        # суток. Итоги совпадают с движком "loop" с точностью до округления
+        if self.climate is not None:
+            # Реальный ряд температур меняется каждые сутки, сжимать нечего
+            return self._simulate_numpy(start_date, end_date)
+
+        temperatures = self.generate_temperature_data(start_date, end_date).tolist()
+        segments = split_horizon(
+            start_date,
+            end_date,
+            datetime.timedelta(days=1),
+            month_starts(start_date, end_date)
+            + self.heating_period_changes(start_date, end_date),
+        )
+
+        networks = self.create_networks()
+        for segment in segments:
+            temperature = temperatures[segment.first_step]
+            heating_period = self.is_heating_period(segment.start)
             for obj, plant, network in zip(self.objects, self.boiler_plants, networks):
                 heat_demand = obj.calculate_heat_demand(temperature, heating_period)
-                fuel_consumption = plant.calculate_fuel_consumption(heat_demand)
-                # Передаем температуры теплоносителя
-                heat_loss = network.calculate_heat_loss(
-                    temperature,
-                    heat_demand,
-                    plant.supply_temperature,
-                    plant.return_temperature,
+                fuel_consumption = (
+                    plant.calculate_fuel_consumption(heat_demand) * segment.steps
+                )
+                heat_loss = (
+                    network.calculate_heat_loss(
+                        temperature,
+                        heat_demand,
+                        plant.supply_temperature,
+                        plant.return_temperature,
+                    )
+                    * segment.steps
                 )
 
                 obj.total_fuel_consumption += fuel_consumption
@@ -233,8 +519,17 @@ class HeatModel:
 
                 network.total_heat_loss += heat_loss
 
-            current_date += datetime.timedelta(days=1)
+        self.print_results(networks)
+
+    @staticmethod
+    def _accumulate(initial, values):
+        "Последовательные суммы по столбцам values, начиная со значений initial"
+        steps = np.empty((len(values) + 1, len(initial)))
+        steps[0] = initial
+        steps[1:] = values
+        return np.add.accumulate(steps, axis=0)[-1]
 
+    def print_results(self, networks):
         print("---Результаты моделирования---")
         print(f"Общий расход топлива: {self.total_fuel_consumption:.2f} м3")
         print(f"Общие теплопотери: {self.total_heat_loss:.2f} Гкал")
@@ -508,28 +803,44 @@ well_clusters_data = [
     },
 ]
 
-objects = []
-boiler_plants = []
 
-for obj_data in objects_data:
-    object_type = obj_data.pop("type")
-    obj = object_type(**obj_data)
-    objects.append(obj)
+def build_heat_objects(objects_data=objects_data, well_clusters_data=well_clusters_data):
+    "Создает объекты и котельные по исходным данным, сами словари данных не изменяются"
+    objects = []
+    boiler_plants = []
 
-    boiler_plant = BoilerPlant(
-        name=f"Котельная {obj.name}", fuel_type="ПНГ", fuel_heat_value=45
-    )
-    boiler_plants.append(boiler_plant)
+    for obj_data in objects_data:
+        obj_data = dict(obj_data)
+        object_type = obj_data.pop("type")
+        obj = object_type(**obj_data)
+        objects.append(obj)
+
+        boiler_plant = BoilerPlant(
+            name=f"Котельная {obj.name}", fuel_type="ПНГ", fuel_heat_value=45
+        )
+        boiler_plants.append(boiler_plant)
+
+    for obj_data in well_clusters_data:
+        obj_data = dict(obj_data)
+        object_type = obj_data.pop("type")
+        obj = object_type(**obj_data)
+        objects.append(obj)
+
+    return objects, boiler_plants
 
-for obj_data in well_clusters_data:
-    object_type = obj_data.pop("type")
-    obj = object_type(**obj_data)
-    objects.append(obj)
 
 fuel_cost = 1200  # Стоимость м3
 
-model = HeatModel(objects=objects, boiler_plants=boiler_plants, fuel_cost=fuel_cost)
 
-start_date = datetime.datetime(2024, 6, 1)
-end_date = datetime.datetime(2028, 6, 1)
-model.simulate(start_date, end_date)
+def main():
+    # Пример расчета: python -m HeatSystemModel
+    objects, boiler_plants = build_heat_objects()
+    model = HeatModel(objects=objects, boiler_plants=boiler_plants, fuel_cost=fuel_cost)
+
+    start_date = datetime.datetime(2024, 6, 1)
+    end_date = datetime.datetime(2028, 6, 1)
+    model.simulate(start_date, end_date)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
 import datetime
 import math
 
+import numpy as np
+
+from SegmentEngine import horizon_hours, month_starts, salary_months, split_horizon
+
 class PowerConsumer:
     def __init__(self, name, installed_power_electric, distance, load_factor_summer, load_factor_winter, voltage = 10):
         self.name = name
@@ -57,18 +61,29 @@ class PowerLine:
         self.r0 = r0 #Ом/км
         self.x0 = x0 #Ом/км
         self.voltage_drop = 0 #В
+        #Сопротивления линии считаются один раз (Ом)
+        self.r = self.r0 * self.length
+        self.x = self.x0 * self.length
+        self.z = math.sqrt(self.r**2 + self.x**2)
+
+    def current_divisor(self, power_factor = 0.97):
+        #Ток в линии (А) = передаваемая мощность / этот делитель
+        return math.sqrt(3) * self.voltage * 1000 * power_factor
+
+    def loss_at(self, power_transmitted_hourly, power_factor = 0.97):
+        #Потери мощности (Вт) при передаче power_transmitted_hourly без записи в состояние линии
+        i = (power_transmitted_hourly) / self.current_divisor(power_factor)
+        return 3 * i**2 * self.r
 
     def calculate_power_loss(self, power_transmitted_hourly, power_factor = 0.97):
         #Полное сопротивление линии (Ом)
-        r = self.r0 * self.length
-        x = self.x0 * self.length
-        z = math.sqrt(r**2 + x**2)
+        z = self.z
 
         #Ток в линии (А)
-        i = (power_transmitted_hourly) / (math.sqrt(3) * self.voltage * 1000 * power_factor) 
+        i = (power_transmitted_hourly) / self.current_divisor(power_factor)
 
         #Потери мощности (Вт)
-        self.power_loss = 3 * i**2 * r 
+        self.power_loss = self.loss_at(power_transmitted_hourly, power_factor)
 
         #Падение напряжения (В)
         self.voltage_drop = (i * z)
@@ -84,7 +99,22 @@ class PowerPlant:
         self.name = name
 
 class PowerGridModel:
-    def __init__(self, consumers):
+    #"loop" - эталонный почасовой цикл, "numpy" - спрос и потери всех линий массивами,
+    #"segments" - расчет целыми интервалами, на которых спрос потребителей постоянен
+    engines = ("loop", "numpy", "segments")
+    #Фазы расчета для Profiling: (название, класс, метод)
+    profile_phases = (
+        ("спрос потребителей", "PowerConsumer", "calculate_power_demand"),
+        ("потери в линиях", "PowerLine", "calculate_power_loss"),
+        ("требуемая генерация", "PowerGridModel", "calc_generation_needed"),
+        ("движок numpy", "PowerGridModel", "_simulate_numpy"),
+        ("движок segments", "PowerGridModel", "_simulate_segments"),
+    )
+
+    def __init__(self, consumers, engine = "loop"):
+        if engine not in self.engines:
+            raise ValueError(f"Неизвестный движок моделирования: {engine}. Доступны: {', '.join(self.engines)}")
+        self.engine = engine
         self.consumers = consumers
         self.power_lines = [] #Список линий электропередач
         self.total_power_loss_w = 0 #Суммарные потери мощности в Вт
@@ -99,7 +129,41 @@ class PowerGridModel:
             line = PowerLine(powerplant, consumer, consumer.distance, voltage = consumer.voltage)
             self.power_lines.append(line)
 
+    def calc_generation_needed(self, demands, current_time = None, hours = 1):
+        #Требуемая генерация ГТЭС (МВт) для спроса потребителей demands {имя: кВт} с учетом
+        #потерь в линиях. Потери и потребление копятся в итогах модели за hours часов, поэтому
+        #сеть можно вести по шагам общей модели (EnergySystemModel) вместо simulate
+        if not self.power_lines:
+            self.create_power_lines()
+
+        power_loss_sum = 0
+        for line in self.power_lines:
+            power_loss = line.calculate_power_loss(demands.get(line.destination.name, 0))
+            line.total_power_loss += power_loss * hours / 1000
+            power_loss_sum += power_loss
+
+        for consumer in self.consumers:
+            consumer.total_power_consumption += demands.get(consumer.name, 0) / 1000 * hours
+
+        self.total_power_loss_w = power_loss_sum
+        self.total_power_loss_kwh += power_loss_sum * hours / 1000
+        self.total_power_loss_mwh = self.total_power_loss_kwh / 1000
+
+        return (sum(demands.values()) + power_loss_sum / 1000) / 1000
+
+    def generation_needed(self, demands):
+        #То же, что calc_generation_needed, но без изменения линий, потребителей и итогов
+        #модели: для планирования (UnitCommitment) по спросу без учета его в расчете сети
+        lines = self.power_lines or [PowerLine(PowerPlant(), consumer, consumer.distance, voltage = consumer.voltage)
+                                     for consumer in self.consumers]
+        power_loss_sum = sum(line.loss_at(demands.get(line.destination.name, 0)) for line in lines)
+        return (sum(demands.values()) + power_loss_sum / 1000) / 1000
+
     def simulate(self, start_date, end_date):
+        if self.engine == "numpy":
+            return self._simulate_numpy(start_date, end_date)
+        if self.engine == "segments":
+            return self._simulate_segments(start_date, end_date)
 
         total_hours = (end_date - start_date).total_seconds() / 3600
         self.create_power_lines() #Создаем линии электропередач
@@ -109,16 +173,19 @@ class PowerGridModel:
 
         while current_date <= end_date:
 
+            #Спрос каждого потребителя считается один раз за шаг и используется для потерь
+            demands = {}
             total_power_demand = 0
             for consumer in self.consumers:
                 power_demand_kw = consumer.calculate_power_demand(current_date)  
                 consumer.total_power_consumption += power_demand_kw  / 1000 
+                demands[id(consumer)] = power_demand_kw
 
                 total_power_demand += power_demand_kw 
 
             power_loss_sum = 0 
             for line in self.power_lines:
-                power_transmitted_hourly = line.destination.calculate_power_demand(current_date)
+                power_transmitted_hourly = demands[id(line.destination)]
                 power_loss = line.calculate_power_loss(power_transmitted_hourly) 
 
                 line_power_loss_kwh = power_loss * total_hours / 1000
@@ -137,6 +204,100 @@ class PowerGridModel:
         self.total_power_loss_kwh = power_loss_sum * total_hours / 1000
         self.total_power_loss_mwh = self.total_power_loss_kwh / 1000
 
+        self.print_results()
+
+    def _simulate_numpy(self, start_date, end_date):
+        #Спрос каждого потребителя считается один раз за шаг и сразу используется для потерь.
+        #Шаги обрабатываются блоками по году, все линии - одной операцией над массивами.
+        #Суммы копятся в порядке почасового цикла, результат совпадает с движком "loop"
+        total_hours = (end_date - start_date).total_seconds() / 3600
+        self.create_power_lines()
+        n_hours = horizon_hours(start_date, end_date)
+
+        power_max = np.array([[c.installed_power_electric for c in self.consumers]], dtype = float)
+        demand_summer = power_max * np.array([c.load_factor_summer for c in self.consumers]) * 1000
+        demand_winter = power_max * np.array([c.load_factor_winter for c in self.consumers]) * 1000
+        consumption = np.array([c.total_power_consumption for c in self.consumers], dtype = float)
+
+        #Постоянные параметры линий и номер потребителя на конце каждой линии
+        consumer_index = {id(consumer): k for k, consumer in enumerate(self.consumers)}
+        destination = np.array([consumer_index[id(line.destination)] for line in self.power_lines], dtype = np.int64)
+        r = np.array([line.r for line in self.power_lines])
+        z = np.array([line.z for line in self.power_lines])
+        divisor = np.array([line.current_divisor() for line in self.power_lines])
+
+        first_hour = np.datetime64(start_date, "s")
+        current = None
+        block = 24 * 366
+        for offset in range(0, n_hours, block):
+            hours = first_hour + np.arange(offset, min(offset + block, n_hours)) * np.timedelta64(3600, "s")
+            month = hours.astype("datetime64[M]").astype(np.int64) % 12 + 1
+            summer = ((6 <= month) & (month <= 9))[:, None]
+            demand = np.where(summer, demand_summer, demand_winter)
+
+            steps = np.empty((len(demand) + 1, len(consumption)))
+            steps[0] = consumption
+            steps[1:] = demand / 1000
+            consumption = np.add.accumulate(steps, axis = 0)[-1]
+
+            current = demand[:, destination] / divisor
+            power_loss = 3 * current**2 * r
+
+        self.total_personnel_cost = self.personnel_salary * salary_months(start_date, n_hours)
+        for consumer, total in zip(self.consumers, consumption.tolist()):
+            consumer.total_power_consumption = total
+
+        #Как и в цикле, в итоги попадают потери последнего часа
+        power_loss_sum = 0
+        if current is not None:
+            for line, loss, i, line_z in zip(self.power_lines, power_loss[-1].tolist(), current[-1].tolist(), z.tolist()):
+                line.power_loss = loss
+                line.voltage_drop = (i * line_z)
+                line.total_power_loss = loss * total_hours / 1000
+                power_loss_sum += loss
+
+        self.total_power_loss_w = power_loss_sum
+        self.total_power_loss_kwh = power_loss_sum * total_hours / 1000
+        self.total_power_loss_mwh = self.total_power_loss_kwh / 1000
+
+        self.print_results()
+
+    def _simulate_segments(self, start_date, end_date):
+        #Спрос потребителей зависит только от месяца, поэтому горизонт делится на интервалы
+        #по началам месяцев. Спрос считается один раз на интервал и умножается на число часов,
+        #итоги совпадают с движком "loop" с точностью до округления
+        total_hours = (end_date - start_date).total_seconds() / 3600
+        self.create_power_lines()
+        segments = split_horizon(start_date, end_date, datetime.timedelta(hours=1), month_starts(start_date, end_date))
+        last_month = None
+        self.total_personnel_cost = 0
+
+        for segment in segments:
+            for consumer in self.consumers:
+                power_demand_kw = consumer.calculate_power_demand(segment.start)
+                consumer.total_power_consumption += power_demand_kw / 1000 * segment.steps
+
+            #Каждый интервал начинается с нового месяца
+            if segment.start.month != last_month:
+                self.total_personnel_cost += self.personnel_salary
+                last_month = segment.start.month
+
+        #Как и в цикле, в итоги попадают потери последнего часа
+        power_loss_sum = 0
+        if segments:
+            last_hour = segments[-1].start
+            for line in self.power_lines:
+                power_loss = line.calculate_power_loss(line.destination.calculate_power_demand(last_hour))
+                line.total_power_loss = power_loss * total_hours / 1000
+                power_loss_sum += power_loss
+
+        self.total_power_loss_w = power_loss_sum
+        self.total_power_loss_kwh = power_loss_sum * total_hours / 1000
+        self.total_power_loss_mwh = self.total_power_loss_kwh / 1000
+
+        self.print_results()
+
+    def print_results(self):
         print("---Результаты моделирования---")
         print(f"Суммарные потери мощности: {self.total_power_loss_w:.2f} Вт")
         print(f"Общие потери электроэнергии за весь период: {self.total_power_loss_mwh:.2f} МВт*ч") #Потери за весь период
@@ -187,20 +348,31 @@ well_clusters_data = [
  {"name": "Куст 26", "installed_power_electric": 1.5, "distance": 25.0, "load_factor_summer": 50, "load_factor_winter": 100, "type": WellCluster}
 ]
 
-consumers = []
+def build_consumers(objects_data=objects_data, well_clusters_data=well_clusters_data):
+  #Создает потребителей по исходным данным, сами словари данных не изменяются
+  consumers = []
+
+  for obj_data in objects_data:
+    obj_data = dict(obj_data)
+    object_type = obj_data.pop("type")
+    obj = object_type(**obj_data)
+    consumers.append(obj)
+
+  for obj_data in well_clusters_data:
+    obj_data = dict(obj_data)
+    object_type = obj_data.pop("type")
+    obj = object_type(**obj_data)
+    consumers.append(obj)
 
-for obj_data in objects_data:
-  object_type = obj_data.pop("type")
-  obj = object_type(**obj_data)
-  consumers.append(obj)
+  return consumers
 
-for obj_data in well_clusters_data:
-  object_type = obj_data.pop("type")
-  obj = object_type(**obj_data)
-  consumers.append(obj)
+def main():
+  #Пример расчета: python -m LineFromGrid
+  model = PowerGridModel(consumers=build_consumers())
 
-model = PowerGridModel(consumers=consumers)
+  start_date = datetime.datetime(2024, 6, 1)
+  end_date = datetime.datetime(2024, 6, 2)
+  model.simulate(start_date, end_date)
 
-start_date = datetime.datetime(2024, 6, 1)
-end_date = datetime.datetime(2024, 6, 2)
-model.simulate(start_date, end_date)
\ No newline at end of file
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,148 @@
+# файл: LoadProfiles.py
+
+import collections
+import csv
+import datetime
+
+import numpy as np
+
+# Форматы метки времени в первом столбце. Первым пробуется формат предыдущей строки
+TIME_FORMATS = (
+    "%d.%m.%Y %H:%M",
+    "%d.%m.%Y %H:%M:%S",
+    "%d.%m.%Y",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%dT%H:%M",
+)
+
+# Значения-заглушки "нет данных" (так же, как прочерки в Consumers.csv)
+PLACEHOLDERS = ("", "-", "–", "—")
+
+# Часть профиля: times - список меток времени, values - массив (строки x потребители)
+ProfileChunk = collections.namedtuple("ProfileChunk", ["times", "values"])
+
+
+def parse_number(text, missing=0.0):
+    """
+    Число в русском формате: запятая как десятичный разделитель, пробелы
+    (в том числе неразрывные) между разрядами. Прочерк означает отсутствие
+    значения и заменяется на missing.
+    """
+    text = text.strip()
+    if text in PLACEHOLDERS:
+        return missing
+    try:
+        return float(text.replace("\xa0", "").replace(" ", "").replace(",", "."))
+    except ValueError:
+        raise ValueError(f"не распознано число: {text!r}") from None
+
+
+class LoadProfileReader:
+    """
+    Потоковое чтение почасовых графиков нагрузки из CSV (выгрузки АСКУЭ/SCADA).
+
+    Формат: разделитель ";", первая строка - заголовок "Дата и время;<потребитель 1>;...",
+    далее по строке на шаг: метка времени и нагрузки потребителей в тех же единицах,
+    что возвращает calculate_power_demand. Файл читается построчно и отдается частями
+    по chunk_size строк, поэтому память не зависит от размера файла.
+
+    Строки с неверным числом столбцов, нераспознанной датой или числом пропускаются
+    и записываются в errors как (номер строки файла, причина). Если таких строк
+    больше max_errors, чтение прерывается с ValueError.
+    """
+
+    def __init__(
+        self,
+        path,
+        chunk_size=10000,
+        delimiter=";",
+        encoding="utf-8-sig",
+        missing=0.0,
+        max_errors=1000,
+    ):
+        if chunk_size < 1:
+            raise ValueError(f"Размер части должен быть положительным: {chunk_size}")
+        self.path = path
+        self.chunk_size = chunk_size
+        self.delimiter = delimiter
+        self.encoding = encoding
+        self.missing = missing
+        self.max_errors = max_errors
+        self.consumers = []  # Имена потребителей из заголовка
+        self.errors = []
+        self.rows_read = 0
+
+    def chunks(self):
+        "Генератор частей профиля ProfileChunk"
+        self.errors = []
+        self.rows_read = 0
+        time_format = TIME_FORMATS[0]
+
+        with open(self.path, newline="", encoding=self.encoding) as file:
+            reader = csv.reader(file, delimiter=self.delimiter)
+            header = next(reader, None)
+            if header is None:
+                raise ValueError(f"{self.path}: пустой файл")
+            self.consumers = [name.strip() for name in header[1:]]
+            n_columns = len(header)
+
+            times = []
+            values = np.empty((self.chunk_size, len(self.consumers)))
+            for row in reader:
+                if not any(cell.strip() for cell in row):
+                    continue  # Пустые строки в конце выгрузки
+                if len(row) != n_columns:
+                    self._report(
+                        reader.line_num,
+                        f"ожидалось столбцов: {n_columns}, получено: {len(row)}",
+                    )
+                    continue
+                try:
+                    time, time_format = self._parse_time(row[0], time_format)
+                    values[len(times)] = [
+                        parse_number(cell, self.missing) for cell in row[1:]
+                    ]
+                except ValueError as error:
+                    self._report(reader.line_num, str(error))
+                    continue
+
+                times.append(time)
+                self.rows_read += 1
+                if len(times) == self.chunk_size:
+                    yield ProfileChunk(times, values)
+                    times = []
+                    values = np.empty((self.chunk_size, len(self.consumers)))
+
+            if times:
+                yield ProfileChunk(times, values[: len(times)])
+
+    def rows(self):
+        "Генератор строк профиля (метка времени, список нагрузок потребителей)"
+        for chunk in self.chunks():
+            yield from zip(chunk.times, chunk.values.tolist())
+
+    def __iter__(self):
+        return self.rows()
+
+    def _parse_time(self, text, time_format):
+        text = text.strip()
+        try:
+            return datetime.datetime.strptime(text, time_format), time_format
+        except ValueError:
+            pass
+        for candidate in TIME_FORMATS:
+            try:
+                return datetime.datetime.strptime(text, candidate), candidate
+            except ValueError:
+                continue
+        raise ValueError(f"не распознана метка времени: {text!r}")
+
+    def _report(self, line_number, reason):
+        self.errors.append((line_number, reason))
+        if self.max_errors is not None and len(self.errors) > self.max_errors:
+            raise ValueError(
+                f"{self.path}: слишком много ошибочных строк ({len(self.errors)}), "
+                f"последняя - строка {line_number}: {reason}"
+            )
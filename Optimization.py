@@ -1,10 +1,13 @@
 import datetime
-import functools
-import random
+import math
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 
-from matplotlib import pyplot as plt
+import numpy as np
 
-from PowerPlantModel import model
+from PowerPlantModel import GTESFleetBatch, GTESModel
 
 
 # константы генетического алгоритма
@@ -13,6 +16,29 @@ P_CROSSOVER = 0.9       # вероятность скрещивания
 P_MUTATION = 0.5        # вероятность мутации индивидуума
 MAX_GENERATIONS = 50    # максимальное количество поколений
 ONE_MAX_LENGTH = 9      # количество генов
+GENE_BOUNDS = (0.5, 1.0)      # диапазон генов начальной популяции
+MUTATION_BOUNDS = (0.5, 1.1)  # диапазон нового значения гена при мутации
+TOURNAMENT_SIZE = 3     # участников турнира при отборе
+GENE_DECIMALS = 2       # знаков после запятой в значениях генов
+ELITE_SIZE = 1          # лучших индивидуумов, переходящих в следующее поколение без изменений
+PATIENCE = 10           # поколений без улучшения лучшей и средней приспособленности до остановки
+TOLERANCE = 1e-6        # относительное изменение приспособленности, которое считается улучшением
+TIME_BUDGET = None      # предел времени расчета, секунд (None - без предела)
+
+# причины остановки оптимизатора (Optimizer.stopReason)
+STOP_CANCELLED = "отмена"        # установлен cancel
+STOP_GENERATIONS = "поколения"   # рассчитаны все generations поколений
+STOP_EVALUATIONS = "оценки"      # исчерпан max_evaluations
+STOP_STALLED = "застой"          # patience поколений без улучшения
+STOP_TIME_BUDGET = "время"       # истек time_budget
+
+# константы оценки приспособленности
+START_DATE = datetime.datetime(2024, 6, 1)  # начало моделирования
+END_DATE = datetime.datetime(2025, 6, 1)    # конец моделирования
+SIMULATION_ENGINE = "numpy"  # движок GTESModel, результат совпадает с "loop"
+MAX_WORKERS = None      # количество процессов для оценки популяции (None - по числу ядер)
+CHUNK_SIZE = None       # индивидуумов на одну задачу процесса (None - поровну на процесс)
+CACHE_SIZE = 10000      # максимальное количество запомненных значений приспособленности
 
 
 gtu_specs = {
@@ -26,113 +52,409 @@ gtu_specs = {
 }
 
 
-class FitnessMax():
-    def __init__(self):
-        self.values = [0]
-
-
-class Individual(list):
-    def __init__(self, *args):
-        super().__init__(*args)
-        self.fitness = FitnessMax()
-
-
-def oneMaxFitness(individual):
-    model.__init__(gtu_specs, individual)
-
-    start_date = datetime.datetime(2024, 6, 1)
-    end_date = datetime.datetime(2025, 6, 1)
+def simulateFitness(individual, specs=gtu_specs, start_date=START_DATE, end_date=END_DATE,
+                    engine=SIMULATION_ENGINE):
+    # Чистая функция: на каждый вызов своя модель, поэтому ее можно считать в разных процессах
+    model = GTESModel(specs, list(individual), engine=engine)
 
     fitness = model.simulate(start_date, end_date)
 
     return (fitness),
 
 
-def individualCreator():
-    return Individual([round(random.uniform(0.5, 1), 2) for i in range(ONE_MAX_LENGTH)])
-
-
-def populationCreator(n=0):
-    return list([individualCreator() for i in range(n)])
-
-
-population = populationCreator(n=POPULATION_SIZE)
-generationCounter = 0
-
-fitnessValues = list(map(oneMaxFitness, population))
-
-for individual, fitnessValue in zip(population, fitnessValues):
-    individual.fitness.values = fitnessValue
-
-maxFitnessValues = []
-meanFitnessValues = []
-
-
-def clone(value):
-    ind = Individual(value[:])
-    ind.fitness.values[0] = value.fitness.values[0]
-    return ind
-
-
-def selTournament(population, p_len):
-    offspring = []
-    for n in range(p_len):
-        i1 = i2 = i3 = 0
-        while i1 == i2 or i1 == i3 or i2 == i3:
-            i1, i2, i3 = random.randint(
-                0, p_len-1), random.randint(0, p_len-1), random.randint(0, p_len-1)
-
-        offspring.append(min([population[i1], population[i2],
-                         population[i3]], key=lambda ind: ind.fitness.values[0]))
-
-    return offspring
-
-
-def cxOnePoint(child1, child2):
-    s = random.randint(2, len(child1)-3)
-    child1[s:], child2[s:] = child2[s:], child1[s:]
-
-
-def mutFlipBit(mutant, indpb=0.01):
-    for indx in range(len(mutant)):
-        if random.random() < indpb:
-            mutant[indx] = round(random.uniform(0.5, 1.1), 2)
+def oneMaxFitness(individual):
+    return simulateFitness(individual)
+
+
+# GTESFleetBatch на каждый набор gtu_specs. Живут в процессе между вызовами, поэтому
+# расписания ГТУ с уже встречавшейся загрузкой берутся из их кэша
+_fleetBatches = {}
+
+
+def fleetBatch(specs=gtu_specs):
+    key = tuple(sorted(specs.items()))
+    if key not in _fleetBatches:
+        _fleetBatches[key] = GTESFleetBatch(specs, fallback_engine=SIMULATION_ENGINE,
+                                            cache_size=CACHE_SIZE)
+    return _fleetBatches[key]
+
+
+def populationFitness(population, specs=gtu_specs, start_date=START_DATE, end_date=END_DATE):
+    # Приспособленность всей популяции (список векторов генов или массив) за один вызов
+    # GTESFleetBatch
+    if not len(population):
+        return []
+    costs = fleetBatch(specs).simulate(
+        np.asarray(population, dtype=float), start_date, end_date)
+    return [(cost,) for cost in costs.tolist()]
+
+
+class FitnessCache:
+    """LRU-кэш значений приспособленности.
+
+    Ключ - вектор генов вместе с gtu_specs и горизонтом моделирования, поэтому
+    одинаковые потомки после клонирования и скрещивания не моделируются повторно.
+    При превышении maxsize вытесняется значение, которое дольше всех не запрашивалось.
+    """
+
+    def __init__(self, fitness=oneMaxFitness, maxsize=CACHE_SIZE, specs=gtu_specs,
+                 start_date=START_DATE, end_date=END_DATE):
+        self.fitness = fitness
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._config = (tuple(sorted(specs.items())), start_date, end_date)
+        self._values = OrderedDict()
+
+    def key(self, individual):
+        return (tuple(individual),) + self._config
+
+    def __len__(self):
+        return len(self._values)
+
+    def __call__(self, individual):
+        return self.evaluate([individual], lambda population: list(map(self.fitness, population)))[0]
+
+    def evaluate(self, population, evaluate):
+        # evaluate вызывается один раз и только для векторов генов, которых нет в кэше
+        keys = [self.key(ind) for ind in population]
+        results = [None] * len(population)
+        missing = OrderedDict()
+        for i, key in enumerate(keys):
+            if key in self._values:
+                self._values.move_to_end(key)
+                results[i] = self._values[key]
+                self.hits += 1
+            elif key in missing:
+                self.hits += 1
+            else:
+                missing[key] = population[i]
+                self.misses += 1
+
+        fresh = dict(zip(missing, evaluate(list(missing.values())) if missing else []))
+        for key, value in fresh.items():
+            self._values[key] = value
+            if len(self._values) > self.maxsize:
+                self._values.popitem(last=False)
+
+        return [fresh[key] if value is None else value for key, value in zip(keys, results)]
+
+
+class PopulationEvaluator:
+    """Оценка популяции в пуле процессов concurrent.futures.
+
+    fitness принимает список индивидуумов и возвращает список значений приспособленности
+    (по умолчанию пакетный populationFitness).
+    Пул создается при первой оценке и переиспользуется между поколениями.
+    max_workers=1 - оценка в текущем процессе без пула.
+    chunksize - сколько индивидуумов уходит в процесс за одну задачу,
+    по умолчанию популяция делится поровну между процессами.
+    cache - FitnessCache, через который проходят все оценки (None - без кэша).
+    """
+
+    def __init__(self, fitness=populationFitness, max_workers=MAX_WORKERS, chunksize=CHUNK_SIZE,
+                 cache=None):
+        self.fitness = fitness
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+        self.cache = cache
+        self._executor = None
+
+    def __call__(self, population):
+        if self.cache is not None:
+            return self.cache.evaluate(population, self._evaluate)
+        return self._evaluate(population)
+
+    def _evaluate(self, population):
+        # В процессы уходят обычные списки генов, без объектов приспособленности
+        population = [list(ind) for ind in population]
+        if self.max_workers == 1 or len(population) < 2:
+            return self.fitness(population)
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        chunksize = self.chunksize or math.ceil(len(population) / self.max_workers)
+        chunks = [population[i:i + chunksize] for i in range(0, len(population), chunksize)]
+        return [value for chunk in self._executor.map(self.fitness, chunks) for value in chunk]
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class Optimizer:
+    """
+    Общий интерфейс оптимизаторов загрузки ГТУ (минимизация затрат).
+
+    Наследник задает start() - начальные точки - и step() - одно поколение (итерацию);
+    run, best и учет оценок общие. evaluate принимает массив векторов генов и возвращает
+    затраты каждого (вектор или список кортежей (значение,), как populationFitness и
+    PopulationEvaluator). Все оценки идут через evaluatePopulation: одинаковые векторы
+    считаются один раз, evaluations - число оцененных векторов (вызовов симулятора),
+    лучший из найденных векторов запоминается.
+    max_evaluations - предел числа оценок (None - без предела).
+    patience - остановка, если столько поколений подряд ни лучшая (за весь расчет), ни
+    средняя по поколению приспособленность не улучшились больше чем на долю tolerance
+    (None - без остановки по застою). time_budget - предел времени расчета в секундах,
+    проверяется после каждого поколения (None - без предела).
+    seed - зерно генератора случайных чисел для воспроизводимого расчета.
+    Причина остановки после run - в stopReason, одна из констант STOP_*.
+    """
+
+    def __init__(self, evaluate=populationFitness, n_genes=ONE_MAX_LENGTH,
+                 generations=MAX_GENERATIONS, bounds=GENE_BOUNDS, decimals=GENE_DECIMALS,
+                 max_evaluations=None, seed=None, patience=None, tolerance=TOLERANCE,
+                 time_budget=None):
+        if patience is not None and patience < 1:
+            raise ValueError(f"patience должно быть не меньше 1: {patience}")
+        self.evaluate = evaluate
+        self.n_genes = n_genes
+        self.generations = generations
+        self.bounds = bounds
+        self.decimals = decimals
+        self.max_evaluations = max_evaluations
+        self.patience = patience
+        self.tolerance = tolerance
+        self.time_budget = time_budget
+        self.rng = np.random.default_rng(seed)
+
+        self.evaluations = 0
+        self.bestGenes = None
+        self.bestFitness = math.inf
+        self.generation = 0
+        self.maxFitnessValues = []   # лучшее (минимальное) значение по поколениям
+        self.meanFitnessValues = []  # среднее значение по поколениям
+        self.stalled = 0  # поколений подряд без улучшения
+        self.previousBest = math.inf  # лучший результат до текущего поколения
+        self.stopReason = None
+        self.startedAt = None
+
+    def randomGenes(self, shape, bounds=None):
+        low, high = bounds or self.bounds
+        return np.round(self.rng.uniform(low, high, shape), self.decimals)
+
+    def clip(self, genes):
+        "Векторы генов в пределах bounds с округлением до decimals знаков"
+        low, high = self.bounds
+        return np.round(np.clip(genes, low, high), self.decimals)
+
+    def evaluatePopulation(self, population):
+        # Повторяющиеся строки (клоны после отбора) считаются один раз. Строки
+        # сортируются lexsort по столбцам: это быстрее np.unique(axis=0)
+        order = np.lexsort(population.T[::-1])
+        ordered = population[order]
+        first = np.ones(len(ordered), dtype=bool)
+        first[1:] = (ordered[1:] != ordered[:-1]).any(axis=1)
+        inverse = np.empty(len(order), dtype=np.intp)
+        inverse[order] = np.cumsum(first) - 1
+
+        unique = ordered[first]
+        values = np.asarray(self.evaluate(unique), dtype=float).reshape(len(unique))
+        self.evaluations += len(unique)
+        best = int(values.argmin())
+        if values[best] < self.bestFitness:
+            self.bestGenes, self.bestFitness = unique[best].copy(), float(values[best])
+        return values[inverse]
+
+    def recordGeneration(self, fitness):
+        bestMean = min(self.meanFitnessValues, default=math.inf)
+        self.generation += 1
+        self.maxFitnessValues.append(float(fitness.min()))
+        self.meanFitnessValues.append(float(fitness.mean()))
+        # Застой: ни лучший найденный результат, ни лучшее среднее не улучшились
+        if (self.improved(self.bestFitness, self.previousBest)
+                or self.improved(self.meanFitnessValues[-1], bestMean)):
+            self.stalled = 0
+        else:
+            self.stalled += 1
+        self.previousBest = self.bestFitness
+
+    def improved(self, value, reference):
+        "value меньше reference больше чем на долю tolerance"
+        if math.isinf(reference):
+            return not math.isinf(value)
+        return value < reference - self.tolerance * abs(reference)
+
+    def start(self):
+        raise NotImplementedError
+
+    def step(self):
+        raise NotImplementedError
+
+    def best(self):
+        "Лучший из найденных векторов генов и его затраты"
+        return self.bestGenes, self.bestFitness
+
+    def finished(self, cancel=None):
+        "Нужно ли остановить расчет; причина записывается в stopReason"
+        if cancel is not None and cancel.is_set():
+            self.stopReason = STOP_CANCELLED
+        elif self.generation >= self.generations:
+            self.stopReason = STOP_GENERATIONS
+        elif self.max_evaluations is not None and self.evaluations >= self.max_evaluations:
+            self.stopReason = STOP_EVALUATIONS
+        elif self.patience is not None and self.stalled >= self.patience:
+            self.stopReason = STOP_STALLED
+        elif (self.time_budget is not None
+              and time.perf_counter() - self.startedAt >= self.time_budget):
+            self.stopReason = STOP_TIME_BUDGET
+        return self.stopReason is not None
+
+    def run(self, callback=None, cancel=None):
+        """
+        Расчет до generations поколений, max_evaluations оценок, застоя на patience
+        поколений или исчерпания time_budget. callback(поколение,
+        лучшая приспособленность поколения, средняя, лучший найденный вектор) вызывается
+        после каждого поколения. cancel - threading.Event: если он установлен, расчет
+        останавливается после текущего поколения. Возвращает (лучший вектор, его затраты).
+        """
+        self.evaluations = 0
+        self.bestGenes, self.bestFitness = None, math.inf
+        self.generation = 0
+        self.maxFitnessValues = []
+        self.meanFitnessValues = []
+        self.stalled = 0
+        self.stopReason = None
+        self.startedAt = time.perf_counter()
+        self.start()
+        self.previousBest = self.bestFitness
+        while not self.finished(cancel):
+            self.step()
+            if callback is not None:
+                callback(self.generation, self.maxFitnessValues[-1],
+                         self.meanFitnessValues[-1], self.bestGenes)
+        return self.best()
+
+
+class GeneticOptimizer(Optimizer):
+    """
+    Генетический алгоритм подбора загрузки ГТУ.
+
+    Популяция - один массив (индивидуумы x гены), приспособленность - вектор.
+    Отбор турниром, одноточечное скрещивание соседних пар и мутация генов делаются
+    операциями над всей популяцией сразу, без объектов на каждого индивидуума и без
+    копирования потомков поштучно. Вне оценки приспособленности поколение стоит
+    несколько операций numpy даже для популяций в десятки тысяч.
+
+    Элитизм: elite лучших индивидуумов переходят в следующее поколение без изменений
+    и повторно не оцениваются, остальные места занимают потомки. Лучший результат
+    поколения поэтому не ухудшается. По умолчанию рассчитываются все generations
+    поколений; остановка при застое включается явно, например patience=PATIENCE.
+    """
+
+    def __init__(self, evaluate=populationFitness, n_genes=ONE_MAX_LENGTH,
+                 population_size=POPULATION_SIZE, generations=MAX_GENERATIONS,
+                 bounds=GENE_BOUNDS, mutation_bounds=MUTATION_BOUNDS,
+                 p_crossover=P_CROSSOVER, p_mutation=P_MUTATION, indpb=None,
+                 tournament_size=TOURNAMENT_SIZE, decimals=GENE_DECIMALS, elite=ELITE_SIZE,
+                 max_evaluations=None, seed=None, patience=None, tolerance=TOLERANCE,
+                 time_budget=TIME_BUDGET):
+        if population_size < 2:
+            raise ValueError(f"В популяции должно быть не меньше 2 индивидуумов: {population_size}")
+        if n_genes < 2:
+            raise ValueError(f"Для скрещивания нужно не меньше 2 генов: {n_genes}")
+        if not 0 <= elite < population_size:
+            raise ValueError(
+                f"Размер элиты должен быть от 0 до {population_size - 1}: {elite}")
+        super().__init__(evaluate, n_genes, generations, bounds, decimals, max_evaluations, seed,
+                         patience, tolerance, time_budget)
+        self.population_size = population_size
+        self.elite = elite
+        self.mutation_bounds = mutation_bounds
+        self.p_crossover = p_crossover
+        self.p_mutation = p_mutation
+        self.indpb = 1.0 / n_genes if indpb is None else indpb  # вероятность мутации гена
+        self.tournament_size = tournament_size
+
+        self.population = np.empty((0, n_genes))
+        self.fitness = np.empty(0)
+
+    def select(self, population, fitness, n=None):
+        """
+        Турнирный отбор n победителей (по умолчанию - размер популяции). Участники каждого
+        турнира - tournament_size случайных индивидуумов из всей популяции
+        """
+        n = len(population) if n is None else n
+        contenders = self.rng.integers(0, len(population), (n, self.tournament_size))
+        winners = contenders[np.arange(n), fitness[contenders].argmin(axis=1)]
+        return population[winners]
+
+    def crossover(self, offspring):
+        "Одноточечное скрещивание пар (0, 1), (2, 3), ...: обмен хвостами после точки разреза"
+        pairs = len(offspring) // 2
+        # Точка разреза от 2 до n_genes - 3 включительно (для коротких векторов - любая)
+        low, high = (2, self.n_genes - 3) if self.n_genes >= 5 else (1, self.n_genes - 1)
+        cut = self.rng.integers(low, high + 1, pairs)
+        mate = self.rng.random(pairs) < self.p_crossover
+        swap = mate[:, None] & (np.arange(self.n_genes) >= cut[:, None])
+
+        first, second = offspring[0:2 * pairs:2], offspring[1:2 * pairs:2]
+        offspring[0:2 * pairs:2] = np.where(swap, second, first)
+        offspring[1:2 * pairs:2] = np.where(swap, first, second)
+        return offspring
+
+    def mutate(self, offspring):
+        "Мутация: у индивидуума с вероятностью p_mutation каждый ген с вероятностью indpb"
+        n = len(offspring)
+        mutant = self.rng.random(n) < self.p_mutation
+        genes = mutant[:, None] & (self.rng.random((n, self.n_genes)) < self.indpb)
+        return np.where(genes, self.randomGenes((n, self.n_genes), self.mutation_bounds), offspring)
+
+    def start(self):
+        "Начальная популяция и ее оценка"
+        self.population = self.randomGenes((self.population_size, self.n_genes))
+        self.fitness = self.evaluatePopulation(self.population)
+
+    def step(self):
+        "Одно поколение: элита, отбор, скрещивание, мутация, оценка потомков"
+        elite = np.argsort(self.fitness, kind="stable")[:self.elite]
+        offspring = self.select(self.population, self.fitness, self.population_size - self.elite)
+        offspring = self.mutate(self.crossover(offspring))
+        self.population = np.vstack([self.population[elite], offspring])
+        self.fitness = np.concatenate([self.fitness[elite], self.evaluatePopulation(offspring)])
+        self.recordGeneration(self.fitness)
+
+
+def printGeneration(generation, maxFitness, meanFitness, best):
+    print(
+        f"Поколение {generation}: Макс приспособ. = {maxFitness}, Средняя приспособ.= {meanFitness}")
+    print("Лучший индивидуум = ", *best.tolist(), "\n")
 
 
-while generationCounter < MAX_GENERATIONS:
-    generationCounter += 1
-    offspring = selTournament(population, len(population))
-    offspring = list(map(clone, offspring))
+def main():
+    # Запуск генетического алгоритма: python -m Optimization
+    # Только из __main__: дочерние процессы пула импортируют этот модуль заново
+    with PopulationEvaluator(cache=FitnessCache()) as evaluate:
+        optimizer = GeneticOptimizer(evaluate, patience=PATIENCE)
+        optimizer.run(callback=printGeneration)
 
-    for child1, child2 in zip(offspring[::2], offspring[1::2]):
-        if random.random() < P_CROSSOVER:
-            cxOnePoint(child1, child2)
+        print(f"Остановка: {optimizer.stopReason}, поколений {optimizer.generation}, "
+              f"оценок {optimizer.evaluations}")
 
-    for mutant in offspring:
-        if random.random() < P_MUTATION:
-            mutFlipBit(mutant, indpb=1.0/ONE_MAX_LENGTH)
+        print(
+            f"Кэш приспособленности: попаданий {evaluate.cache.hits}, промахов {evaluate.cache.misses}")
 
-    freshFitnessValues = list(map(oneMaxFitness, offspring))
-    for individual, fitnessValue in zip(offspring, freshFitnessValues):
-        individual.fitness.values = fitnessValue
+    plotFitness(optimizer.maxFitnessValues, optimizer.meanFitnessValues)
 
-    population[:] = offspring
 
-    fitnessValues = [ind.fitness.values[0] for ind in population]
+def plotFitness(maxFitnessValues, meanFitnessValues):
+    # matplotlib импортируется только при построении графика
+    from matplotlib import pyplot as plt
 
-    maxFitness = min(fitnessValues)
-    meanFitness = sum(fitnessValues) / len(population)
-    maxFitnessValues.append(maxFitness)
-    meanFitnessValues.append(meanFitness)
-    print(
-        f"Поколение {generationCounter}: Макс приспособ. = {maxFitness}, Средняя приспособ.= {meanFitness}")
+    plt.plot(maxFitnessValues, color='red')
+    plt.plot(meanFitnessValues, color='green')
+    plt.xlabel('Поколение')
+    plt.ylabel('Макс/средняя приспособленность')
+    plt.title('Зависимость максимальной и средней приспособленности от поколения')
+    plt.show()
 
-    best_index = fitnessValues.index(min(fitnessValues))
-    print("Лучший индивидуум = ", *population[best_index], "\n")
 
-plt.plot(maxFitnessValues, color='red')
-plt.plot(meanFitnessValues, color='green')
-plt.xlabel('Поколение')
-plt.ylabel('Макс/средняя приспособленность')
-plt.title('Зависимость максимальной и средней приспособленности от поколения')
-plt.show()
+if __name__ == "__main__":
+    main()
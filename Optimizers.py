@@ -0,0 +1,209 @@
+# файл: Optimizers.py
+
+import math
+
+import numpy as np
+
+from Optimization import (GENE_DECIMALS, MAX_GENERATIONS, ONE_MAX_LENGTH, TOLERANCE,
+                          GeneticOptimizer, Optimizer, populationFitness)
+
+# Область поиска загрузки ГТУ для CMA-ES и суррогатной модели: от нижней границы начальной
+# популяции ГА до верхней границы мутации ГА
+SEARCH_BOUNDS = (0.5, 1.1)
+MAX_EVALUATIONS = 150   # предел оценок (вызовов симулятора) по умолчанию для стратегий ниже
+
+
+class CMAESOptimizer(Optimizer):
+    """
+    CMA-ES: эволюционная стратегия с адаптацией ковариационной матрицы
+    (по Hansen, "The CMA Evolution Strategy: A Tutorial").
+
+    Каждое поколение - population_size векторов из нормального распределения вокруг
+    текущего среднего. Среднее смещается к взвешенным лучшим mu векторам, матрица
+    ковариаций и шаг sigma подстраиваются по пути успешных шагов. Векторы приводятся к
+    bounds и сетке decimals до оценки, обновление ведется по приведенным векторам.
+    Стратегия ранговая, поэтому масштаб затрат не важен.
+    """
+
+    def __init__(self, evaluate=populationFitness, n_genes=ONE_MAX_LENGTH, population_size=None,
+                 generations=MAX_GENERATIONS, bounds=SEARCH_BOUNDS, decimals=GENE_DECIMALS,
+                 sigma=None, mean=None, max_evaluations=MAX_EVALUATIONS, seed=None,
+                 patience=None, tolerance=TOLERANCE, time_budget=None):
+        super().__init__(evaluate, n_genes, generations, bounds, decimals, max_evaluations, seed,
+                         patience, tolerance, time_budget)
+        low, high = bounds
+        n = n_genes
+        self.population_size = population_size or 4 + int(3 * math.log(n))
+        self.mu = self.population_size // 2
+        weights = math.log(self.mu + 0.5) - np.log(np.arange(1, self.mu + 1))
+        self.weights = weights / weights.sum()
+        self.mueff = 1 / (self.weights ** 2).sum()
+
+        # Параметры адаптации (значения по умолчанию из руководства)
+        self.cc = (4 + self.mueff / n) / (n + 4 + 2 * self.mueff / n)
+        self.cs = (self.mueff + 2) / (n + self.mueff + 5)
+        self.c1 = 2 / ((n + 1.3) ** 2 + self.mueff)
+        self.cmu = min(1 - self.c1,
+                       2 * (self.mueff - 2 + 1 / self.mueff) / ((n + 2) ** 2 + self.mueff))
+        self.damps = 1 + 2 * max(0.0, math.sqrt((self.mueff - 1) / (n + 1)) - 1) + self.cs
+        self.chiN = math.sqrt(n) * (1 - 1 / (4 * n) + 1 / (21 * n ** 2))
+
+        self.initial_sigma = sigma or 0.3 * (high - low)
+        self.initial_mean = mean
+
+    def start(self):
+        n = self.n_genes
+        low, high = self.bounds
+        self.mean = (np.full(n, (low + high) / 2) if self.initial_mean is None
+                     else np.asarray(self.initial_mean, dtype=float).copy())
+        self.sigma = self.initial_sigma
+        self.C = np.eye(n)
+        self.pc = np.zeros(n)
+        self.ps = np.zeros(n)
+
+    def step(self):
+        n = self.n_genes
+        # Собственные векторы B и корни собственных чисел D матрицы C
+        eigenvalues, B = np.linalg.eigh(self.C)
+        D = np.sqrt(np.maximum(eigenvalues, 1e-20))
+        z = self.rng.standard_normal((self.population_size, n))
+        candidates = self.clip(self.mean + self.sigma * (z * D) @ B.T)
+        fitness = self.evaluatePopulation(candidates)
+        self.recordGeneration(fitness)
+
+        y = (candidates - self.mean) / self.sigma
+        y_w = self.weights @ y[np.argsort(fitness)[:self.mu]]
+        self.mean = self.mean + self.sigma * y_w
+
+        invsqrtC = (B / D) @ B.T
+        self.ps = (1 - self.cs) * self.ps + math.sqrt(self.cs * (2 - self.cs) * self.mueff) * (invsqrtC @ y_w)
+        hsig = (np.linalg.norm(self.ps) / math.sqrt(1 - (1 - self.cs) ** (2 * self.generation))
+                / self.chiN) < 1.4 + 2 / (n + 1)
+        self.pc = (1 - self.cc) * self.pc + hsig * math.sqrt(self.cc * (2 - self.cc) * self.mueff) * y_w
+
+        best = y[np.argsort(fitness)[:self.mu]]
+        self.C = ((1 - self.c1 - self.cmu) * self.C
+                  + self.c1 * (np.outer(self.pc, self.pc)
+                               + (1 - hsig) * self.cc * (2 - self.cc) * self.C)
+                  + self.cmu * (best.T * self.weights) @ best)
+        self.C = (self.C + self.C.T) / 2
+        self.sigma *= math.exp((self.cs / self.damps) * (np.linalg.norm(self.ps) / self.chiN - 1))
+
+
+class SurrogateOptimizer(Optimizer):
+    """
+    Поиск с суррогатной моделью: по уже оцененным векторам строится дешевая регрессия
+    затрат (квадратичная, с гребневой регуляризацией), и симулятор считает только
+    самых перспективных по ней кандидатов.
+
+    Начало - initial_samples случайных векторов. Каждое поколение генерирует candidates
+    кандидатов вокруг лучших найденных векторов (нормальные отклонения с масштабом
+    radius), часть - равномерно по всей области. Кандидаты ранжируются моделью, batch_size
+    лучших из еще не оцененных отправляются в симулятор. Если лучший результат не
+    улучшился, radius уменьшается (доверительная область), при вырождении - сбрасывается.
+    """
+
+    def __init__(self, evaluate=populationFitness, n_genes=ONE_MAX_LENGTH,
+                 generations=MAX_GENERATIONS, bounds=SEARCH_BOUNDS, decimals=GENE_DECIMALS,
+                 initial_samples=None, batch_size=4, candidates=2000, elite=5, radius=0.15,
+                 ridge=1e-6, max_evaluations=MAX_EVALUATIONS, seed=None, patience=None,
+                 tolerance=TOLERANCE, time_budget=None):
+        super().__init__(evaluate, n_genes, generations, bounds, decimals, max_evaluations, seed,
+                         patience, tolerance, time_budget)
+        self.initial_samples = initial_samples or 2 * n_genes + 1
+        self.batch_size = batch_size
+        self.candidates = candidates
+        self.elite = elite
+        self.initial_radius = radius
+        self.ridge = ridge
+
+    def start(self):
+        self.radius = self.initial_radius
+        self.X = self.randomGenes((self.initial_samples, self.n_genes))
+        self.y = self.evaluatePopulation(self.X)
+
+    def features(self, X):
+        "Признаки регрессии: 1, x, x^2 и попарные произведения, когда данных достаточно"
+        low, high = self.bounds
+        u = (X - low) / (high - low)  # Масштаб [0, 1] для устойчивости
+        columns = [np.ones((len(u), 1)), u, u ** 2]
+        n_full = 1 + 2 * self.n_genes + self.n_genes * (self.n_genes - 1) // 2
+        if len(self.X) >= 2 * n_full:
+            i, j = np.triu_indices(self.n_genes, 1)
+            columns.append(u[:, i] * u[:, j])
+        return np.hstack(columns)
+
+    def fit(self):
+        "Коэффициенты гребневой регрессии по всем оцененным векторам"
+        A = self.features(self.X)
+        scale = self.y.std() or 1.0
+        target = (self.y - self.y.mean()) / scale
+        coefficients = np.linalg.solve(A.T @ A + self.ridge * len(A) * np.eye(A.shape[1]),
+                                       A.T @ target)
+        return lambda X: self.features(X) @ coefficients
+
+    def propose(self):
+        "Кандидаты: вокруг лучших найденных векторов и (четверть) равномерно по области"
+        low, high = self.bounds
+        elite = self.X[np.argsort(self.y)[:self.elite]]
+        n_local = self.candidates - self.candidates // 4
+        centers = elite[self.rng.integers(0, len(elite), n_local)]
+        local = centers + self.rng.normal(0.0, self.radius * (high - low),
+                                          (n_local, self.n_genes))
+        spread = self.rng.uniform(low, high, (self.candidates - n_local, self.n_genes))
+        return self.clip(np.vstack([local, spread]))
+
+    def step(self):
+        candidates = np.unique(self.propose(), axis=0)
+        # Уже оцененные векторы повторно не считаются
+        known = {row.tobytes() for row in self.X}
+        candidates = candidates[[row.tobytes() not in known for row in candidates]]
+        if not len(candidates):
+            self.radius = self.initial_radius
+            self.recordGeneration(self.y)
+            return
+
+        predicted = self.fit()(candidates)
+        batch = candidates[np.argsort(predicted)[:self.batch_size]]
+        previous_best = self.bestFitness
+        fitness = self.evaluatePopulation(batch)
+        self.X = np.vstack([self.X, batch])
+        self.y = np.concatenate([self.y, fitness])
+        self.recordGeneration(fitness)
+
+        if self.bestFitness >= previous_best:
+            self.radius *= 0.7
+            if self.radius < 10 ** -self.decimals:
+                self.radius = self.initial_radius
+
+
+# Доступные оптимизаторы: имя -> класс. У всех общий интерфейс Optimizer
+OPTIMIZERS = {
+    "ga": GeneticOptimizer,
+    "cmaes": CMAESOptimizer,
+    "surrogate": SurrogateOptimizer,
+}
+
+
+def createOptimizer(name, evaluate=populationFitness, **kwargs):
+    "Оптимизатор по имени из OPTIMIZERS, kwargs передаются в конструктор"
+    if name not in OPTIMIZERS:
+        raise ValueError(f"Неизвестный оптимизатор: {name}. Доступны: {', '.join(OPTIMIZERS)}")
+    return OPTIMIZERS[name](evaluate, **kwargs)
+
+
+def main():
+    # Сравнение оптимизаторов по затратам и числу вызовов симулятора: python -m Optimizers
+    for name in OPTIMIZERS:
+        results = []
+        for seed in range(5):
+            optimizer = createOptimizer(name, seed=seed)
+            _, cost = optimizer.run()
+            results.append((cost, optimizer.evaluations))
+        costs, evaluations = zip(*results)
+        print(f"{name:<10} затраты: лучшие {min(costs):.2f}, средние {np.mean(costs):.2f} руб.; "
+              f"оценок в среднем {np.mean(evaluations):.0f}")
+
+
+if __name__ == "__main__":
+    main()
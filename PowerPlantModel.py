@@ -1,24 +1,215 @@
 import datetime
+import heapq
+import json
+import logging
+import os
+from collections import OrderedDict
+import math
+
+import numpy as np
+
+from SegmentEngine import horizon_hours, salary_months
+
+# Сообщения о выводе ГТУ в КР (уровень DEBUG): движки не пишут в консоль
+logger = logging.getLogger(__name__)
+
+# Коды состояний ГТУ для векторного движка. В объектах GTU статус по-прежнему строка
+STATUS_WORKING = 0
+STATUS_HOT_RESERVE = 1
+STATUS_COLD_RESERVE = 2
+STATUS_TO = 3
+STATUS_KR = 4
+
+STATUS_CODES = {
+    "работает": STATUS_WORKING,
+    "горячий_резерв": STATUS_HOT_RESERVE,
+    "холодный_резерв": STATUS_COLD_RESERVE,
+    "ТО": STATUS_TO,
+    "КР": STATUS_KR,
+}
+STATUS_NAMES = {code: name for name, code in STATUS_CODES.items()}
+
+# Максимальная длина блока часов, который векторный движок считает за один раз
+NUMPY_MAX_BLOCK_HOURS = 24 * 366
+# До стольких ГТУ почасовой шаг считает ГТУ в цикле по спискам, для больших парков -
+# операциями над массивами FleetState
+SCALAR_STEP_MAX_GTU = 40
+# Версия формата контрольной точки (save_checkpoint/load_checkpoint)
+CHECKPOINT_FORMAT = "GTES-checkpoint-2"
+# Номер часа "никогда" для ГТУ, которые не стоят на обслуживании
+NO_EVENT_HOUR = np.iinfo(np.int64).max
+
+
+def _binade_step(value, step):
+    """
+    Одно прибавление step к value и приращение, которое будут давать следующие
+    прибавления, пока сумма не выйдет из своего двоичного порядка [top / 2, top).
+    Внутри порядка шаг сетки чисел (ulp) один, value на этой сетке, поэтому округление
+    value + step всегда одно и то же. Возвращает (сумма, приращение или None, top);
+    None - если value еще в младшем порядке или округление step попадает на середину
+    шага сетки (тогда оно зависит от четности value).
+    """
+    result = value + step
+    ulp = math.ulp(result)
+    top = ulp * 2.0 ** 53
+    if value >= top / 2 and math.fmod(step, ulp) != ulp / 2:
+        return result, result - value, top
+    return result, None, top
+
+
+def _binade_steps(value, increment, top):
+    # Сколько еще прибавлений increment оставляют value ниже top (точные числа сетки)
+    count = max(0, int((top - value) / increment) - 2)
+    while value + (count + 1) * increment < top:
+        count += 1
+    return count
+
+
+def sequential_sum(value, step, k):
+    """
+    value после k прибавлений step (> 0) по одному, с округлением после каждого, как
+    в почасовом цикле (x += step). Совпадает с np.add.accumulate бит в бит, но внутри
+    каждого двоичного порядка приращение постоянно, и прибавления считаются умножением.
+    """
+    while k > 0:
+        value, increment, top = _binade_step(value, step)
+        k -= 1
+        if increment and k:
+            count = min(k, _binade_steps(value, increment, top))
+            value += count * increment
+            k -= count
+    return value
+
+
+def steps_to_reach(value, step, threshold):
+    "Наименьшее число прибавлений step (> 0) по одному, после которого value >= threshold (не меньше 1)"
+    count = 0
+    while True:
+        value, increment, top = _binade_step(value, step)
+        count += 1
+        if value >= threshold:
+            return count
+        if increment:
+            limit = _binade_steps(value, increment, top)
+            need = max(1, math.ceil((threshold - value) / increment) - 1)
+            while need > 1 and value + (need - 1) * increment >= threshold:
+                need -= 1
+            while need <= limit and value + need * increment < threshold:
+                need += 1
+            if need <= limit:
+                return count + need
+            value += limit * increment
+            count += limit
+
+
+class FleetState:
+    """
+    Состояние парка ГТУ в виде структуры массивов: по одному типизированному массиву на
+    каждое поле, элемент j относится к j-й ГТУ. Статусы хранятся целыми кодами STATUS_*,
+    моменты окончания обслуживания - datetime64 (NaT, если не заданы). Объекты GTU -
+    легкие представления одной позиции этих массивов.
+    """
+
+    float_fields = ("average_load_factor", "total_run_hours", "run_hours", "hours_since_kr",
+                    "downtime_hours", "maintenance_cost")
+    int_fields = ("to_counter", "kr_counter")
+    time_fields = ("next_to", "next_kr", "end_maintenance")
+    __slots__ = float_fields + int_fields + time_fields + ("status", "size")
+
+    def __init__(self, size):
+        self.size = size
+        for field in self.float_fields:
+            setattr(self, field, np.zeros(size))
+        self.average_load_factor[:] = np.nan  # Загрузка не задана
+        for field in self.int_fields:
+            setattr(self, field, np.zeros(size, dtype=np.int64))
+        for field in self.time_fields:
+            setattr(self, field, np.full(size, np.datetime64("NaT"), dtype="datetime64[s]"))
+        self.status = np.full(size, STATUS_WORKING, dtype=np.int8)
+
+    def __len__(self):
+        return self.size
+
+
+# Все поля FleetState, которые хранят состояние ГТУ (сохраняются в контрольной точке)
+FLEET_FIELDS = (FleetState.float_fields + FleetState.int_fields + FleetState.time_fields
+                + ("status",))
+
+
+def _fleet_number(field, kind):
+    def get(self):
+        return kind(getattr(self.fleet, field)[self.index])
+
+    def set(self, value):
+        getattr(self.fleet, field)[self.index] = value
+
+    return property(get, set)
+
+
+def _fleet_time(field):
+    def get(self):
+        moment = getattr(self.fleet, field)[self.index]
+        return None if np.isnat(moment) else moment.astype(datetime.datetime)
+
+    def set(self, value):
+        getattr(self.fleet, field)[self.index] = np.datetime64(value or "NaT", "s")
+
+    return property(get, set)
 
 
 class GTU:
-    def __init__(self, id, specs, average_load_factor=None):
+    """
+    Одна ГТУ парка. Сами значения лежат в массивах FleetState (fleet, позиция index),
+    объект только дает к ним доступ по именам полей. Без fleet создается свой парк из одной ГТУ.
+    """
+
+    __slots__ = ("id", "specs", "fleet", "index")
+
+    def __init__(self, id, specs, average_load_factor=None, fleet=None, index=0):
         # Идентификатор для обращения к ГТУ (задача загрузки в том числе)
         self.id = id
         self.specs = specs  # Задает словарь характеристик, как в ТЗ
+        self.fleet = FleetState(1) if fleet is None else fleet
+        self.index = 0 if fleet is None else index
         self.average_load_factor = average_load_factor  # Как раз коэф загрузки от 0 до 1
-        self.total_run_hours = 0  # Общее время работы ГТУ
-        # Время с последнего ТО. После ТО оно сбрасывается и также увеличивает число ТО на 1
-        self.run_hours = 0
-        self.hours_since_kr = 0  # Время с последнего КР, аналогично ТО
-        self.status = "работает"  # Начальное положение всех ГТУ не в резерве для слежения
-        self.next_to = None  # Дата следующегго ТО, задается по моточасам в симуляции
-        self.next_kr = None  # Аналогично КР
-        self.end_maintenance = None  # Окончание обслуживания
-        self.to_counter = 0    # Счетчик ТО
-        self.kr_counter = 0    # Счетчик КР
-        self.downtime_hours = 0  # Общее время простоя в часах
-        self.maintenance_cost = 0.0  # Расходы на ТО и КР ГТУ
+
+    total_run_hours = _fleet_number("total_run_hours", float)  # Общее время работы ГТУ
+    # Время с последнего ТО. После ТО оно сбрасывается и также увеличивает число ТО на 1
+    run_hours = _fleet_number("run_hours", float)
+    hours_since_kr = _fleet_number("hours_since_kr", float)  # Время с последнего КР, аналогично ТО
+    to_counter = _fleet_number("to_counter", int)    # Счетчик ТО
+    kr_counter = _fleet_number("kr_counter", int)    # Счетчик КР
+    downtime_hours = _fleet_number("downtime_hours", float)  # Общее время простоя в часах
+    maintenance_cost = _fleet_number("maintenance_cost", float)  # Расходы на ТО и КР ГТУ
+    next_to = _fleet_time("next_to")  # Дата следующегго ТО, задается по моточасам в симуляции
+    next_kr = _fleet_time("next_kr")  # Аналогично КР
+    end_maintenance = _fleet_time("end_maintenance")  # Окончание обслуживания
+
+    @property
+    def average_load_factor(self):
+        value = float(self.fleet.average_load_factor[self.index])
+        return None if math.isnan(value) else value
+
+    @average_load_factor.setter
+    def average_load_factor(self, value):
+        self.fleet.average_load_factor[self.index] = np.nan if value is None else value
+
+    @property
+    def status_code(self):
+        # Код статуса STATUS_*, в расчетах сравнивается он, а не строка
+        return int(self.fleet.status[self.index])
+
+    @status_code.setter
+    def status_code(self, code):
+        self.fleet.status[self.index] = code
+
+    @property
+    def status(self):
+        return STATUS_NAMES[self.status_code]
+
+    @status.setter
+    def status(self, name):
+        self.status_code = STATUS_CODES[name]
 
     def __repr__(self):  # Функция для выдачи информации об конкретном ГТУ
         return f"GTU(ID: {self.id}, Status: {self.status}, Total Run Hours: {self.total_run_hours}, Run Hours: {self.run_hours}, Load: {self.average_load_factor}, TO: {self.to_counter}, KR: {self.kr_counter}, Downtime: {self.downtime_hours}, Maintenance Cost: {self.maintenance_cost})"
@@ -26,20 +217,52 @@ class GTU:
 
 class GTESModel:
     prise_per_MW = 5.6
+    to_duration = datetime.timedelta(hours=3*24)  # Время ТО принял 3 дня, меняется легко
+    kr_duration = datetime.timedelta(hours=7*24)  # 7 дней
+    personnel_salary = 150000 * 20  # Зарплата 20 человек в месяц
+    # Удельный расход ПНГ, м3 на МВт*ч (при КПД ГТУ около 35%). Можно задать в gtu_specs
+    # ключом 'удельный_расход_топлива'
+    fuel_per_MWh = 300
+    # "loop" - эталонный почасовой цикл по объектам GTU, "numpy" - векторный движок,
+    # "event" - событийный движок (переход от одного ТО/КР/возврата в строй к следующему)
+    engines = ("loop", "numpy", "event")
+    # Фазы расчета для Profiling: (название, класс, метод)
+    profile_phases = (
+        ("час: наработка и проверки", "GTESModel", "step"),
+        ("наработка часа (массивы)", "GTESModel", "_accrue_arrays"),
+        ("вывод в ТО/КР", "GTESModel", "perform_maintenance"),
+        ("выбор горячего резерва", "GTESModel", "assign_hot_reserve"),
+        ("выбор холодного резерва", "GTESModel", "assign_cold_reserve"),
+        ("возврат в строй", "GTESModel", "update_status"),
+        ("распределение нагрузки", "GTESModel", "dispatch"),
+        ("выработка по запросу", "GTESModel", "generate"),
+        ("выработка блоком до события", "GTESModel", "_advance_block"),
+        ("движок numpy", "GTESModel", "_simulate_numpy"),
+        ("движок event", "GTESModel", "_simulate_event"),
+        ("выбор резерва (массивы)", "GTESModel", "_pick_reserve"),
+        ("итоги по ГТУ", "GTESModel", "_finish_fleet_run"),
+        ("контрольная точка", "GTESModel", "save_checkpoint"),
+    )
 
-    def __init__(self, gtu_specs, load_factors):
+    def __init__(self, gtu_specs, load_factors, engine="loop"):
+        if engine not in self.engines:
+            raise ValueError(
+                f"Неизвестный движок моделирования: {engine}. Доступны: {', '.join(self.engines)}")
+        self.engine = engine
         self.gtu_specs = gtu_specs  # Сохраняет значения параметров ГТУ в системе ГТЭС
-        self.gtus = [GTU(i, gtu_specs, load_factors[i]) for i in range(
-            # Создает в модели отдельные объекты ГТУ с уникальными ID
+        # Состояние всех ГТУ в массивах, объекты GTU с уникальными ID - представления его позиций
+        self.fleet = FleetState(gtu_specs['кол-во'])
+        self.gtus = [GTU(i, gtu_specs, load_factors[i], self.fleet, i) for i in range(
             gtu_specs['кол-во'])]
         self.hot_reserve = None  # Горячий резерв
         self.cold_reserve = None  # Холодный резерв
         self.total_energy_generated = 0.0
         self.start_date = None  # Начало моделирования
         self.end_date = None
+        self.last_month = None  # Месяц последнего начисления зарплаты
+        self.current_time = None  # Первый еще не рассчитанный час
 
-        # Эксплуатационные расходы
-        self.personnel_salary = 150000 * 20  # Зарплата 20 человек в месяц
+        # Эксплуатационные расходы, зарплата персонала - personnel_salary класса
         self.total_salary_cost = 0.0  # Общие расходы на зарплату
         self.total_maintenance_cost = 0.0  # Общие расходы на ТО и КР
 
@@ -49,36 +272,28 @@ class GTESModel:
 
     def assign_hot_reserve(self):
         # Выбор горячего резерва. Я выбрал условие по загрузке выше 0 но ниже 0,15
-        eligible_gtus = [gtu for gtu in self.gtus if gtu.status == "работает" and 0 <
-                         # Выбор ГТУ в резерв, оно работает и слабо загружено
-                         gtu.average_load_factor < 0.15]
-        if eligible_gtus:
-            # выбираем минимально отработавший резерв
-            self.hot_reserve = min(
-                eligible_gtus, key=lambda x: x.total_run_hours)
-            self.hot_reserve.status = "горячий_резерв"
-        else:
-            self.hot_reserve = None
+        fleet = self.fleet
+        # Выбор ГТУ в резерв, оно работает и слабо загружено
+        eligible = ((fleet.status == STATUS_WORKING) & (0 < fleet.average_load_factor)
+                    & (fleet.average_load_factor < 0.15))
+        # выбираем минимально отработавший резерв
+        j = self._pick_reserve(fleet.status, fleet.total_run_hours, eligible, STATUS_HOT_RESERVE)
+        self.hot_reserve = self.gtus[j] if j is not None else None
 
     def assign_cold_reserve(self):
         # Тут холодный резерв. Все аналогично, но загрузка в простое 0
-        eligible_gtus = [gtu for gtu in self.gtus if gtu.status ==
-                         "работает" and gtu.average_load_factor == 0]
-        if eligible_gtus:
-            self.cold_reserve = min(
-                eligible_gtus, key=lambda x: x.total_run_hours)
-            self.cold_reserve.status = "холодный_резерв"
-        else:
-            self.cold_reserve = None
+        fleet = self.fleet
+        eligible = (fleet.status == STATUS_WORKING) & (fleet.average_load_factor == 0)
+        j = self._pick_reserve(fleet.status, fleet.total_run_hours, eligible, STATUS_COLD_RESERVE)
+        self.cold_reserve = self.gtus[j] if j is not None else None
 
     def perform_maintenance(self, gtu, current_time):
         # Перевод ГТУ на ТО или КР
-        if gtu.run_hours >= self.gtu_specs['ТО_периодичность'] and gtu.status == "работает":
+        if gtu.run_hours >= self.gtu_specs['ТО_периодичность'] and gtu.status_code == STATUS_WORKING:
             # Визуализация вывода в ТО
             # print(f"GTU {gtu.id} уходит на ТО в {current_time}")
-            gtu.status = "ТО"
-            # Время ТО принял 3 дня, меняется легко
-            to_duration = datetime.timedelta(hours=3*24)
+            gtu.status_code = STATUS_TO
+            to_duration = self.to_duration
             gtu.end_maintenance = current_time + to_duration  # Время завершения ТО
             gtu.next_to = current_time + to_duration
 
@@ -92,10 +307,10 @@ class GTESModel:
 
             return True
         # Все аналогично для КР
-        elif gtu.hours_since_kr >= self.gtu_specs['КР_периодичность'] and gtu.status == "работает":
-            print(f"GTU {gtu.id} уходит на КР в {current_time}")
-            gtu.status = "КР"
-            kr_duration = datetime.timedelta(hours=7*24)  # 7 дней
+        elif gtu.hours_since_kr >= self.gtu_specs['КР_периодичность'] and gtu.status_code == STATUS_WORKING:
+            logger.debug("GTU %s уходит на КР в %s", gtu.id, current_time)
+            gtu.status_code = STATUS_KR
+            kr_duration = self.kr_duration
             gtu.end_maintenance = current_time + kr_duration
             gtu.next_kr = current_time + kr_duration
             gtu.downtime_hours += kr_duration.total_seconds() / 3600
@@ -108,9 +323,9 @@ class GTESModel:
 
     def update_status(self, gtu, current_time):
         # Проверка времени ТО и КР, возвращение в эксплуатацию
-        if gtu.status in ["ТО", "КР"] and current_time >= gtu.end_maintenance:
+        if gtu.status_code >= STATUS_TO and current_time >= gtu.end_maintenance:
             # print(f"GTU {gtu.id} возвращается в строй в {current_time}")
-            gtu.status = "работает"
+            gtu.status_code = STATUS_WORKING
             gtu.next_to = None
             gtu.next_kr = None
             gtu.end_maintenance = None
@@ -118,63 +333,45 @@ class GTESModel:
             return True
         return False
 
-    def simulate(self, start_date, end_date):  # Собстна, сама симуляция
+    def simulate(self, start_date, end_date, checkpoint_path=None, checkpoint_hours=None):  # Собстна, сама симуляция
         self.start_date = start_date
         self.end_date = end_date
-        current_time = start_date
-        last_month = None
+        self.current_time = start_date
+        self.last_month = None
+        return self.resume(end_date, checkpoint_path, checkpoint_hours)
 
-        while current_time <= end_date:  # Расчет электроэнергии и времени работы
-            for gtu in self.gtus:
-                if gtu.status == "работает" or gtu.status == "горячий_резерв":
-                    hours_this_step = 1  # Шаг моделирования, 1 час по ТЗ
-                    # Для моточасов я учел как произведение времени в часах на коэф загрузки
-                    effective_hours = gtu.average_load_factor * hours_this_step
-                    gtu.total_run_hours += effective_hours  # Общее время работы
-                    gtu.run_hours += effective_hours  # Время с ТО
-                    gtu.hours_since_kr += effective_hours  # Время с КР
-                    if gtu.status == "работает":
-                        # Проверка статуса и вычисление выработанной энергии
-                        self.total_energy_generated += gtu.specs['мощность'] * \
-                            gtu.average_load_factor * hours_this_step
-                    elif gtu.status == "горячий_резерв":
-                        self.total_energy_generated += gtu.specs['мощность'] * \
-                            gtu.average_load_factor * hours_this_step
-
-            # Проверка статуса ТО и КР, ввод резервов
-            need_maintenance = []  # Список ГТУ ТО и КР
-            for gtu in self.gtus:
-                if self.perform_maintenance(gtu, current_time):
-                    need_maintenance.append(gtu)
-
-            hot_reserve_used = False  # Ограничение для разового использования горячего резерва
-            for gtu in need_maintenance:
-                if not hot_reserve_used and self.hot_reserve and self.hot_reserve.status == "горячий_резерв":
-                    # print(f"  Замена GTU {gtu.id} на GTU {self.hot_reserve.id} (горячий резерв)")
-                    self.hot_reserve.status = "работает"
-                    hot_reserve_used = True  # На этом шаге больше нельзя использовать резерв после ввода ТО
-                    self.assign_hot_reserve()  # Поиск иных резервов
-
-                # Если горячий использован, вводим холодный
-                elif self.cold_reserve and self.cold_reserve.status == 'холодный_резерв':
-                    # print(f"  Замена GTU {gtu.id} на GTU {self.cold_reserve.id} (холодный резерв)")
-                    self.cold_reserve.status = "работает"
-                    self.assign_cold_reserve()
-                # else:
-                #     # Если все резервы кончились
-                #     print(f"  Нет доступных резервов для замены GTU {gtu.id}")
-
-            # Обновление статусов ГТУ
-            for gtu in self.gtus:
-                self.update_status(gtu, current_time)
-
-            # Расход на зарплату, считает по первому числу месяца
-            if current_time.month != last_month:
-                self.total_salary_cost += self.personnel_salary
-                last_month = current_time.month
+    def resume(self, end_date=None, checkpoint_path=None, checkpoint_hours=None):
+        """
+        Продолжает расчет с current_time (например, после load_checkpoint) до end_date,
+        по умолчанию до конца исходного периода. Если задан checkpoint_path, каждые
+        checkpoint_hours часов (или один раз в конце) состояние сохраняется в файл,
+        с которого расчет можно продолжить после сбоя. Возвращает итоговую стоимость.
+        """
+        hour = datetime.timedelta(hours=1)
+        if end_date is not None:
+            self.end_date = end_date
+        if checkpoint_hours is not None and checkpoint_hours < 1:
+            raise ValueError(f"Интервал контрольных точек должен быть не меньше часа: {checkpoint_hours}")
 
-            current_time += datetime.timedelta(hours=1)
+        while self.current_time <= self.end_date:
+            chunk_end = self.end_date
+            if checkpoint_path is not None and checkpoint_hours is not None:
+                chunk_end = min(chunk_end, self.current_time + (checkpoint_hours - 1) * hour)
+
+            if self.engine == "numpy":
+                self._simulate_numpy(self.current_time, chunk_end)
+            elif self.engine == "event":
+                self._simulate_event(self.current_time, chunk_end)
+            else:
+                self._simulate_loop(self.current_time, chunk_end)
+
+            self.current_time = chunk_end + hour
+            if checkpoint_path is not None:
+                self.save_checkpoint(checkpoint_path)
+
+        return self.total_cost()
 
+    def total_cost(self):
         # Вывод итоговой информации по каждой ГТУ
         # print("\nИтоговая информация:")
 
@@ -191,6 +388,788 @@ class GTESModel:
 
         res = cost_electricity + self.total_maintenance_cost + self.total_salary_cost
         return res
+
+    def _simulate_loop(self, start_date, end_date):
+        current_time = start_date
+        while current_time <= end_date:  # Расчет электроэнергии и времени работы
+            self.step(current_time)
+            current_time += datetime.timedelta(hours=1)
+
+    def step(self, current_time, loads=None):
+        """
+        Один час почасового цикла: моточасы и выработка, вывод в ТО/КР с вводом резервов,
+        возврат в строй, зарплата в начале месяца. loads - загрузка ГТУ на этот час
+        {id ГТУ: коэф.}, по умолчанию average_load_factor. Возвращает выработку за час, МВт*ч.
+        Большие парки считаются операциями над массивами (_accrue_arrays). На парке
+        в несколько ГТУ у каждой операции numpy свои накладные расходы больше самих
+        расчетов, поэтому массивы FleetState читаются в списки один раз за час,
+        ГТУ считаются в цикле, и списки записываются обратно одним присваиванием.
+        """
+        if self.fleet.size > SCALAR_STEP_MAX_GTU:
+            energy, due, returning = self._accrue_arrays(current_time, loads)
+        else:
+            fleet = self.fleet
+            hours_this_step = 1  # Шаг моделирования, 1 час по ТЗ
+            power = self.gtu_specs['мощность']
+            to_period = self.gtu_specs['ТО_периодичность']
+            kr_period = self.gtu_specs['КР_периодичность']
+            load_factor = fleet.average_load_factor.tolist() if loads is None else [
+                loads.get(gtu.id, 0.0) for gtu in self.gtus]
+            total_run_hours = fleet.total_run_hours.tolist()
+            run_hours = fleet.run_hours.tolist()
+            hours_since_kr = fleet.hours_since_kr.tolist()
+
+            energy = 0.0
+            total_energy = self.total_energy_generated
+            due = []
+            in_maintenance = []
+            for j, code in enumerate(fleet.status.tolist()):
+                if code > STATUS_HOT_RESERVE:
+                    if code >= STATUS_TO:
+                        in_maintenance.append(j)
+                    continue
+                # В работе и в горячем резерве ГТУ набирают моточасы и вырабатывают энергию.
+                # Для моточасов я учел как произведение времени в часах на коэф загрузки
+                factor = load_factor[j]
+                effective_hours = factor * hours_this_step
+                total_run_hours[j] += effective_hours  # Общее время работы
+                run_hours[j] += effective_hours  # Время с ТО
+                hours_since_kr[j] += effective_hours  # Время с КР
+                generated = power * factor * hours_this_step
+                total_energy += generated
+                energy += generated
+                if run_hours[j] >= to_period or hours_since_kr[j] >= kr_period:
+                    if code == STATUS_WORKING:
+                        due.append(j)
+            fleet.total_run_hours[:] = total_run_hours
+            fleet.run_hours[:] = run_hours
+            fleet.hours_since_kr[:] = hours_since_kr
+            self.total_energy_generated = total_energy
+
+            returning = []
+            if in_maintenance:
+                end_maintenance = fleet.end_maintenance.tolist()
+                returning = [j for j in in_maintenance if current_time >= end_maintenance[j]]
+
+        # Проверка статуса ТО и КР, ввод резервов
+        need_maintenance = []  # Список ГТУ ТО и КР
+        for j in due:
+            if self.perform_maintenance(self.gtus[j], current_time):
+                need_maintenance.append(self.gtus[j])
+
+        hot_reserve_used = False  # Ограничение для разового использования горячего резерва
+        for gtu in need_maintenance:
+            if not hot_reserve_used and self.hot_reserve and self.hot_reserve.status_code == STATUS_HOT_RESERVE:
+                # print(f"  Замена GTU {gtu.id} на GTU {self.hot_reserve.id} (горячий резерв)")
+                self.hot_reserve.status_code = STATUS_WORKING
+                hot_reserve_used = True  # На этом шаге больше нельзя использовать резерв после ввода ТО
+                self.assign_hot_reserve()  # Поиск иных резервов
+
+            # Если горячий использован, вводим холодный
+            elif self.cold_reserve and self.cold_reserve.status_code == STATUS_COLD_RESERVE:
+                # print(f"  Замена GTU {gtu.id} на GTU {self.cold_reserve.id} (холодный резерв)")
+                self.cold_reserve.status_code = STATUS_WORKING
+                self.assign_cold_reserve()
+            # else:
+            #     # Если все резервы кончились
+            #     print(f"  Нет доступных резервов для замены GTU {gtu.id}")
+
+        # Обновление статусов ГТУ: возврат в строй тех, у кого закончилось обслуживание
+        for j in returning:
+            self.update_status(self.gtus[j], current_time)
+
+        # Расход на зарплату, считает по первому числу месяца
+        if current_time.month != self.last_month:
+            self.total_salary_cost += self.personnel_salary
+            self.last_month = current_time.month
+
+        return energy
+
+    def _accrue_arrays(self, current_time, loads=None):
+        """
+        Наработка и выработка часа операциями над массивами FleetState сразу для всех ГТУ
+        (для больших парков). Выработка суммируется по ГТУ по порядку, как в цикле step.
+        Возвращает (выработка, МВт*ч; номера ГТУ в работе, которым пора на ТО/КР;
+        номера ГТУ, у которых закончилось обслуживание).
+        """
+        fleet = self.fleet
+        hours_this_step = 1
+        load_factor = fleet.average_load_factor if loads is None else np.array(
+            [loads.get(gtu.id, 0.0) for gtu in self.gtus])
+        # Остальным ГТУ прибавляется 0.0, что не меняет значений
+        active = fleet.status <= STATUS_HOT_RESERVE
+        effective_hours = np.where(active, load_factor, 0.0) * hours_this_step
+        fleet.total_run_hours += effective_hours
+        fleet.run_hours += effective_hours
+        fleet.hours_since_kr += effective_hours
+
+        energy = 0.0
+        for generated in (self.gtu_specs['мощность'] * load_factor[active] * hours_this_step).tolist():
+            self.total_energy_generated += generated
+            energy += generated
+
+        due = ((fleet.run_hours >= self.gtu_specs['ТО_периодичность'])
+               | (fleet.hours_since_kr >= self.gtu_specs['КР_периодичность']))
+        due = np.flatnonzero(due & (fleet.status == STATUS_WORKING)).tolist()
+        returning = np.flatnonzero((fleet.status >= STATUS_TO)
+                                   & (fleet.end_maintenance <= np.datetime64(current_time, "s")))
+        return energy, due, returning.tolist()
+
+    def dispatch(self, required_mw):
+        """
+        Распределение требуемой мощности (МВт) между ГТУ в работе и горячем резерве
+        пропорционально их average_load_factor (загрузке от оптимизации). ГТУ, упершиеся
+        в номинал, загружаются полностью, остаток делится между остальными. ГТУ с нулевой
+        загрузкой (введенный холодный резерв) добираются поровну, только если остальных
+        не хватило. Возвращает {id ГТУ: коэф. загрузки}.
+        """
+        power = self.gtu_specs['мощность']
+        # Статусы и загрузки читаются из массивов один раз, а не через поля каждой GTU
+        running = [(gtu, factor) for gtu, code, factor in zip(
+            self.gtus, self.fleet.status.tolist(), self.fleet.average_load_factor.tolist())
+            if code <= STATUS_HOT_RESERVE]
+        loads = {gtu.id: 0.0 for gtu, _ in running}
+        remaining = required_mw
+
+        # Загрузка не задана (NaN) - как нулевая
+        for tier in ([(gtu, factor) for gtu, factor in running if factor > 0],
+                     [(gtu, 1.0) for gtu, factor in running if not factor > 0]):
+            while tier and remaining > 0:
+                scale = remaining / (power * sum(share for _, share in tier))
+                if all(share * scale < 1 for _, share in tier):
+                    for gtu, share in tier:
+                        loads[gtu.id] = share * scale
+                    remaining = 0
+                    break
+                for gtu, share in tier:
+                    if share * scale >= 1:
+                        loads[gtu.id] = 1.0
+                        remaining -= power
+                tier = [(gtu, share) for gtu, share in tier if share * scale < 1]
+        return loads
+
+    def generate(self, required_mw, current_time, hours=1):
+        """
+        Выработка по запросу сети за hours часов, начиная с current_time. Возвращает
+        среднюю выданную мощность, МВт, и расход топлива за эти часы, м3.
+        Результат тот же, что у почасового цикла "dispatch, затем step". Распределение
+        мощности меняется только вместе со статусами ГТУ, поэтому часы до ближайшего
+        события (ТО/КР, возврат в строй) прибавляются одним блоком (_advance_block),
+        час события считается шагом step, после него мощность распределяется заново.
+        """
+        if self.start_date is None:
+            self.start_date = current_time
+        hour = datetime.timedelta(hours=1)
+        energy = 0.0
+        done = 0
+        while done < hours:
+            loads = self.dispatch(required_mw)
+            block = 0
+            if hours - done > 1:  # Для одного часа искать событие дольше, чем сделать шаг
+                block = self._hours_to_event(loads, current_time + done * hour, hours - done)
+            if block:
+                energy = self._advance_block(loads, current_time + done * hour, block, energy)
+                done += block
+            if done < hours:
+                energy += self.step(current_time + done * hour, loads)
+                done += 1
+        self.end_date = current_time + datetime.timedelta(hours=hours - 1)
+        self.current_time = current_time + datetime.timedelta(hours=hours)
+        actual_mw = energy / hours if hours else 0.0
+        return actual_mw, energy * self.gtu_specs.get('удельный_расход_топлива', self.fuel_per_MWh)
+
+    def _hours_to_event(self, loads, start_time, limit):
+        """
+        Сколько часов подряд от start_time (не больше limit) step с загрузкой loads
+        отработает без событий: ни одна ГТУ не уйдет на ТО/КР и не вернется в строй.
+        Пороги ищутся по моточасам, накопленным так же, как в step.
+        """
+        fleet = self.fleet
+        to_period = self.gtu_specs['ТО_периодичность']
+        kr_period = self.gtu_specs['КР_периодичность']
+        run_hours = fleet.run_hours.tolist()
+        hours_since_kr = fleet.hours_since_kr.tolist()
+        end_maintenance = fleet.end_maintenance.tolist()
+
+        def reach(value, factor, threshold):
+            # Номер часа (с 0), в котором моточасы достигнут порога, или limit
+            if value >= threshold:
+                return 0
+            if factor > 0 and sequential_sum(value, factor, limit) >= threshold:
+                return steps_to_reach(value, factor, threshold) - 1
+            return limit
+
+        first = limit
+        for j, code in enumerate(fleet.status.tolist()):
+            if code == STATUS_WORKING:
+                factor = loads.get(self.gtus[j].id, 0.0)
+                first = min(first, reach(run_hours[j], factor, to_period),
+                            reach(hours_since_kr[j], factor, kr_period))
+            elif code >= STATUS_TO:
+                # Первый час не раньше окончания обслуживания
+                first = min(first, max(0, -((start_time - end_maintenance[j]) // datetime.timedelta(hours=1))))
+        return first
+
+    def _advance_block(self, loads, start_time, n_hours, energy):
+        """
+        n_hours часов от start_time без событий с загрузкой loads: моточасы, выработка
+        и зарплата, как после n_hours шагов step. Моточасы складываются последовательно
+        (sequential_sum), выработка - в порядке "час за часом, ГТУ за ГТУ". energy -
+        выработка generate до блока, возвращается она же с выработкой блока.
+        """
+        fleet = self.fleet
+        power = self.gtu_specs['мощность']
+        rows = [fleet.total_run_hours.tolist(), fleet.run_hours.tolist(),
+                fleet.hours_since_kr.tolist()]
+        generated = []  # Выработка за час ГТУ в работе и в горячем резерве, по порядку
+        for j, code in enumerate(fleet.status.tolist()):
+            if code <= STATUS_HOT_RESERVE:
+                factor = loads.get(self.gtus[j].id, 0.0)
+                if factor:
+                    for row in rows:
+                        row[j] = sequential_sum(row[j], factor, n_hours)
+                generated.append(power * factor * 1)
+        fleet.total_run_hours[:], fleet.run_hours[:], fleet.hours_since_kr[:] = rows
+
+        self.total_energy_generated = self._accumulate_energy(
+            self.total_energy_generated, np.tile(generated, n_hours))
+        hour_energy = 0.0
+        for value in generated:
+            hour_energy += value
+        self._accrue_salary(start_time, n_hours)
+        return sequential_sum(energy, hour_energy, n_hours) if hour_energy else energy
+
+    def save_checkpoint(self, path):
+        """
+        Сохраняет полное состояние модели (ГТУ, резервы, накопленные расходы, момент
+        продолжения расчета) в файл .npz. Запись идет через временный файл, поэтому
+        при сбое во время записи предыдущая контрольная точка остается целой.
+        """
+        # Массивы парка сохраняются как есть, по одному на поле FleetState
+        state = {f"fleet_{field}": getattr(self.fleet, field) for field in FLEET_FIELDS}
+        state.update({
+            "format": np.array(CHECKPOINT_FORMAT),
+            "engine": np.array(self.engine),
+            "gtu_specs": np.array(json.dumps(self.gtu_specs, ensure_ascii=False)),
+            "reserves": np.array([self.gtus.index(self.hot_reserve) if self.hot_reserve else -1,
+                                  self.gtus.index(self.cold_reserve) if self.cold_reserve else -1]),
+            "totals": np.array([self.total_energy_generated, self.total_salary_cost,
+                                self.total_maintenance_cost], dtype=float),
+            "dates": np.array([np.datetime64(date or "NaT", "s") for date in
+                               (self.start_date, self.end_date, self.current_time)], dtype="datetime64[s]"),
+            "last_month": np.array(self.last_month or 0),
+        })
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as file:
+            np.savez(file, **state)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load_checkpoint(cls, path, load_factors=None, engine=None):
+        """
+        Создает модель в состоянии из контрольной точки. Продолжить расчет - resume().
+        load_factors и engine позволяют начать от общего прошлого сценарии "что если"
+        с другой загрузкой ГТУ или другим движком.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            if "format" not in data or str(data["format"]) != CHECKPOINT_FORMAT:
+                raise ValueError(f"{path}: не контрольная точка GTESModel")
+            state = {name: data[name] for name in data.files}
+
+        saved_factors = [None if np.isnan(factor) else factor
+                         for factor in state["fleet_average_load_factor"].tolist()]
+        model = cls(json.loads(str(state["gtu_specs"])),
+                    saved_factors if load_factors is None else load_factors,
+                    engine=str(state["engine"]) if engine is None else engine)
+        if len(model.fleet) != len(state["fleet_status"]):
+            raise ValueError(f"{path}: число ГТУ не совпадает с gtu_specs")
+
+        for field in FLEET_FIELDS:
+            if field != "average_load_factor":
+                getattr(model.fleet, field)[:] = state[f"fleet_{field}"]
+
+        hot, cold = state["reserves"].tolist()
+        model.hot_reserve = model.gtus[hot] if hot >= 0 else None
+        model.cold_reserve = model.gtus[cold] if cold >= 0 else None
+        (model.total_energy_generated, model.total_salary_cost,
+         model.total_maintenance_cost) = state["totals"].tolist()
+        model.start_date, model.end_date, model.current_time = [
+            None if np.isnat(date) else date.astype(datetime.datetime) for date in state["dates"]]
+        model.last_month = int(state["last_month"]) or None
+        return model
+
+    # _____________________________________________________________________________________
+    # Векторный движок. Состояние парка хранится в массивах (моточасы, статусы, окончание
+    # обслуживания), а часы между событиями (ТО, КР, возврат в строй) прибавляются сразу
+    # блоком через np.add.accumulate. Сложения идут в том же порядке, что и в почасовом
+    # цикле, поэтому результат совпадает с эталонным движком "loop".
+
+    def _simulate_numpy(self, start_date, end_date):
+        hour = datetime.timedelta(hours=1)
+        n_hours = horizon_hours(start_date, end_date)
+        to_period = self.gtu_specs['ТО_периодичность']
+        kr_period = self.gtu_specs['КР_периодичность']
+        to_hours = int(self.to_duration / hour)
+        kr_hours = int(self.kr_duration / hour)
+
+        # Состояние парка: строки hours - общее время работы, время с ТО, время с КР
+        n = len(self.gtus)
+        fleet = self.fleet
+        lf = fleet.average_load_factor.copy()
+        energy_step = self.gtu_specs['мощность'] * lf * 1
+        hours = np.array([fleet.total_run_hours, fleet.run_hours, fleet.hours_since_kr])
+        status = fleet.status.copy()
+        end_hour = self._end_hours(start_date)
+        hot = self.gtus.index(self.hot_reserve) if self.hot_reserve else None
+        cold = self.gtus.index(self.cold_reserve) if self.cold_reserve else None
+
+        thresholds = np.array([[to_period], [kr_period]], dtype=float)
+        loaded_lf = lf > 0
+        safe_lf = np.where(loaded_lf, lf, 1.0)
+        # Почасовые приращения выработки копятся в буфере и суммируются последовательно
+        energy = self.total_energy_generated
+        energy_rows = np.empty((NUMPY_MAX_BLOCK_HOURS, n))
+        filled = 0
+
+        i = 0  # Номер первого необработанного часа
+        while i < n_hours:
+            working = status == STATUS_WORKING
+            active = status <= STATUS_HOT_RESERVE
+
+            # Оценка длины блока до ближайшего события. Запас в 2 часа покрывает
+            # погрешность округления, точный момент ищется ниже по накопленным суммам
+            block = min(n_hours - i, NUMPY_MAX_BLOCK_HOURS)
+            return_row = None
+            first_end = int(end_hour.min())
+            if first_end != NO_EVENT_HOUR:
+                return_row = max(0, first_end - i)
+                block = min(block, return_row + 1)
+            remaining = (thresholds - hours[1:]).min(axis=0)
+            left = float(np.where(working & loaded_lf, remaining / safe_lf, np.inf).min())
+            scan_from = block
+            if left != np.inf:
+                estimate = max(1, math.ceil(left))
+                block = min(block, estimate + 2)
+                scan_from = min(block, max(0, estimate - 3))
+
+            steps = np.empty((block + 1, 3, n))
+            steps[0] = hours
+            steps[1:] = np.where(active, lf, 0.0)
+            track = np.add.accumulate(steps, axis=0)
+
+            # Раньше оценки порог пересечь нельзя, проверяются только последние часы блока
+            event_rows = np.zeros(block, dtype=bool)
+            event_rows[scan_from:] = ((track[scan_from + 1:, 1:] >= thresholds).any(axis=1)
+                                      & working).any(axis=1)
+            if return_row is not None and return_row < block:
+                event_rows[return_row] = True
+            first_event = int(event_rows.argmax())
+            event = bool(event_rows[first_event])
+            length = first_event + 1 if event else block
+
+            hours = track[length].copy()
+            if filled + length > NUMPY_MAX_BLOCK_HOURS:
+                energy = self._accumulate_energy(energy, energy_rows[:filled])
+                filled = 0
+            energy_rows[filled:filled + length] = np.where(active, energy_step, 0.0)
+            filled += length
+            i += length
+            if not event:
+                continue
+
+            # Обработка событий в час t: ТО/КР, ввод резервов, возврат в строй
+            t = i - 1
+            need_maintenance = []
+            due = working & (hours[1:] >= thresholds).any(axis=0)
+            for j in np.flatnonzero(due).tolist():
+                if hours[1, j] >= to_period:
+                    status[j] = STATUS_TO
+                    end_hour[j] = t + to_hours
+                    self.fleet.downtime_hours[j] += self.to_duration.total_seconds() / 3600
+                    self.fleet.to_counter[j] += 1
+                    hours[1, j] = 0
+                    self.fleet.maintenance_cost[j] += self.gtu_specs['ТО_стоимость']
+                    self.total_maintenance_cost += self.gtu_specs['ТО_стоимость']
+                    need_maintenance.append(j)
+                else:
+                    logger.debug("GTU %s уходит на КР в %s", self.gtus[j].id, start_date + t * hour)
+                    status[j] = STATUS_KR
+                    end_hour[j] = t + kr_hours
+                    self.fleet.downtime_hours[j] += self.kr_duration.total_seconds() / 3600
+                    self.fleet.kr_counter[j] += 1
+                    hours[2, j] = 0
+                    self.fleet.maintenance_cost[j] += self.gtu_specs['КР_стоимость']
+                    self.total_maintenance_cost += self.gtu_specs['КР_стоимость']
+                    need_maintenance.append(j)
+
+            hot_reserve_used = False
+            for j in need_maintenance:
+                if not hot_reserve_used and hot is not None and status[hot] == STATUS_HOT_RESERVE:
+                    status[hot] = STATUS_WORKING
+                    hot_reserve_used = True
+                    hot = self._pick_reserve(
+                        status, hours[0], (lf > 0) & (lf < 0.15), STATUS_HOT_RESERVE)
+                elif cold is not None and status[cold] == STATUS_COLD_RESERVE:
+                    status[cold] = STATUS_WORKING
+                    cold = self._pick_reserve(
+                        status, hours[0], lf == 0, STATUS_COLD_RESERVE)
+
+            returned = end_hour <= t
+            status[returned] = STATUS_WORKING
+            end_hour[returned] = NO_EVENT_HOUR
+        energy = self._accumulate_energy(energy, energy_rows[:filled])
+
+        return self._finish_fleet_run(
+            start_date, n_hours, energy, hours, status, end_hour, hot, cold)
+
+    # _____________________________________________________________________________________
+    # Событийный движок. Коэффициент загрузки каждой ГТУ постоянен, поэтому моточасы растут
+    # линейно и момент достижения порога ТО/КР вычисляется сразу. Движок переходит от
+    # события к событию (ТО, КР, возврат в строй) через очередь с приоритетом, а выработку
+    # и моточасы между событиями прибавляет сразу за все пропущенные часы.
+    # Зарплата считается по числу смен месяца. Моточасы складываются по часам в том же
+    # порядке, что и в цикле (np.add.accumulate), поэтому пороги ТО/КР достигаются в те же
+    # часы, что и в цикле, а резерв выбирается по тем же значениям общей наработки
+    # (первая ГТУ с наименьшей). Статусы, счетчики и моточасы совпадают с циклом точно,
+    # выработка - с точностью до погрешности округления (считается произведением загрузки
+    # на число часов работы).
+
+    def _simulate_event(self, start_date, end_date):
+        hour = datetime.timedelta(hours=1)
+        n_hours = horizon_hours(start_date, end_date)
+        to_period = self.gtu_specs['ТО_периодичность']
+        kr_period = self.gtu_specs['КР_периодичность']
+        to_hours = int(self.to_duration / hour)
+        kr_hours = int(self.kr_duration / hour)
+
+        n = len(self.gtus)
+        fleet = self.fleet
+        lf = fleet.average_load_factor.tolist()
+        status = fleet.status.tolist()
+        # Моточасы ГТУ: общее время, время с ТО, время с КР на час synced[j] - 1
+        hours = [fleet.total_run_hours.tolist(),
+                 fleet.run_hours.tolist(),
+                 fleet.hours_since_kr.tolist()]
+        active_hours = [0] * n  # Часы работы для расчета выработки
+        synced = [0] * n  # Часы с номером меньше synced[j] уже учтены для ГТУ j
+        end_hour = self._end_hours(start_date).tolist()
+        hot = self.gtus.index(self.hot_reserve) if self.hot_reserve else None
+        cold = self.gtus.index(self.cold_reserve) if self.cold_reserve else None
+
+        events = []  # Очередь (час, номер ГТУ)
+        next_event = [None] * n
+
+        def sync(j, t):
+            # Учет часов ГТУ j по час t включительно
+            k = t + 1 - synced[j]
+            if k > 0:
+                if status[j] <= STATUS_HOT_RESERVE:
+                    if lf[j]:
+                        for row in range(3):
+                            hours[row][j] = sequential_sum(hours[row][j], lf[j], k)
+                    active_hours[j] += k
+                synced[j] = t + 1
+
+        def hours_to(row, j, threshold):
+            # Сколько еще часов работы нужно ГТУ j, чтобы достичь порога (не меньше 1)
+            return steps_to_reach(hours[row][j], lf[j], threshold)
+
+        def schedule(j, t):
+            # Следующее событие ГТУ j после часа t
+            if status[j] == STATUS_WORKING and lf[j] > 0:
+                event = t + min(hours_to(1, j, to_period), hours_to(2, j, kr_period))
+            elif status[j] in (STATUS_TO, STATUS_KR):
+                event = max(end_hour[j], t + 1)
+            else:
+                event = None
+            next_event[j] = event
+            if event is not None and event < n_hours:
+                heapq.heappush(events, (event, j))
+
+        def pick_reserve(t, eligible, reserve_code):
+            candidates = [j for j in range(n)
+                          if status[j] == STATUS_WORKING and eligible(lf[j])]
+            if not candidates:
+                return None
+            for j in candidates:
+                sync(j, t)
+            # Как argmin в _pick_reserve: первая ГТУ с наименьшей общей наработкой
+            chosen = min(candidates, key=lambda j: hours[0][j])
+            if reserve_code == STATUS_COLD_RESERVE:
+                sync(chosen, t)
+            status[chosen] = reserve_code
+            next_event[chosen] = None
+            return chosen
+
+        for j in range(n):
+            schedule(j, -1)
+
+        while events and events[0][0] < n_hours:
+            t = events[0][0]
+            units = []
+            while events and events[0][0] == t:
+                _, j = heapq.heappop(events)
+                if next_event[j] == t:
+                    units.append(j)
+            units.sort()
+
+            need_maintenance = []
+            for j in units:
+                if status[j] != STATUS_WORKING:
+                    continue
+                sync(j, t)
+                if hours[1][j] >= to_period:
+                    status[j] = STATUS_TO
+                    end_hour[j] = t + to_hours
+                    self.fleet.downtime_hours[j] += self.to_duration.total_seconds() / 3600
+                    self.fleet.to_counter[j] += 1
+                    hours[1][j] = 0
+                    self.fleet.maintenance_cost[j] += self.gtu_specs['ТО_стоимость']
+                    self.total_maintenance_cost += self.gtu_specs['ТО_стоимость']
+                    need_maintenance.append(j)
+                elif hours[2][j] >= kr_period:
+                    logger.debug("GTU %s уходит на КР в %s", self.gtus[j].id, start_date + t * hour)
+                    status[j] = STATUS_KR
+                    end_hour[j] = t + kr_hours
+                    self.fleet.downtime_hours[j] += self.kr_duration.total_seconds() / 3600
+                    self.fleet.kr_counter[j] += 1
+                    hours[2][j] = 0
+                    self.fleet.maintenance_cost[j] += self.gtu_specs['КР_стоимость']
+                    self.total_maintenance_cost += self.gtu_specs['КР_стоимость']
+                    need_maintenance.append(j)
+                schedule(j, t)
+
+            hot_reserve_used = False
+            for j in need_maintenance:
+                if not hot_reserve_used and hot is not None and status[hot] == STATUS_HOT_RESERVE:
+                    sync(hot, t)
+                    status[hot] = STATUS_WORKING
+                    schedule(hot, t)
+                    hot_reserve_used = True
+                    hot = pick_reserve(t, lambda x: 0 < x < 0.15, STATUS_HOT_RESERVE)
+                elif cold is not None and status[cold] == STATUS_COLD_RESERVE:
+                    sync(cold, t)
+                    status[cold] = STATUS_WORKING
+                    schedule(cold, t)
+                    cold = pick_reserve(t, lambda x: x == 0, STATUS_COLD_RESERVE)
+
+            for j in units:
+                if status[j] in (STATUS_TO, STATUS_KR) and end_hour[j] <= t:
+                    sync(j, t)
+                    status[j] = STATUS_WORKING
+                    end_hour[j] = NO_EVENT_HOUR
+                    schedule(j, t)
+
+        energy = self.total_energy_generated
+        for j, gtu in enumerate(self.gtus):
+            sync(j, n_hours - 1)
+            energy += gtu.specs['мощность'] * lf[j] * 1 * active_hours[j]
+
+        return self._finish_fleet_run(
+            start_date, n_hours, energy, hours, status, end_hour, hot, cold)
+
+    def _finish_fleet_run(self, start_date, n_hours, energy, hours, status, end_hour, hot, cold):
+        # Общее завершение для движков "numpy" и "event": зарплата, перенос состояния
+        # обратно в массивы парка и итоговая стоимость
+        self._accrue_salary(start_date, n_hours)
+        self.total_energy_generated = energy
+
+        fleet = self.fleet
+        fleet.total_run_hours[:], fleet.run_hours[:], fleet.hours_since_kr[:] = hours
+        fleet.status[:] = status
+        end_hour = np.asarray(end_hour, dtype=np.int64)
+        in_maintenance = end_hour != NO_EVENT_HOUR
+        end = np.full(len(fleet), np.datetime64("NaT"), dtype="datetime64[s]")
+        end[in_maintenance] = np.datetime64(start_date, "s") + end_hour[in_maintenance] * np.timedelta64(3600, "s")
+        fleet.end_maintenance[:] = end
+        fleet.next_to[:] = np.where(fleet.status == STATUS_TO, end, np.datetime64("NaT"))
+        fleet.next_kr[:] = np.where(fleet.status == STATUS_KR, end, np.datetime64("NaT"))
+        self.hot_reserve = self.gtus[hot] if hot is not None else None
+        self.cold_reserve = self.gtus[cold] if cold is not None else None
+
+        return self.total_cost()
+
+    def _accrue_salary(self, start_date, n_hours):
+        # Зарплата за n_hours часов от start_date, как в step: при каждой смене месяца,
+        # включая первый час, если за этот месяц она еще не начислена (продолжение расчета)
+        months = salary_months(start_date, n_hours)
+        if n_hours > 0:
+            if start_date.month == self.last_month:
+                months -= 1
+            self.last_month = (start_date + datetime.timedelta(hours=n_hours - 1)).month
+        self.total_salary_cost += self.personnel_salary * months
+
+    def _end_hours(self, start_date):
+        # Номер часа от start_date, в который ГТУ вернется в строй (NO_EVENT_HOUR - не на обслуживании)
+        end = self.fleet.end_maintenance
+        end_hour = np.full(len(end), NO_EVENT_HOUR, dtype=np.int64)
+        scheduled = ~np.isnat(end)
+        end_hour[scheduled] = -((np.datetime64(start_date, "s") - end[scheduled]) // np.timedelta64(3600, "s"))
+        return end_hour
+
+    @staticmethod
+    def _accumulate_energy(energy, energy_rows):
+        # Последовательное сложение в порядке "час за часом, ГТУ за ГТУ", как в цикле.
+        # Нулевые приращения простаивающих ГТУ сумму не меняют
+        steps = np.empty(energy_rows.size + 1)
+        steps[0] = energy
+        steps[1:] = energy_rows.ravel()
+        return float(np.add.accumulate(steps)[-1])
+
+    @staticmethod
+    def _pick_reserve(status, total_run_hours, eligible, reserve_code):
+        # Выбор резерва: из подходящих работающих ГТУ минимально отработавшая получает reserve_code
+        candidates = np.flatnonzero((status == STATUS_WORKING) & eligible)
+        if not len(candidates):
+            return None
+        chosen = int(candidates[total_run_hours[candidates].argmin()])
+        status[chosen] = reserve_code
+        return chosen
+
+
+class GTESFleetBatch:
+    """Пакетный расчет стоимости для целой популяции векторов загрузки ГТУ.
+
+    Все варианты используют одни gtu_specs и один горизонт, поэтому зарплата считается
+    один раз, а ТО/КР всех ГТУ всех вариантов продвигаются одновременно операциями над
+    массивами: за один проход каждая ГТУ переходит к своему следующему обслуживанию и
+    возврату в строй. Без резервов ГТУ не влияют друг на друга, и число проходов равно
+    числу обслуживаний одной ГТУ за горизонт, а не числу часов.
+
+    Варианты с загрузкой ниже 0.15 (кандидаты в горячий или холодный резерв) связаны
+    передачей резерва и считаются поштучно через GTESModel с движком fallback_engine.
+    Их стоимость запоминается целиком по варианту и горизонту (LRU на cache_size
+    вариантов): повторная оценка того же варианта берется из кэша, а вариант, который
+    отличается хотя бы одним геном, считается заново с начала горизонта. Продолжение
+    расчета с первой изменившейся передачи резерва не делается: для этого нужна
+    отдельная модель резервной части парка по потоку ТО/КР остальных ГТУ.
+    Часы до порога ТО/КР считаются по моточасам, сложенным по часу, как в почасовом цикле
+    (steps_to_reach), поэтому ГТУ уходят на обслуживание в те же часы, что и в GTESModel.
+
+    Расписание независимой ГТУ зависит только от ее загрузки и длины горизонта, поэтому
+    оно запоминается (LRU на cache_size ГТУ). При повторной оценке, например потомка
+    после мутации одного гена, заново считаются только ГТУ с новой загрузкой.
+    """
+
+    def __init__(self, gtu_specs, fallback_engine="numpy", cache_size=10000):
+        self.gtu_specs = gtu_specs
+        self.fallback_engine = fallback_engine
+        self.cache_size = cache_size
+        self.unit_hits = 0
+        self.unit_misses = 0
+        self.row_hits = 0
+        self.row_misses = 0
+        # (загрузка, число часов) -> (часы работы, число ТО, число КР)
+        self._units = OrderedDict()
+        # (загрузки варианта с резервами, начало, конец) -> стоимость
+        self._rows = OrderedDict()
+
+    def simulate(self, load_factors, start_date, end_date):
+        # load_factors - массив (число вариантов x кол-во ГТУ), результат - вектор стоимостей
+        load_factors = np.atleast_2d(np.asarray(load_factors, dtype=float))
+        n_variants, n = load_factors.shape
+        if n != self.gtu_specs['кол-во']:
+            raise ValueError(
+                f"Ожидалось {self.gtu_specs['кол-во']} коэффициентов загрузки, получено {n}")
+        n_hours = horizon_hours(start_date, end_date)
+        costs = np.empty(n_variants)
+
+        coupled = (load_factors < 0.15).any(axis=1)
+        for row in np.flatnonzero(coupled):
+            costs[row] = self._coupled_cost(load_factors[row], start_date, end_date)
+
+        lf = load_factors[~coupled]
+        active_hours, to_counter, kr_counter = self._cached_schedules(lf, n_hours)
+        energy = (self.gtu_specs['мощность'] * lf * 1 * active_hours).sum(axis=1)
+        maintenance_cost = (to_counter * self.gtu_specs['ТО_стоимость']
+                            + kr_counter * self.gtu_specs['КР_стоимость']).sum(axis=1)
+        salary_cost = GTESModel.personnel_salary * salary_months(start_date, n_hours)
+        costs[~coupled] = energy * GTESModel.prise_per_MW + maintenance_cost + salary_cost
+        return costs
+
+    def _coupled_cost(self, load_factors, start_date, end_date):
+        # Стоимость варианта с резервами: из кэша или полным расчетом GTESModel
+        key = (tuple(load_factors.tolist()), start_date, end_date)
+        if key in self._rows:
+            self.row_hits += 1
+            self._rows.move_to_end(key)
+            return self._rows[key]
+        self.row_misses += 1
+        model = GTESModel(self.gtu_specs, list(key[0]), engine=self.fallback_engine)
+        cost = self._rows[key] = model.simulate(start_date, end_date)
+        while len(self._rows) > self.cache_size:
+            self._rows.popitem(last=False)
+        return cost
+
+    def _cached_schedules(self, lf, n_hours):
+        # То же, что _unit_schedules, но каждая загрузка считается один раз
+        values = np.unique(lf)
+        missing = [value for value in values.tolist() if (value, n_hours) not in self._units]
+        self.unit_hits += len(values) - len(missing)
+        self.unit_misses += len(missing)
+        if missing:
+            schedules = self._unit_schedules(np.array([missing]), n_hours)
+            for k, value in enumerate(missing):
+                self._units[(value, n_hours)] = tuple(int(column[0, k]) for column in schedules)
+
+        table = np.empty((len(values), 3), dtype=np.int64)
+        for k, value in enumerate(values.tolist()):
+            self._units.move_to_end((value, n_hours))
+            table[k] = self._units[(value, n_hours)]
+        while len(self._units) > self.cache_size:
+            self._units.popitem(last=False)
+
+        index = np.searchsorted(values, lf)
+        return table[index, 0], table[index, 1], table[index, 2]
+
+    def _unit_schedules(self, lf, n_hours):
+        # Часы работы и счетчики ТО/КР для независимых ГТУ (массивы той же формы, что lf)
+        hour = datetime.timedelta(hours=1)
+        to_hours = int(GTESModel.to_duration / hour)
+        kr_hours = int(GTESModel.kr_duration / hour)
+        # Сколько часов работы нужно до порога ТО/КР от нуля моточасов
+        to_need = self._hours_to_reach(lf, self.gtu_specs['ТО_периодичность'])
+        kr_need = self._hours_to_reach(lf, self.gtu_specs['КР_периодичность'])
+
+        run = np.zeros(lf.shape, dtype=np.int64)  # Часы работы после ТО
+        since_kr = np.zeros(lf.shape, dtype=np.int64)  # Часы работы после КР
+        last = np.full(lf.shape, -1, dtype=np.int64)  # Последний учтенный час
+        active_hours = np.zeros(lf.shape, dtype=np.int64)
+        to_counter = np.zeros(lf.shape, dtype=np.int64)
+        kr_counter = np.zeros(lf.shape, dtype=np.int64)
+        pending = np.ones(lf.shape, dtype=bool)
+
+        while pending.any():
+            step = np.maximum(1, np.minimum(to_need - run, kr_need - since_kr))
+            event = last + step
+            finished = pending & (event >= n_hours)
+            active_hours[finished] += n_hours - 1 - last[finished]
+            pending &= ~finished
+
+            active_hours[pending] += step[pending]
+            run[pending] += step[pending]
+            since_kr[pending] += step[pending]
+            to_start = pending & (run >= to_need)
+            kr_start = pending & ~to_start
+            to_counter += to_start
+            kr_counter += kr_start
+            run[to_start] = 0
+            since_kr[kr_start] = 0
+
+            # Час возврата в строй. Если он за горизонтом, ГТУ до конца на обслуживании
+            last = np.where(to_start, event + to_hours, np.where(kr_start, event + kr_hours, last))
+            pending &= last < n_hours
+
+        return active_hours, to_counter, kr_counter
+
+    @staticmethod
+    def _hours_to_reach(lf, threshold):
+        # Наименьшее число часов работы k, за которые моточасы, прибавляемые по часу, как
+        # в почасовом цикле, достигают порога от нуля (steps_to_reach по каждой загрузке)
+        values, index = np.unique(lf, return_inverse=True)
+        need = np.array([steps_to_reach(0.0, value, threshold) for value in values.tolist()],
+                        dtype=np.int64)
+        return need[index].reshape(np.shape(lf))
 # _________________________________________________________________________________________
 # добавил для связи между файлами. Оставил минимум, который мне необходим. При желании нужно изменить
 
@@ -241,9 +1220,16 @@ gtu_specs = {
 load_factors = [0.72, 0.91, 0.23, 0.31, 0.65, 0.42, 0.31, 0.99, 0.42]
 
 
-model = GTESModel(gtu_specs, load_factors)
+def main():
+    # Пример расчета: python -m PowerPlantModel
+    model = GTESModel(gtu_specs, load_factors)
+
+    start_date = datetime.datetime(2024, 6, 1)
+    end_date = datetime.datetime(2025, 6, 1)
+
+    print(f"Итоговая стоимость: {model.simulate(start_date, end_date):.2f} руб.")
+
 
-# start_date = datetime.datetime(2024, 6, 1)
-# end_date = datetime.datetime(2025, 6, 1)
+if __name__ == "__main__":
+    main()
 
-# model.simulate(start_date, end_date)
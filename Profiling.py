@@ -0,0 +1,192 @@
+# файл: Profiling.py
+
+import datetime
+import json
+import sys
+import time
+
+
+class PhaseStats:
+    "Накопленные замеры одной фазы: число вызовов, полное и собственное время (без вложенных фаз)"
+
+    __slots__ = ("phase", "method", "calls", "seconds", "own_seconds")
+
+    def __init__(self, phase, method):
+        self.phase = phase
+        self.method = method
+        self.calls = 0
+        self.seconds = 0.0
+        self.own_seconds = 0.0
+
+
+class Profiler:
+    """
+    Замеры времени по фазам расчета модели. Фазы модель перечисляет в атрибуте класса
+    profile_phases: кортежи (название фазы, имя класса, имя метода). На время работы
+    профилировщика (attach/detach или with) эти методы классов заменяются обертками,
+    которые считают вызовы и время, после detach возвращаются исходные методы.
+    Без профилировщика расчет идет по неизмененному коду и ничего не стоит.
+
+    Фазы вложенных моделей (например, сети и ГТЭС внутри EnergySystemModel) подключаются
+    вместе с фазами самой модели. Обертки стоят на классах, поэтому в замеры попадают
+    и объекты, создаваемые во время расчета (линии, тепловые сети).
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.phases = {}  # "Класс.метод" -> PhaseStats
+        self.seconds = 0.0  # Время расчета целиком
+        self.hours = None  # Число моделируемых часов для частоты вызовов
+        self._stack = []  # Время вложенных фаз для каждого открытого вызова
+        self._patched = []  # (класс, имя метода, исходный атрибут)
+
+    def models(self):
+        "Модель и вложенные в нее модели, у которых есть profile_phases"
+        found = [self.model]
+        for value in vars(self.model).values():
+            if hasattr(value, "profile_phases") and value not in found:
+                found.append(value)
+        return found
+
+    def attach(self):
+        for model in self.models():
+            namespace = sys.modules[type(model).__module__].__dict__
+            for phase, class_name, method in model.profile_phases:
+                key = f"{class_name}.{method}"
+                if key in self.phases:
+                    continue
+                self.phases[key] = PhaseStats(phase, key)
+                for cls in self._owners(namespace[class_name], method):
+                    self._patch(cls, method, self.phases[key])
+        return self
+
+    def detach(self):
+        while self._patched:
+            cls, method, original = self._patched.pop()
+            setattr(cls, method, original)
+
+    def __enter__(self):
+        return self.attach()
+
+    def __exit__(self, *exc_info):
+        self.detach()
+
+    @staticmethod
+    def _owners(cls, method):
+        "Класс и его наследники, в которых метод определен заново"
+        owners = [cls]
+        for subclass in cls.__subclasses__():
+            owners += [owner for owner in Profiler._owners(subclass, method)
+                       if method in vars(owner)]
+        return owners
+
+    def _patch(self, cls, method, stats):
+        original = vars(cls)[method]
+        is_static = isinstance(original, staticmethod)
+        function = original.__func__ if is_static else original
+        stack = self._stack
+        perf_counter = time.perf_counter
+
+        def timed(*args, **kwargs):
+            stack.append(0.0)
+            started = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - started
+                nested = stack.pop()
+                stats.calls += 1
+                stats.seconds += elapsed
+                stats.own_seconds += elapsed - nested
+                if stack:
+                    stack[-1] += elapsed
+
+        timed.__wrapped__ = function
+        setattr(cls, method, staticmethod(timed) if is_static else timed)
+        self._patched.append((cls, method, original))
+
+    def report(self):
+        "Отчет в виде словаря (для JSON). Фазы без вызовов не включаются"
+        phases = []
+        for stats in sorted(self.phases.values(), key=lambda s: -s.own_seconds):
+            if not stats.calls:
+                continue
+            phases.append({
+                "phase": stats.phase,
+                "method": stats.method,
+                "calls": stats.calls,
+                "seconds": stats.seconds,
+                "own_seconds": stats.own_seconds,
+                "share": stats.own_seconds / self.seconds if self.seconds else None,
+                "calls_per_hour": stats.calls / self.hours if self.hours else None,
+            })
+        return {
+            "model": type(self.model).__name__,
+            "engine": getattr(self.model, "engine", None),
+            "hours": self.hours,
+            "seconds": self.seconds,
+            # Время вне перечисленных фаз (сам цикл расчета)
+            "other_seconds": self.seconds - sum(phase["own_seconds"] for phase in phases),
+            "phases": phases,
+        }
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.report(), file, ensure_ascii=False, indent=2)
+
+    def print_report(self):
+        report = self.report()
+        print(f"=== Профиль {report['model']} ({report['engine']}): "
+              f"{report['seconds']:.4f} с, {report['hours']} ч ===")
+        for phase in report["phases"]:
+            per_hour = phase["calls_per_hour"]
+            print(f"{phase['phase']:<32} {phase['own_seconds']:9.4f} с "
+                  f"({phase['share'] or 0:6.1%}), вызовов {phase['calls']:>8}"
+                  + (f", {per_hour:.3g} в час" if per_hour is not None else ""))
+        print(f"{'вне фаз':<32} {report['other_seconds']:9.4f} с")
+
+
+def profile(model, start_date, end_date, path=None, **kwargs):
+    """
+    Расчет model.simulate(start_date, end_date, **kwargs) с замером фаз.
+    Возвращает Profiler с результатами. path - файл для отчета JSON.
+    """
+    profiler = Profiler(model)
+    with profiler:
+        started = time.perf_counter()
+        model.simulate(start_date, end_date, **kwargs)
+        profiler.seconds = time.perf_counter() - started
+    profiler.hours = (end_date - start_date) // datetime.timedelta(hours=1) + 1
+    if path is not None:
+        profiler.write(path)
+    return profiler
+
+
+def main():
+    # Профиль моделей за год: python -m Profiling
+    import contextlib
+    import io
+
+    import HeatSystemModel
+    import LineFromGrid
+    import PowerPlantModel
+    from EnergySystemModel import build_energy_system
+
+    objects, boiler_plants = HeatSystemModel.build_heat_objects()
+    models = [
+        PowerPlantModel.GTESModel(PowerPlantModel.gtu_specs, PowerPlantModel.load_factors),
+        LineFromGrid.PowerGridModel(LineFromGrid.build_consumers()),
+        HeatSystemModel.HeatModel(objects, boiler_plants, fuel_cost=HeatSystemModel.fuel_cost),
+        build_energy_system(),
+    ]
+
+    start_date = datetime.datetime(2024, 6, 1)
+    end_date = datetime.datetime(2025, 6, 1)
+    for model in models:
+        with contextlib.redirect_stdout(io.StringIO()):
+            profiler = profile(model, start_date, end_date)
+        profiler.print_report()
+
+
+if __name__ == "__main__":
+    main()
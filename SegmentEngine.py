@@ -0,0 +1,62 @@
+# файл: SegmentEngine.py
+
+import collections
+import datetime
+
+# Интервал горизонта моделирования, на котором все входные данные постоянны:
+# start - момент первого шага, first_step - номер первого шага от начала горизонта,
+# steps - количество шагов в интервале
+Segment = collections.namedtuple("Segment", ["start", "first_step", "steps"])
+
+
+def horizon_hours(start_date, end_date):
+    "Количество часовых шагов цикла while current_time <= end_date"
+    return max(0, (end_date - start_date) // datetime.timedelta(hours=1) + 1)
+
+
+def salary_months(start_date, n_hours):
+    "Сколько раз за n_hours часов от start_date сменится месяц (первый час тоже считается)"
+    if n_hours <= 0:
+        return 0
+    last_time = start_date + datetime.timedelta(hours=n_hours - 1)
+    return (last_time.year - start_date.year) * 12 + last_time.month - start_date.month + 1
+
+
+def month_starts(start_date, end_date):
+    """
+    Начала месяцев (00:00 первого числа) после start_date и не позже end_date.
+    На этих границах меняются среднемесячная температура, сезонная загрузка
+    потребителей и начисляется зарплата.
+    """
+    points = []
+    year, month = start_date.year, start_date.month
+    while True:
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        point = datetime.datetime(year, month, 1)
+        if point > end_date:
+            return points
+        points.append(point)
+
+
+def split_horizon(start_date, end_date, step, change_points=()):
+    """
+    Делит горизонт (шаги start_date + k * step, пока не больше end_date) на интервалы.
+    Новый интервал начинается с первого шага, попавшего на момент смены входных
+    данных или позже него. Модели считают каждый интервал целиком, умножая
+    значения за один шаг на число шагов, вместо перебора всех шагов.
+    """
+    n_steps = max(0, (end_date - start_date) // step + 1)
+    if not n_steps:
+        return []
+
+    firsts = {0}
+    for point in change_points:
+        first = -((start_date - point) // step)  # Первый шаг не раньше point
+        if 0 < first < n_steps:
+            firsts.add(first)
+    firsts = sorted(firsts)
+
+    return [
+        Segment(start_date + first * step, first, last - first)
+        for first, last in zip(firsts, firsts[1:] + [n_steps])
+    ]
@@ -0,0 +1,283 @@
+# файл: UnitCommitment.py
+
+import collections
+import datetime
+import time
+
+import numpy as np
+
+from LineFromGrid import PowerGridModel, build_consumers
+from PowerPlantModel import STATUS_TO, GTESModel, gtu_specs, load_factors
+from SegmentEngine import horizon_hours, month_starts, split_horizon
+
+# Ориентировочные параметры для main. UnitCommitment их сам не подставляет: параметры
+# топлива и загрузки берутся из gtu_specs или передаются явно
+MIN_LOAD = 0.3        # минимальная загрузка работающей ГТУ, доля мощности
+NO_LOAD_SHARE = 0.25  # расход топлива на холостом ходу, доля расхода при полной загрузке
+FUEL_PRICE = 3.0      # цена ПНГ, руб/м3
+
+# План включения ГТУ по часам: times - метки времени (или None), demand - требуемая
+# генерация, МВт; working - число ГТУ под нагрузкой, hot_reserve - число ГТУ в горячем
+# резерве (на холостом ходу), load_factor - загрузка каждой работающей ГТУ; costs - итоги
+Schedule = collections.namedtuple(
+    "Schedule", ["times", "demand", "working", "hot_reserve", "load_factor", "costs"])
+
+
+def hourly_demand(start_date, end_date, consumers=None, load_profile=None):
+    """
+    Почасовая требуемая генерация ГТЭС, МВт: спрос потребителей (calculate_power_demand
+    или график нагрузки load_profile - пары (метка времени, нагрузки)) плюс потери в линиях
+    по PowerGridModel.generation_needed. Возвращает (метки времени, массив МВт).
+    Состояние линий, итоги сети и потребителей не меняются.
+    """
+    if consumers is None:
+        consumers = build_consumers()
+    network = PowerGridModel(consumers)
+    hour = datetime.timedelta(hours=1)
+
+    if load_profile is not None:
+        times, demand = [], []
+        for current_time, loads in load_profile:
+            if current_time < start_date:
+                continue
+            if current_time > end_date:
+                break
+            names = getattr(load_profile, "consumers", None) or [
+                consumer.name for consumer in consumers]
+            times.append(current_time)
+            demand.append(network.generation_needed(dict(zip(names, loads))))
+        return times, np.array(demand, dtype=float)
+
+    # Спрос потребителей меняется только со сменой месяца - считаем один раз на интервал
+    segments = split_horizon(start_date, end_date, hour, month_starts(start_date, end_date))
+    values = [network.generation_needed(
+        {consumer.name: consumer.calculate_power_demand(segment.start) for consumer in consumers})
+        for segment in segments]
+    demand = np.repeat(values, [segment.steps for segment in segments])
+    times = [start_date + k * hour for k in range(len(demand))]
+    return times, demand.astype(float)
+
+
+def maintenance_availability(start_date, end_date, gtu_specs=gtu_specs, load_factors=load_factors):
+    """
+    Число ГТУ, не выведенных в ТО/КР, по часам горизонта - по графику обслуживания
+    GTESModel с загрузками load_factors (почасовой цикл step). ГТУ, ушедшая на ТО/КР
+    в час t, недоступна с этого часа, вернувшаяся в строй - доступна с часа возврата.
+    Длина массива та же, что у hourly_demand на этом горизонте.
+    """
+    model = GTESModel(gtu_specs, load_factors)
+    hour = datetime.timedelta(hours=1)
+    available = np.empty(horizon_hours(start_date, end_date), dtype=int)
+    for k in range(len(available)):
+        model.step(start_date + k * hour)
+        available[k] = np.count_nonzero(model.fleet.status < STATUS_TO)
+    return available
+
+
+class UnitCommitment:
+    """
+    Точный почасовой план включения ГТУ (unit commitment) на стоимостях GTESModel.
+
+    Каждая ГТУ в час находится в одном из состояний: под нагрузкой, в горячем резерве
+    (на холостом ходу), в холодном резерве (остановлена) или недоступна (ТО/КР, задается
+    числом доступных ГТУ available). Требования часа: работающие ГТУ покрывают спрос
+    с загрузкой от min_load до 1, а свободная мощность работающих и горячего резерва
+    не меньше reserve (по умолчанию мощность одной ГТУ - отказ любой из них).
+
+    Затраты:
+      - электроэнергия по GTESModel.prise_per_MW и износ (ТО и КР) пропорционально
+        моточасам с учетом загрузки, как в GTESModel: на весь парк это спрос / мощность
+        ГТУ, от плана не зависит;
+      - топливо: расход fuel_per_MWh на номинале, на холостом ходу - no_load_share
+        от него. Каждая включенная ГТУ (в работе или горячем резерве) платит холостой ход;
+      - пуск из холодного резерва: прогрев в течение 'время_запуска_из_холодного_резерва'
+        часов на холостом ходу.
+
+    Решение - динамическое программирование по часам. ГТУ одинаковые, поэтому состояние
+    парка сводится к паре (число работающих, число в горячем резерве) - при 9 ГТУ это
+    55 состояний вместо 3**9 сочетаний, и нагрузку выгодно делить поровну. Подряд идущие
+    часы с одинаковыми спросом и числом доступных ГТУ объединяются в один этап: внутри
+    него менять состав невыгодно. На каждом этапе переходы считаются только между
+    допустимыми состояниями.
+
+    Параметры топлива и загрузки (min_load, no_load_share, fuel_per_MWh, fuel_price)
+    передаются явно или берутся из gtu_specs по ключам SPEC_KEYS. Подстановки
+    по умолчанию нет: если параметр не задан ни там, ни там - ValueError.
+    """
+
+    # Параметр -> ключ gtu_specs
+    SPEC_KEYS = {
+        "min_load": "минимальная_загрузка",
+        "no_load_share": "доля_холостого_хода",
+        "fuel_per_MWh": "удельный_расход_топлива",
+        "fuel_price": "цена_топлива",
+    }
+
+    def __init__(self, gtu_specs=gtu_specs, reserve=None, min_load=None, no_load_share=None,
+                 fuel_per_MWh=None, fuel_price=None, initial_online=None):
+        params = {"min_load": min_load, "no_load_share": no_load_share,
+                  "fuel_per_MWh": fuel_per_MWh, "fuel_price": fuel_price}
+        for name, key in self.SPEC_KEYS.items():
+            if params[name] is None:
+                params[name] = gtu_specs.get(key)
+            if params[name] is None:
+                raise ValueError(
+                    f"Не задан параметр {name}: передайте его явно или задайте в gtu_specs ключ '{key}'")
+        min_load, no_load_share = params["min_load"], params["no_load_share"]
+        fuel_per_MWh, fuel_price = params["fuel_per_MWh"], params["fuel_price"]
+        if not 0 <= min_load <= 1:
+            raise ValueError(f"min_load должна быть в пределах [0, 1]: {min_load}")
+        if not 0 <= no_load_share <= 1:
+            raise ValueError(f"no_load_share должна быть в пределах [0, 1]: {no_load_share}")
+        self.gtu_specs = gtu_specs
+        self.n_units = gtu_specs['кол-во']
+        self.capacity = gtu_specs['мощность']
+        self.reserve = self.capacity if reserve is None else reserve
+        self.min_load = min_load
+        self.fuel_price = fuel_price
+        self.initial_online = initial_online
+
+        self.fuel_per_MWh = fuel_per_MWh
+        # Расход ПНГ одной включенной ГТУ на холостом ходу (м3/ч) и на каждый МВт*ч сверх него
+        self.no_load_fuel = self.fuel_per_MWh * self.capacity * no_load_share
+        self.marginal_fuel = self.fuel_per_MWh * (1 - no_load_share)
+        # Износ на моточас при полной загрузке: ТО и КР в пересчете на час наработки
+        self.wear_per_hour = (gtu_specs['ТО_стоимость'] / gtu_specs['ТО_периодичность']
+                              + gtu_specs['КР_стоимость'] / gtu_specs['КР_периодичность'])
+        self.start_hours = gtu_specs.get('время_запуска_из_холодного_резерва', 0)
+        self.start_cost = self.start_hours * self.no_load_fuel * fuel_price
+
+        # Состояния парка: все пары (работающие, горячий резерв) с суммой не больше n_units
+        working, hot = np.array([(g, h) for g in range(self.n_units + 1)
+                                 for h in range(self.n_units + 1 - g)]).T
+        self.working = working
+        self.hot = hot
+        self.online = working + hot
+        # Стоимость пусков при переходе из состояния (строка) в состояние (столбец)
+        self.transition_cost = self.start_cost * np.maximum(
+            self.online[None, :] - self.online[:, None], 0)
+
+    def hourly_costs(self, demand, available):
+        """
+        Стоимость часа (руб) в каждом состоянии для каждой пары (спрос МВт, доступно ГТУ),
+        np.inf для недопустимых состояний. Массив (len(demand), число состояний).
+        """
+        demand = np.asarray(demand, dtype=float)[:, None]
+        available = np.asarray(available)[:, None]
+        capacity = self.working * self.capacity
+        feasible = ((self.online <= available)
+                    & (capacity >= demand)
+                    & (capacity * self.min_load <= demand)
+                    & ((self.working > 0) | (demand == 0))
+                    & (capacity - demand + self.hot * self.capacity >= self.reserve))
+        # Часть затрат, зависящая от плана: холостой ход включенных ГТУ
+        cost = self.online * self.no_load_fuel * self.fuel_price * np.ones_like(demand)
+        return np.where(feasible, cost, np.inf)
+
+    def solve(self, demand, available=None, times=None):
+        """
+        План включения на часы с требуемой генерацией demand (МВт). available - число
+        ГТУ, не выведенных в ТО/КР, по часам (или одно число на весь горизонт).
+        Доступность по графику ТО/КР GTESModel дает maintenance_availability.
+        Возвращает Schedule. Если в какой-то час требования не выполнимы - ValueError.
+        """
+        demand = np.asarray(demand, dtype=float)
+        n_hours = len(demand)
+        if available is None:
+            available = self.n_units
+        available = np.broadcast_to(np.asarray(available, dtype=int), (n_hours,))
+        if not n_hours:
+            raise ValueError("Пустой горизонт планирования")
+
+        # Этапы: подряд идущие часы с одинаковыми входными данными
+        changed = (demand[1:] != demand[:-1]) | (available[1:] != available[:-1])
+        firsts = np.concatenate([[0], np.flatnonzero(changed) + 1])
+        lengths = np.diff(np.append(firsts, n_hours))
+        stage_costs = self.hourly_costs(demand[firsts], available[firsts]) * lengths[:, None]
+
+        # Прямой ход: value - минимальная стоимость до конца этапа в каждом состоянии,
+        # choices - из какого состояния в него пришли
+        n_states = len(self.online)
+        choices = np.zeros((len(firsts), n_states), dtype=np.int16)
+        value = stage_costs[0].copy()
+        if self.initial_online is not None:
+            value += self.start_cost * np.maximum(self.online - self.initial_online, 0)
+        for stage in range(len(firsts)):
+            allowed = np.flatnonzero(np.isfinite(stage_costs[stage]))
+            if not len(allowed):
+                hour = firsts[stage]
+                raise ValueError(
+                    f"Не выполнимы спрос {demand[hour]:.2f} МВт и резерв {self.reserve} МВт "
+                    f"при {available[hour]} доступных ГТУ (час {hour}"
+                    + (f", {times[hour]})" if times is not None else ")"))
+            if stage == 0:
+                continue
+            previous = np.flatnonzero(np.isfinite(value))
+            totals = value[previous, None] + self.transition_cost[np.ix_(previous, allowed)]
+            best = totals.argmin(axis=0)
+            value = np.full(n_states, np.inf)
+            value[allowed] = totals[best, np.arange(len(allowed))] + stage_costs[stage, allowed]
+            choices[stage, allowed] = previous[best]
+
+        # Обратный ход
+        states = np.empty(len(firsts), dtype=int)
+        states[-1] = value.argmin()
+        for stage in range(len(firsts) - 1, 0, -1):
+            states[stage - 1] = choices[stage, states[stage]]
+
+        working = np.repeat(self.working[states], lengths)
+        hot = np.repeat(self.hot[states], lengths)
+        load_factor = np.divide(demand, working * self.capacity,
+                                out=np.zeros(n_hours), where=working > 0)
+        return Schedule(times, demand, working, hot, load_factor,
+                        self.schedule_costs(demand, working + hot))
+
+    def schedule_costs(self, demand, online):
+        "Итоги плана: энергия, топливо, износ, пуски и общая стоимость, руб"
+        energy = float(demand.sum())
+        fuel = float(online.sum()) * self.no_load_fuel + energy * self.marginal_fuel
+        starts = int(np.maximum(np.diff(online), 0).sum())
+        if self.initial_online is not None:
+            starts += max(int(online[0]) - self.initial_online, 0)
+        costs = {
+            "выработка, МВт*ч": energy,
+            "электроэнергия": energy * GTESModel.prise_per_MW,
+            "топливо, м3": fuel + starts * self.start_hours * self.no_load_fuel,
+            "пуски": starts,
+            # Моточасы с учетом загрузки, как в GTESModel
+            "моточасы": energy / self.capacity,
+            "износ (ТО/КР)": energy / self.capacity * self.wear_per_hour,
+        }
+        costs["топливо"] = costs["топливо, м3"] * self.fuel_price
+        costs["итого"] = costs["электроэнергия"] + costs["топливо"] + costs["износ (ТО/КР)"]
+        return costs
+
+
+def main():
+    # План включения ГТУ на год по спросу потребителей: python -m UnitCommitment
+    start_date = datetime.datetime(2024, 6, 1)
+    end_date = datetime.datetime(2025, 6, 1)
+    times, demand = hourly_demand(start_date, end_date)
+    available = maintenance_availability(start_date, end_date)
+
+    started = time.perf_counter()
+    planner = UnitCommitment(min_load=MIN_LOAD, no_load_share=NO_LOAD_SHARE,
+                             fuel_per_MWh=GTESModel.fuel_per_MWh, fuel_price=FUEL_PRICE)
+    schedule = planner.solve(demand, available, times=times)
+    elapsed = time.perf_counter() - started
+
+    print(f"План на {len(demand)} ч рассчитан за {elapsed:.3f} с")
+    previous = None
+    for hour, current_time in enumerate(times):
+        state = (schedule.working[hour], schedule.hot_reserve[hour])
+        if state != previous:
+            print(f"{current_time:%d.%m.%Y %H:%M}: спрос {demand[hour]:.2f} МВт, "
+                  f"в работе {state[0]} ГТУ (загрузка {schedule.load_factor[hour]:.2f}), "
+                  f"горячий резерв {state[1]}")
+            previous = state
+    for name, value in schedule.costs.items():
+        print(f"{name}: {value:,}" if isinstance(value, int) else f"{name}: {value:,.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,103 +1,500 @@
-import PySimpleGUI as sg
-import matplotlib.pyplot as plt
-import networkx as nx
-import tempfile
-import os
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+# PySimpleGUI, matplotlib и networkx импортируются внутри функций, которым они нужны,
+# чтобы импорт модуля не тянул за собой GUI и графику
+
+# События окна от фонового расчета (см. start_task)
+PROGRESS_EVENT = "-PROGRESS-"
+DONE_EVENT = "-DONE-"
+STATE_EVENT = "-STATE-"  # Состояние схемы по ходу расчёта (см. post_schematic_state)
+PROGRESS_ROWS = 168  # Как часто сообщать о ходе моделирования, строк графика (неделя)
 
 
 # -----------------------------------------------------------------------------
-# 1. Функция, которая рисует схематическую диаграмму (граф) энергетической системы:
-#    - Узлы: ГТЭС, котельные, потребители
-#    - Рёбра: связь между узлами
+# 1. Функции и класс, которые рисуют схему (граф) энергетической системы по моделям:
+#    - Узлы: ГТЭС и её ГТУ, котельные, потребители
+#    - Рёбра: линии электропередачи PowerGridModel и тепловые сети HeatModel
+#    Расположение узлов кэшируется по топологии графа. Подписи и заголовок рисуются
+#    один раз в фон, при смене состояния перерисовываются только узлы и рёбра.
+#    Картинка создаётся в памяти (PNG-байты) без временных файлов.
 # -----------------------------------------------------------------------------
-def draw_energy_system_schematic():
+LAYOUT_SEED = 1  # Зерно spring_layout: одна и та же схема всегда выглядит одинаково
+# Цвета ГТУ по кодам состояний PowerPlantModel: в работе, горячий резерв,
+# холодный резерв, ТО, КР
+STATUS_COLORS = ("tab:green", "tab:orange", "tab:blue", "gold", "tab:red")
+KIND_COLORS = {"source": "tab:purple", "boiler": "tab:brown", "consumer": "lightgray"}
+EDGE_STYLES = {"bus": "solid", "electric": "solid", "heat": "dashed"}
+LOAD_COLORMAP = "YlOrRd"  # Цвет потребителя по загрузке от установленной мощности
+SCHEMATIC_CACHE_SIZE = 4  # Сколько последних схем держать в кэшах позиций и видов
+_layouts = OrderedDict()  # хэш топологии -> позиции узлов
+_views = OrderedDict()  # (хэш топологии, заголовок) -> SchematicView
+
+
+def _cached(cache, key, build):
+    "Значение из LRU-кэша cache; при промахе build(), самые старые записи вытесняются"
+    if key in cache:
+        cache.move_to_end(key)
+        return cache[key]
+    value = cache[key] = build()
+    while len(cache) > SCHEMATIC_CACHE_SIZE:
+        cache.popitem(last=False)
+    return value
+
+
+def build_schematic_graph(network=None, heat_model=None, power_plant=None):
     """
-    Создаёт упрощённую схему (граф) энергетической системы.
-    Возвращает путь к PNG-файлу с диаграммой, чтобы отобразить в PySimpleGUI.
+    Граф энергетической системы по моделям: ГТЭС и её ГТУ (power_plant.gtus),
+    линии network.power_lines (ГТЭС -> потребитель) и тепловые сети heat_model
+    (котельная -> объект). Не заданные модели берутся из build_energy_system.
+    У узлов атрибут kind: source, gtu, consumer, boiler; у рёбер - bus, electric, heat.
     """
+    import networkx as nx
+
+    if network is None or heat_model is None or power_plant is None:
+        from EnergySystemModel import build_energy_system
+
+        system = build_energy_system()
+        network = network or system.network
+        heat_model = heat_model or system.heat_model
+        power_plant = power_plant or system.power_plant
+    if not network.power_lines:
+        network.create_power_lines()
 
-    # Пример: создаём граф (networkx)
     G = nx.Graph()
+    source = "ГТЭС"
+    G.add_node(source, kind="source")
+    for gtu in power_plant.gtus:
+        G.add_node(gtu_node(gtu), kind="gtu", index=gtu.id)
+        G.add_edge(gtu_node(gtu), source, kind="bus")
+
+    for line in network.power_lines:
+        source = line.source.name
+        G.add_node(source, kind="source")
+        G.add_node(line.destination.name, kind="consumer")
+        G.add_edge(source, line.destination.name, kind="electric")
+
+    networks = heat_model.networks or heat_model.create_networks()
+    for obj, plant, _ in zip(heat_model.objects, heat_model.boiler_plants, networks):
+        G.add_node(plant.name, kind="boiler")
+        G.add_node(obj.name, kind="consumer")
+        G.add_edge(plant.name, obj.name, kind="heat")
+
+    return G
 
-    # Узлы-источники
-    G.add_node("ГТЭС")  # газотурбинная электростанция
-    G.add_node("Котельная-1")  # пример котельной
-    G.add_node("Котельная-2")
 
-    # Узлы-потребители (можно расширять)
-    G.add_node("УКПГ")
-    G.add_node("ОБП")
-    G.add_node("ВЖК")
+def gtu_node(gtu):
+    return f"ГТУ {gtu.id + 1}"
 
-    # Рёбра - связи между ними (электрические/тепловые линии)
-    G.add_edge("ГТЭС", "УКПГ")
-    G.add_edge("ГТЭС", "ОБП")
-    G.add_edge("ГТЭС", "ВЖК")
 
-    # Предположим, котельные обеспечивают теплом те же объекты:
-    G.add_edge("Котельная-1", "УКПГ")
-    G.add_edge("Котельная-2", "ОБП")
+def topology_key(G):
+    "Хэш топологии графа: не зависит от порядка добавления узлов и рёбер"
+    nodes = sorted(map(str, G.nodes))
+    edges = sorted(tuple(sorted((str(u), str(v)))) for u, v in G.edges)
+    return hashlib.sha1(repr((nodes, edges)).encode("utf-8")).hexdigest()
 
-    # Можно отрисовать как "сеть":
-    pos = nx.spring_layout(G)  # алгоритм позиционирования
 
-    # Рисуем
-    fig, ax = plt.subplots()
-    nx.draw_networkx(G, pos, with_labels=True, ax=ax)
-    plt.title("Схема энергетической системы")
+def schematic_layout(G, key=None):
+    """
+    Позиции узлов для графа G. spring_layout считается один раз на топологию
+    с фиксированным зерном, повторные вызовы берут позиции из кэша
+    (последние SCHEMATIC_CACHE_SIZE топологий).
+    """
+    import networkx as nx
+
+    key = key or topology_key(G)
+    return _cached(_layouts, key, lambda: nx.spring_layout(G, seed=LAYOUT_SEED))
 
-    # Сохраняем во временный PNG, чтобы затем вставить в GUI
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp:
-        tmp_filename = tmp.name
-    plt.savefig(tmp_filename)
-    plt.close(fig)
 
-    return tmp_filename
+def schematic_state(G, network=None, power_plant=None, current_time=None, demands=None):
+    """
+    Текущее состояние элементов схемы: {узел: (цвет, размер)} и {ребро: толщина}.
+    ГТУ окрашиваются по состоянию, размер - по коэффициенту загрузки.
+    Потребители окрашиваются по загрузке: demands {имя: кВт} или, если не задано,
+    calculate_power_demand(current_time) потребителей сети; толщина линии - та же загрузка.
+    """
+    from matplotlib import colormaps, colors
+
+    colormap = colormaps[LOAD_COLORMAP]
+    gtus = {gtu_node(gtu): gtu for gtu in power_plant.gtus} if power_plant is not None else {}
+    shares = {}
+    if network is not None:
+        for consumer in network.consumers:
+            if demands is not None:
+                demand = demands.get(consumer.name, 0.0)
+            elif current_time is not None:
+                demand = consumer.calculate_power_demand(current_time)
+            else:
+                continue
+            shares[consumer.name] = demand / (consumer.installed_power_electric * 1000)
+
+    nodes = {}
+    for node, data in G.nodes(data=True):
+        kind = data.get("kind")
+        if node in gtus:
+            gtu = gtus[node]
+            nodes[node] = (colors.to_rgba(STATUS_COLORS[gtu.status_code]),
+                           150 + 350 * (gtu.average_load_factor or 0.0))
+        elif node in shares:
+            nodes[node] = (colormap(min(shares[node], 1.0)), 300)
+        else:
+            nodes[node] = (colors.to_rgba(KIND_COLORS.get(kind, "lightgray")),
+                           500 if kind == "source" else 300)
+
+    edges = {}
+    for u, v, data in G.edges(data=True):
+        share = shares.get(v, shares.get(u)) if data.get("kind") == "electric" else None
+        edges[u, v] = 1.0 if share is None else 1.0 + 3.0 * min(share, 1.0)
+    return nodes, edges
+
+
+class SchematicView:
+    """
+    Схема с постоянными объектами matplotlib для одного графа.
+    При создании один раз считаются позиции узлов и рисуется фон - заголовок и подписи.
+    update меняет цвета и размеры только изменившихся узлов и толщины изменившихся
+    рёбер. Затем поверх сохранённого фона перерисовываются только узлы и рёбра,
+    без новой раскладки и без перерисовки подписей. Без изменений возвращается
+    прошлая картинка.
+    """
+
+    def __init__(self, G, title="Схема энергетической системы"):
+        import networkx as nx
+        import numpy as np
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.collections import LineCollection
+        from matplotlib.figure import Figure
+
+        self.graph = G
+        self.key = topology_key(G)
+        pos = schematic_layout(G, self.key)
+        self.nodes = list(G.nodes)
+        self.edges = list(G.edges)
+        self._node_index = {node: i for i, node in enumerate(self.nodes)}
+        self._edge_index = {}
+        for i, (u, v) in enumerate(self.edges):
+            self._edge_index[u, v] = self._edge_index[v, u] = i
+
+        initial_nodes, initial_edges = schematic_state(G)
+        self.node_colors = np.array([initial_nodes[node][0] for node in self.nodes])
+        self.node_sizes = np.array([initial_nodes[node][1] for node in self.nodes], dtype=float)
+        self.edge_widths = np.array([initial_edges[edge] for edge in self.edges])
+
+        self.figure = Figure(figsize=(8, 6))
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.ax = self.figure.subplots()
+        self.ax.set_axis_off()
+        self.ax.set_title(title)
+
+        # Узлы и рёбра - анимированные: canvas.draw их пропускает, они рисуются поверх фона
+        self.edge_artist = LineCollection(
+            [(pos[u], pos[v]) for u, v in self.edges],
+            linewidths=self.edge_widths, colors="gray",
+            linestyles=[EDGE_STYLES.get(G.edges[edge].get("kind"), "solid") for edge in self.edges],
+            zorder=1, animated=True)
+        self.ax.add_collection(self.edge_artist)
+        xy = np.array([pos[node] for node in self.nodes])
+        self.node_artist = self.ax.scatter(xy[:, 0], xy[:, 1], s=self.node_sizes,
+                                           c=self.node_colors, edgecolors="black",
+                                           linewidths=0.5, zorder=2, animated=True)
+        # Подписи под узлами, чтобы узлы поверх фона их не закрывали
+        nx.draw_networkx_labels(G, {node: (x, y - 0.06) for node, (x, y) in pos.items()},
+                                ax=self.ax, font_size=7)
+        self.ax.margins(0.08)
+
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self.png = None
+        self.redraws = 0  # Сколько раз перерисовывались узлы и рёбра
+
+    def update(self, nodes=None, edges=None):
+        """
+        nodes - {узел: (цвет, размер)}, edges - {(u, v): толщина}, как у schematic_state;
+        достаточно передать изменившиеся элементы. Возвращает PNG-байты.
+        """
+        changed = False
+        for node, (color, size) in (nodes or {}).items():
+            i = self._node_index[node]
+            if tuple(self.node_colors[i]) != tuple(color) or self.node_sizes[i] != size:
+                self.node_colors[i] = color
+                self.node_sizes[i] = size
+                changed = True
+        for edge, width in (edges or {}).items():
+            i = self._edge_index[edge]
+            if self.edge_widths[i] != width:
+                self.edge_widths[i] = width
+                changed = True
+
+        if changed or self.png is None:
+            self.node_artist.set_facecolors(self.node_colors)
+            self.node_artist.set_sizes(self.node_sizes)
+            self.edge_artist.set_linewidths(self.edge_widths)
+            self.png = self._render()
+        return self.png
+
+    def _render(self):
+        import matplotlib.image
+        import numpy as np
+
+        self.canvas.restore_region(self.background)
+        self.ax.draw_artist(self.edge_artist)
+        self.ax.draw_artist(self.node_artist)
+        self.redraws += 1
+
+        buffer = io.BytesIO()
+        matplotlib.image.imsave(buffer, np.asarray(self.canvas.buffer_rgba()), format="png")
+        return buffer.getvalue()
+
+
+def schematic_view(G, title="Схема энергетической системы"):
+    "SchematicView для графа G, один на топологию и заголовок (последние SCHEMATIC_CACHE_SIZE)"
+    return _cached(_views, (topology_key(G), title), lambda: SchematicView(G, title))
+
+
+def draw_energy_system_schematic(G=None, title="Схема энергетической системы", nodes=None,
+                                 edges=None):
+    """
+    Создаёт схему (граф) энергетической системы по моделям (см. build_schematic_graph).
+    nodes и edges - состояние элементов (см. schematic_state).
+    Возвращает PNG-картинку в виде байтов для sg.Image(data=...).
+    """
+    G = build_schematic_graph() if G is None else G
+    return schematic_view(G, title).update(nodes, edges)
 
 
 # -----------------------------------------------------------------------------
-# 2. Функция (заглушка), которая имитирует чтение CSV и расчёт/оптимизацию,
-#    возвращая "набор переключений" и "себестоимости".
-#    В реальном приложении вы бы здесь подгружали графики потребления
-#    и вызывали EnergySystemModel, GTESModel и пр.
+# 2. Функция, которая читает CSV с почасовыми графиками потребления и считает
+#    по нему итоги, а затем прогоняет по графику EnergySystemModel (сеть, ГТЭС
+#    и теплоснабжение). Файл читается потоково (LoadProfileReader), частями по
+#    chunk_size строк, поэтому размер выгрузки не ограничен памятью.
 # -----------------------------------------------------------------------------
-def run_simulation(csv_path):
+def run_simulation(csv_path, chunk_size=10000, progress=None, cancel=None, model=None,
+                   state=None):
     """
-    Заглушка, имитирующая работу оптимизационной модели.
-    :param csv_path: путь к CSV с графиками потребления
+    Расчёт по графику потребления.
+    :param csv_path: путь к CSV с графиками потребления (формат - см. LoadProfileReader)
+    :param progress: функция progress(текст, доля 0..1 или None) для сообщений о ходе расчёта
+    :param cancel: threading.Event; если он установлен, расчёт останавливается,
+                   и возвращаются итоги за уже обработанную часть графика
+    :param model: EnergySystemModel для расчёта, по умолчанию build_energy_system().
+                  После расчёта по нему можно обновить схему (schematic_state)
+    :param state: функция state(метка времени, нагрузки {имя: кВт}), вызывается в потоке
+                  расчёта раз в PROGRESS_ROWS строк, когда модель учла все предыдущие
+                  строки графика, - например, для схемы по ходу расчёта (post_schematic_state)
     :return: (commands, cost_info)
-      commands  - текст с командами переключений
-      cost_info - текст с итоговыми себестоимостями
+      commands  - текст со сводкой по графику нагрузки и ошибочным строкам
+      cost_info - текст с затратами по видам энергии и потреблением по объектам
     """
+    from EnergySystemModel import build_energy_system
+    from LoadProfiles import LoadProfileReader
 
-    # 1) Загрузить csv_path, парсить потребления (тепло/электричество)
-    # 2) Запустить EnergySystemModel (или HeatSystemModel + PowerGridModel + GTESModel)
-    # 3) Получить результаты: переключения, общую себестоимость и т.д.
+    reader = LoadProfileReader(csv_path, chunk_size=chunk_size)
+    energy = None
+    peak_load, peak_time = 0.0, None
+    first_time = last_time = None
 
-    # Для демонстрации вернём "заглушку":
-    commands = (
-        "Рекомендуемый набор переключений:\n"
-        " - Включить ГТУ #1 с 00:00 до 06:00\n"
-        " - Перевести ГТУ #2 в резерв после 06:00\n"
-        " - Котельную-1 поддерживать в режиме 50%\n"
-        " - ... (далее по алгоритму)\n"
-    )
+    for chunk in reader.chunks():
+        totals = chunk.values.sum(axis=1)
+        peak = int(totals.argmax())
+        if peak_time is None or totals[peak] > peak_load:
+            peak_load, peak_time = float(totals[peak]), chunk.times[peak]
+        chunk_energy = chunk.values.sum(axis=0)
+        energy = chunk_energy if energy is None else energy + chunk_energy
+        if first_time is None:
+            first_time = chunk.times[0]
+        last_time = chunk.times[-1]
+        if progress is not None:
+            progress(f"Чтение графика: {reader.rows_read} строк", None)
+        if cancel is not None and cancel.is_set():
+            break
+
+    if energy is None:
+        commands = "В файле нет ни одной корректной строки графика.\n"
+    else:
+        commands = (
+            f"График нагрузки: {reader.rows_read} ч, с {first_time} по {last_time}\n"
+            f" - Пиковая нагрузка: {peak_load / 1000:.2f} МВт ({peak_time})\n"
+            f" - Суммарное потребление: {energy.sum() / 1000:.2f} МВт*ч\n"
+        )
+    if reader.errors:
+        commands += f"Пропущено ошибочных строк: {len(reader.errors)}\n"
+        for line_number, reason in reader.errors[:10]:
+            commands += f" - строка {line_number}: {reason}\n"
+
+    if cancel is not None and cancel.is_set():
+        commands += "Чтение графика прервано, сводка - по прочитанной части.\n"
+    if energy is None or (cancel is not None and cancel.is_set()):
+        return commands, "Расчёт не выполнялся.\n"
+
+    # Второй проход по файлу: период графика уже известен
+    model = model or build_energy_system()
+    row_state = None
+    if state is not None:
+        # Нагрузки строки - по именам из заголовка графика, без заголовка - по порядку
+        names = reader.consumers or [consumer.name for consumer in model.consumers]
+
+        def row_state(current_time, loads):
+            state(current_time, dict(zip(names, loads)))
+
+    profile = TrackedProfile(reader, reader.rows_read, progress, cancel, row_state)
+    model.simulate(first_time, last_time, load_profile=profile)
+    if profile.stopped_at is not None:
+        commands += (f"Расчёт прерван: учтено {profile.rows_done} ч из {reader.rows_read}, "
+                     f"по {profile.stopped_at}. Себестоимость ниже - за учтённую часть.\n")
+    plant = model.power_plant
+    electricity_cost = (model.total_power_generated * plant.prise_per_MW
+                        + model.total_maintenance_cost + model.total_salary_cost)
     cost_info = (
         "Себестоимость:\n"
-        " - Электроэнергия: 2.34 руб/кВт*ч (среднее)\n"
-        " - Тепловая энергия: 4000 руб/Гкал (при утилизации) или 4500 руб/Гкал (из котельных)\n"
-        " - Итого за период: 14 200 000 руб.\n"
+        f" - Электроэнергия: выработка {model.total_power_generated:.2f} МВт*ч, "
+        f"затраты {electricity_cost:.2f} руб."
+    )
+    if model.total_power_generated:
+        cost_info += f", {electricity_cost / (model.total_power_generated * 1000):.2f} руб/кВт*ч"
+    cost_info += (
+        f"\n - Топливо ГТЭС: {model.total_fuel_consumption:.2f} м3\n"
+        f" - Тепловая энергия: топливо котельных {model.total_heat_fuel_consumption:.2f} м3, "
+        f"затраты {model.heat_model.total_cost:.2f} руб.\n"
     )
+    if round(model.total_unserved, 2):
+        cost_info += f" - Непокрытый спрос: {model.total_unserved:.2f} МВт*ч\n"
+
+    cost_info += "Потребление по объектам:\n"
+    for name, value in zip(reader.consumers, energy.tolist()):
+        cost_info += f" - {name}: {value / 1000:.2f} МВт*ч\n"
 
     return commands, cost_info
 
 
+class TrackedProfile:
+    """
+    График нагрузки для EnergySystemModel.simulate с сообщениями о ходе расчёта
+    (моделируемая дата раз в PROGRESS_ROWS строк) и остановкой по cancel.
+    С той же периодичностью вызывается state(метка времени, нагрузки строки).
+    После остановки модель подводит итоги за уже пройденные строки.
+    """
+
+    def __init__(self, profile, total_rows, progress=None, cancel=None, state=None):
+        self.profile = profile
+        self.consumers = profile.consumers
+        self.total_rows = total_rows
+        self.progress = progress
+        self.cancel = cancel
+        self.state = state
+        self.rows_done = 0
+        self.stopped_at = None  # Метка времени, на которой расчёт был прерван
+
+    def __iter__(self):
+        for current_time, loads in self.profile:
+            if self.cancel is not None and self.cancel.is_set():
+                self.stopped_at = current_time
+                return
+            if self.rows_done % PROGRESS_ROWS == 0:
+                if self.progress is not None:
+                    self.progress(f"Моделирование: {current_time:%d.%m.%Y %H:%M}",
+                                  self.rows_done / max(self.total_rows, 1))
+                if self.state is not None:
+                    self.state(current_time, loads)
+            self.rows_done += 1
+            yield current_time, loads
+
+
+def run_optimization(progress=None, cancel=None, model=None):
+    """
+    Подбор загрузки ГТУ генетическим алгоритмом (Optimization.GeneticOptimizer).
+    Ход расчёта - номер поколения и лучшая стоимость - передаётся в progress.
+    При установленном cancel возвращается лучшее решение из уже рассчитанных поколений.
+    :param model: EnergySystemModel; если задан, его ГТЭС заменяется на ГТЭС с лучшей
+                  загрузкой, рассчитанную за период оптимизации. По ней можно
+                  перестроить схему (build_schematic_graph, schematic_state)
+    :return: (commands, cost_info), как у run_simulation
+    """
+    import Optimization
+    from PowerPlantModel import GTESModel
+
+    def report(generation, best_fitness, mean_fitness, best):
+        if progress is not None:
+            progress(f"Поколение {generation} из {optimizer.generations}: "
+                     f"лучшая стоимость {best_fitness:.2f} руб.",
+                     generation / optimizer.generations)
+
+    # Оценка в этом же потоке (populationFitness): пакетная оценка популяции быстрая,
+    # а пул процессов из фонового потока GUI не запускаем
+    optimizer = Optimization.GeneticOptimizer(Optimization.populationFitness,
+                                              patience=Optimization.PATIENCE)
+    best, best_cost = optimizer.run(callback=report, cancel=cancel)
+    if model is not None:
+        power_plant = GTESModel(Optimization.gtu_specs, best.tolist(),
+                                engine=Optimization.SIMULATION_ENGINE)
+        power_plant.simulate(Optimization.START_DATE, Optimization.END_DATE)
+        model.power_plant = power_plant
+
+    commands = "Рекомендуемая загрузка ГТУ:\n"
+    for number, load in enumerate(best.tolist(), 1):
+        commands += f" - ГТУ {number}: {load:.2f}\n"
+    reasons = {
+        Optimization.STOP_CANCELLED: "остановлена пользователем",
+        Optimization.STOP_STALLED: f"завершена: {optimizer.patience} поколений подряд "
+                                   f"без улучшения стоимости",
+        Optimization.STOP_TIME_BUDGET: "завершена: истекло отведенное время",
+        Optimization.STOP_EVALUATIONS: "завершена: исчерпан предел расчетов модели",
+    }
+    if optimizer.stopReason in reasons:
+        commands += (f"Оптимизация {reasons[optimizer.stopReason]} "
+                     f"(поколение {optimizer.generation} из {optimizer.generations}).\n")
+    cost_info = (
+        f"Затраты ГТЭС за {Optimization.START_DATE:%d.%m.%Y} - {Optimization.END_DATE:%d.%m.%Y}: "
+        f"{best_cost:.2f} руб.\n"
+    )
+    return commands, cost_info
+
+
+def start_task(window, function, *args, **kwargs):
+    """
+    Запуск function(*args, **kwargs, progress=..., cancel=...) в фоновом потоке, чтобы окно
+    не зависало на время расчёта. Ход расчёта приходит в окно событием PROGRESS_EVENT
+    со значением (текст, доля), результат или исключение - событием DONE_EVENT.
+    Возвращает threading.Event для отмены расчёта.
+    """
+    cancel = threading.Event()
+
+    def progress(text, fraction=None):
+        window.write_event_value(PROGRESS_EVENT, (text, fraction))
+
+    def worker():
+        try:
+            result = function(*args, progress=progress, cancel=cancel, **kwargs)
+        except Exception as error:
+            result = error
+        window.write_event_value(DONE_EVENT, result)
+
+    threading.Thread(target=worker, daemon=True).start()
+    return cancel
+
+
+def post_schematic_state(window, G, model):
+    """
+    Функция state для run_simulation: состояние схемы G по моделям model (EnergySystemModel)
+    снимается в потоке расчёта, пока модель не меняется, и приходит в окно событием
+    STATE_EVENT со значением (nodes, edges), как у schematic_state.
+    """
+    def state(current_time, demands):
+        window.write_event_value(STATE_EVENT, schematic_state(
+            G, model.network, model.power_plant, current_time, demands))
+
+    return state
+
+
 # -----------------------------------------------------------------------------
 # 3. Основная функция, создающая окно (GUI) и объединяющая всё.
 #    Пользователь указывает CSV, нажимает "Run Simulation",
 #    видит схему системы, текст рекомендаций и себестоимости.
 # -----------------------------------------------------------------------------
 def main():
+    import PySimpleGUI as sg
+
     sg.change_look_and_feel(
         "SystemDefault"
     )  # стиль оформления (не меняем цвета вручную)
@@ -109,7 +506,16 @@ def main():
             sg.Input(key="-CSV-"),
             sg.FileBrowse(),
         ],
-        [sg.Button("Выполнить расчёт"), sg.Button("Выход")],
+        [
+            sg.Button("Выполнить расчёт"),
+            sg.Button("Оптимизация загрузки ГТУ"),
+            sg.Button("Отмена", disabled=True),
+            sg.Button("Выход"),
+        ],
+        [
+            sg.ProgressBar(1000, orientation="h", size=(40, 15), key="-BAR-"),
+            sg.Text("", size=(50, 1), key="-STATUS-"),
+        ],
         [sg.Text("Рекомендуемый набор команд (переключений):")],
         [sg.Multiline(size=(80, 8), key="-COMMANDS-")],
         [sg.Text("Себестоимость по каждому виду энергии:")],
@@ -121,22 +527,77 @@ def main():
     # Создаём окно
     window = sg.Window("Энергетическая система месторождения", layout, finalize=True)
 
-    # Рисуем/обновляем схему в Image
-    schematic_file = draw_energy_system_schematic()
-    window["-SCHEMATIC-"].update(filename=schematic_file)
+    # Рисуем схему в Image. Она строится по моделям системы, по ходу расчёта и после него
+    # узлы и линии перекрашиваются по состоянию модели
+    from EnergySystemModel import build_energy_system
+
+    system = build_energy_system()
+    schematic = build_schematic_graph(system.network, system.heat_model, system.power_plant)
+    window["-SCHEMATIC-"].update(data=draw_energy_system_schematic(schematic))
+
+    # Основной цикл обработки событий. Расчёты идут в фоновом потоке (start_task),
+    # окно в это время продолжает обрабатывать события
+    cancel = None  # threading.Event текущего расчёта, None - расчёта нет
+    task_buttons = ("Выполнить расчёт", "Оптимизация загрузки ГТУ")
+
+    def set_running(running):
+        for key in task_buttons:
+            window[key].update(disabled=running)
+        window["Отмена"].update(disabled=not running)
 
-    # Основной цикл обработки событий
     while True:
         event, values = window.read()
         if event == sg.WIN_CLOSED or event == "Выход":
+            if cancel is not None:
+                cancel.set()
             break
-        elif event == "Выполнить расчёт":
-            csv_path = values["-CSV-"]  # путь к выбранному пользователем CSV
-            # вызывать run_simulation(csv_path):
-            recommended_cmds, cost_info = run_simulation(csv_path)
+        elif event in task_buttons:
+            window["-COMMANDS-"].update("")
+            window["-COST-"].update("")
+            window["-BAR-"].update(current_count=0)
+            set_running(True)
+            system = build_energy_system()
+            schematic = build_schematic_graph(system.network, system.heat_model,
+                                              system.power_plant)
+            if event == "Выполнить расчёт":
+                csv_path = values["-CSV-"]  # путь к выбранному пользователем CSV
+                cancel = start_task(window, run_simulation, csv_path, model=system,
+                                    state=post_schematic_state(window, schematic, system))
+            else:
+                cancel = start_task(window, run_optimization, model=system)
+        elif event == "Отмена":
+            cancel.set()
+            window["-STATUS-"].update("Остановка расчёта...")
+        elif event == STATE_EVENT:
+            nodes, edges = values[event]
+            window["-SCHEMATIC-"].update(
+                data=draw_energy_system_schematic(schematic, nodes=nodes, edges=edges))
+        elif event == PROGRESS_EVENT:
+            text, fraction = values[event]
+            window["-STATUS-"].update(text)
+            if fraction is not None:
+                window["-BAR-"].update(current_count=int(fraction * 1000))
+        elif event == DONE_EVENT:
+            result = values[event]
+            cancel = None
+            set_running(False)
+            if isinstance(result, Exception):
+                window["-STATUS-"].update(f"Ошибка: {result}")
+                continue
+            recommended_cmds, cost_info = result
+            # Схема на конец расчёта; после оптимизации в system уже ГТЭС с лучшей
+            # загрузкой, поэтому граф строится заново по текущим моделям
+            schematic = build_schematic_graph(system.network, system.heat_model,
+                                              system.power_plant)
+            nodes, edges = schematic_state(schematic, system.network, system.power_plant,
+                                           system.end_date or system.power_plant.end_date)
+            window["-SCHEMATIC-"].update(
+                data=draw_energy_system_schematic(schematic, nodes=nodes, edges=edges))
             # обновить поля на экране
             window["-COMMANDS-"].update(recommended_cmds)
             window["-COST-"].update(cost_info)
+            window["-STATUS-"].update("Расчёт завершён")
+            window["-BAR-"].update(current_count=1000)
 
     # Закрываем окно
     window.close()
@@ -0,0 +1,43 @@
+import datetime
+import math
+
+import pytest
+
+import BatchRunner
+
+SCENARIOS = [
+    {"name": "gtes", "model": "gtes", "start": "2024-06-01", "end": "2024-09-01"},
+    {"name": "heat", "model": "heat", "start": "2024-06-01", "end": "2024-09-01"},
+    {"name": "bad", "model": "nope"},
+]
+
+
+def test_models_write_their_own_cost_columns():
+    gtes, heat, bad = BatchRunner.run_batch(SCENARIOS, max_workers=1)
+    assert gtes["ok"] and heat["ok"] and not bad["ok"]
+    assert "gtes_cost" in gtes and "gtes_cost" not in heat
+    assert "heat_fuel_cost" in heat and "heat_fuel_cost" not in gtes
+    assert "cost" not in gtes and "cost" not in heat
+
+    columns = BatchRunner.to_columns([gtes, heat, bad])
+    assert columns["gtes_cost"][0] == gtes["gtes_cost"]
+    assert math.isnan(columns["gtes_cost"][1]) and math.isnan(columns["heat_fuel_cost"][0])
+
+
+def test_results_round_trip(tmp_path):
+    rows = BatchRunner.run_batch(SCENARIOS, max_workers=1)
+    path = tmp_path / "results.npz"
+    BatchRunner.save_results(path, rows)
+    loaded = BatchRunner.load_results(path)
+    expected = BatchRunner.to_columns(rows)
+    assert set(loaded) == set(expected)
+    for name, column in expected.items():
+        if column.dtype.kind == "f":
+            assert loaded[name].tolist() == pytest.approx(column.tolist(), nan_ok=True)
+        else:
+            assert loaded[name].tolist() == column.tolist()
+
+
+def test_horizon_from_29_february():
+    start, end = BatchRunner.horizon({"start": "2024-02-29", "years": 1})
+    assert (start, end) == (datetime.datetime(2024, 2, 29), datetime.datetime(2025, 2, 28))
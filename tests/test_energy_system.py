@@ -0,0 +1,37 @@
+import contextlib
+import datetime
+import io
+
+import pytest
+
+from EnergySystemModel import build_energy_system
+
+START = datetime.datetime(2024, 9, 20)
+END = START + datetime.timedelta(hours=1223)  # Четное число часов, с 2 месячными границами
+
+
+def simulate(engine, time_step_hours=1):
+    model = build_energy_system(engine=engine)
+    with contextlib.redirect_stdout(io.StringIO()):
+        model.simulate(START, END, time_step_hours=time_step_hours)
+    return model
+
+
+def totals(model):
+    return [model.total_power_generated, model.total_power_consumed, model.total_unserved,
+            model.total_fuel_consumption, model.total_heat_fuel_consumption,
+            model.total_salary_cost, model.total_maintenance_cost]
+
+
+@pytest.mark.parametrize("time_step_hours", [1, 2])
+def test_segments_match_loop(time_step_hours):
+    reference = totals(simulate("loop", time_step_hours))
+    assert totals(simulate("segments", time_step_hours)) == pytest.approx(reference, rel=1e-9)
+
+
+def test_energy_totals_do_not_depend_on_step_length():
+    # Итоги - энергия (МВт*ч): шаги по 2 часа покрывают те же 1224 часа с тем же спросом
+    hourly = simulate("loop", 1)
+    two_hourly = simulate("loop", 2)
+    for name in ("total_power_generated", "total_power_consumed", "total_fuel_consumption"):
+        assert getattr(two_hourly, name) == pytest.approx(getattr(hourly, name), rel=1e-9)
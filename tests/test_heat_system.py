@@ -0,0 +1,39 @@
+import contextlib
+import datetime
+import io
+
+import numpy as np
+import pytest
+
+from HeatSystemModel import ClimateSeries, HeatModel, build_heat_objects
+
+START = datetime.datetime(2024, 1, 1)
+
+
+def test_climate_series_round_trip(tmp_path):
+    temperatures = np.arange(24 * 3, dtype=np.float32) / 10
+    climate = ClimateSeries.write(tmp_path / "climate.bin", START, temperatures)
+    assert climate.start_date == START
+    assert climate.step == datetime.timedelta(hours=1)
+    assert len(climate) == len(temperatures)
+    assert climate[5] == pytest.approx(0.5)
+    assert climate.daily_means(START + datetime.timedelta(days=1), 2).tolist() == pytest.approx(
+        temperatures.reshape(3, 24).mean(axis=1)[1:].tolist())
+
+
+@pytest.mark.parametrize("step_hours", [5, 7, 25])
+def test_climate_series_rejects_step_not_dividing_day(tmp_path, step_hours):
+    with pytest.raises(ValueError):
+        ClimateSeries.write(tmp_path / "climate.bin", START, np.zeros(100), step_hours=step_hours)
+
+
+@pytest.mark.parametrize("engine", ["numpy", "segments"])
+def test_engines_match_loop(engine):
+    def simulate(engine):
+        objects, boiler_plants = build_heat_objects()
+        model = HeatModel(objects, boiler_plants, engine=engine)
+        with contextlib.redirect_stdout(io.StringIO()):
+            model.simulate(datetime.datetime(2024, 6, 1), datetime.datetime(2025, 6, 1))
+        return [model.total_fuel_consumption, model.total_heat_loss, model.total_cost]
+
+    assert simulate(engine) == pytest.approx(simulate("loop"), rel=1e-9)
@@ -0,0 +1,36 @@
+import contextlib
+import datetime
+import io
+
+import pytest
+
+from LineFromGrid import PowerGridModel, build_consumers
+from SegmentEngine import horizon_hours, salary_months
+
+START = datetime.datetime(2024, 6, 1)
+END = datetime.datetime(2025, 6, 1)
+
+
+def simulate(engine):
+    model = PowerGridModel(build_consumers(), engine=engine)
+    with contextlib.redirect_stdout(io.StringIO()):
+        model.simulate(START, END)
+    return (model.total_power_loss_kwh, model.total_personnel_cost,
+            [consumer.total_power_consumption for consumer in model.consumers])
+
+
+@pytest.mark.parametrize("engine", ["numpy", "segments"])
+def test_engines_match_loop(engine):
+    loss, personnel, consumption = simulate(engine)
+    reference_loss, reference_personnel, reference_consumption = simulate("loop")
+    assert loss == pytest.approx(reference_loss, rel=1e-9)
+    assert personnel == reference_personnel
+    assert consumption == pytest.approx(reference_consumption, rel=1e-9)
+
+
+def test_horizon_hours_and_salary_months():
+    n_hours = horizon_hours(START, END)
+    assert n_hours == 365 * 24 + 1
+    assert salary_months(START, n_hours) == 13
+    assert horizon_hours(END, START) == 0
+    assert salary_months(START, 0) == 0
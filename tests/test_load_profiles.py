@@ -0,0 +1,73 @@
+import contextlib
+import datetime
+import io
+
+import pytest
+
+from EnergySystemModel import build_energy_system
+from LoadProfiles import LoadProfileReader, parse_number
+
+START = datetime.datetime(2024, 9, 28)
+END = START + datetime.timedelta(hours=120)  # С границей месяца
+
+
+def write_profile(path, consumers, start, end):
+    "График нагрузки по calculate_power_demand в формате выгрузки: ';', запятая в числах"
+    lines = ["Дата и время;" + ";".join(consumer.name for consumer in consumers)]
+    current_time = start
+    while current_time <= end:
+        loads = [repr(consumer.calculate_power_demand(current_time)).replace(".", ",")
+                 for consumer in consumers]
+        lines.append(f"{current_time:%d.%m.%Y %H:%M};" + ";".join(loads))
+        current_time += datetime.timedelta(hours=1)
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def test_parse_number():
+    assert parse_number("1\xa0234,5") == 1234.5
+    assert parse_number(" - ", missing=-1.0) == -1.0
+    with pytest.raises(ValueError):
+        parse_number("abc")
+
+
+def test_reader_round_trip_and_errors(tmp_path):
+    path = tmp_path / "profile.csv"
+    path.write_text("Дата и время;А;Б\n"
+                    "01.01.2024 00:00;1,5;2\n"
+                    "2024-01-01 01:00:00;–;3 000,25\n"
+                    "01.01.2024 02:00;1\n"
+                    "32.01.2024 03:00;1;2\n"
+                    "01.01.2024 04:00;4;x\n"
+                    "01.01.2024 05:00;6;7\n"
+                    "\n", encoding="utf-8")
+    reader = LoadProfileReader(path, chunk_size=2)
+    chunks = list(reader.chunks())
+    assert [len(chunk.times) for chunk in chunks] == [2, 1]
+    assert reader.consumers == ["А", "Б"]
+    assert list(reader) == [
+        (datetime.datetime(2024, 1, 1, 0), [1.5, 2.0]),
+        (datetime.datetime(2024, 1, 1, 1), [0.0, 3000.25]),
+        (datetime.datetime(2024, 1, 1, 5), [6.0, 7.0]),
+    ]
+    assert reader.rows_read == 3
+    assert [line for line, _ in reader.errors] == [4, 5, 6]
+
+    with pytest.raises(ValueError):
+        list(LoadProfileReader(path, max_errors=2))
+
+
+def test_simulate_from_profile_matches_demand(tmp_path):
+    # График, записанный по calculate_power_demand, дает те же итоги, что и расчет по ней
+    reference = build_energy_system()
+    path = tmp_path / "profile.csv"
+    write_profile(path, reference.consumers, START - datetime.timedelta(hours=5),
+                  END + datetime.timedelta(hours=5))
+    model = build_energy_system()
+    with contextlib.redirect_stdout(io.StringIO()):
+        reference.simulate(START, END)
+        model.simulate(START, END, load_profile=LoadProfileReader(path, chunk_size=17))
+    for name in ("total_power_generated", "total_power_consumed", "total_unserved",
+                 "total_fuel_consumption", "total_salary_cost", "total_maintenance_cost"):
+        assert getattr(model, name) == pytest.approx(getattr(reference, name), rel=1e-12)
+    assert [consumer.total_power_consumption for consumer in model.consumers] == pytest.approx(
+        [consumer.total_power_consumption for consumer in reference.consumers], rel=1e-12)
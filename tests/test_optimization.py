@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from Optimization import GeneticOptimizer, PATIENCE, STOP_EVALUATIONS, STOP_GENERATIONS, STOP_STALLED
+from Optimizers import OPTIMIZERS, createOptimizer
+
+
+def constant_fitness(population):
+    return np.zeros(len(population))
+
+
+def test_select_draws_from_whole_population():
+    # При элитизме побеждает меньше индивидуумов, чем есть в популяции, но в турнирах
+    # должны участвовать все строки, включая последние
+    optimizer = GeneticOptimizer(constant_fitness, population_size=10, elite=3, seed=0)
+    population = np.arange(10, dtype=float)[:, None] * np.ones((1, optimizer.n_genes))
+    fitness = np.zeros(10)
+    selected = set()
+    for _ in range(200):
+        winners = optimizer.select(population, fitness, n=7)
+        assert len(winners) == 7
+        selected.update(winners[:, 0].tolist())
+    assert selected == set(range(10))
+
+
+def test_elite_survives_generation():
+    optimizer = GeneticOptimizer(lambda population: population.sum(axis=1),
+                                 population_size=10, elite=2, seed=1)
+    optimizer.start()
+    best = optimizer.population[np.argsort(optimizer.fitness, kind="stable")[:2]].copy()
+    optimizer.step()
+    assert np.array_equal(optimizer.population[:2], best)
+
+
+def test_stall_stop_is_opt_in():
+    # Без patience постоянная приспособленность не останавливает расчет раньше срока
+    optimizer = GeneticOptimizer(constant_fitness, population_size=10, generations=15, seed=2)
+    optimizer.run()
+    assert optimizer.stopReason == STOP_GENERATIONS
+    assert optimizer.generation == 15
+
+    optimizer = GeneticOptimizer(constant_fitness, population_size=10, generations=15,
+                                 patience=PATIENCE, seed=2)
+    optimizer.run()
+    assert optimizer.stopReason == STOP_STALLED
+    assert optimizer.generation < 15
+
+
+@pytest.mark.parametrize("name", sorted(OPTIMIZERS))
+def test_optimizers_find_minimum_within_budget(name):
+    # Затраты - квадрат расстояния до 0.8 по каждому гену; оценки считаются по строкам
+    evaluated = []
+
+    def evaluate(population):
+        evaluated.extend(map(tuple, population.tolist()))
+        return ((population - 0.8) ** 2).sum(axis=1)
+
+    optimizer = createOptimizer(name, evaluate, n_genes=3, max_evaluations=300, seed=0)
+    genes, cost = optimizer.run()
+    assert genes.tolist() == pytest.approx([0.8] * 3, abs=0.011)
+    assert cost == ((genes - 0.8) ** 2).sum()
+    assert optimizer.evaluations == len(evaluated)
+    assert optimizer.stopReason in (STOP_GENERATIONS, STOP_EVALUATIONS)
+    points = np.array(evaluated)
+    # У ГА bounds - только начальная популяция, мутация дает значения из mutation_bounds
+    low, high = zip(optimizer.bounds, getattr(optimizer, "mutation_bounds", optimizer.bounds))
+    assert ((points >= min(low)) & (points <= max(high))).all()
+    assert np.array_equal(points, np.round(points, optimizer.decimals))
+
+
+def test_unknown_optimizer_name():
+    with pytest.raises(ValueError):
+        createOptimizer("annealing")
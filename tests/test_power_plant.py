@@ -0,0 +1,139 @@
+import datetime
+import logging
+
+import numpy as np
+import pytest
+
+import PowerPlantModel
+from PowerPlantModel import GTESFleetBatch, GTESModel, gtu_specs, load_factors, sequential_sum, steps_to_reach
+
+START = datetime.datetime(2024, 1, 1)
+
+# Загрузки ниже 0.15 дают горячий и холодный резерв, который передается при ТО/КР
+RESERVE_HEAVY = [0.05, 0, 0, 0.1, 0, 0, 0, 0.05, 0.05]
+
+
+def simulate(lf, engine, end):
+    model = GTESModel(gtu_specs, lf, engine=engine)
+    cost = model.simulate(START, end)
+    state = [(gtu.status_code, gtu.to_counter, gtu.kr_counter, gtu.total_run_hours,
+              gtu.run_hours, gtu.hours_since_kr) for gtu in model.gtus]
+    reserves = (model.hot_reserve and model.hot_reserve.id,
+                model.cold_reserve and model.cold_reserve.id)
+    return cost, state, reserves
+
+
+@pytest.mark.parametrize("lf", [load_factors, RESERVE_HEAVY,
+                                [0.6, 0.12, 0, 0.75, 0.05, 0.6, 0, 0.95, 0.3]])
+@pytest.mark.parametrize("engine", ["numpy", "event"])
+def test_engines_match_loop(lf, engine):
+    end = datetime.datetime(2028, 1, 1)
+    cost, state, reserves = simulate(lf, engine, end)
+    reference_cost, reference_state, reference_reserves = simulate(lf, "loop", end)
+    assert cost == pytest.approx(reference_cost, rel=1e-9)
+    assert state == reference_state
+    assert reserves == reference_reserves
+
+
+@pytest.mark.parametrize("engine", GTESModel.engines)
+def test_engines_log_kr_instead_of_printing(engine, capsys, caplog):
+    caplog.set_level(logging.DEBUG, logger="PowerPlantModel")
+    simulate(load_factors, engine, datetime.datetime(2026, 1, 1))
+    assert capsys.readouterr().out == ""
+    assert any("уходит на КР" in record.getMessage() for record in caplog.records)
+
+
+@pytest.mark.parametrize("lf", [load_factors, RESERVE_HEAVY])
+def test_array_step_matches_scalar_step(lf, monkeypatch):
+    end = datetime.datetime(2026, 1, 1)
+    reference = simulate(lf, "loop", end)
+    monkeypatch.setattr(PowerPlantModel, "SCALAR_STEP_MAX_GTU", 0)
+    assert simulate(lf, "loop", end) == reference
+
+
+def fleet_state(model):
+    return ([(gtu.status_code, gtu.to_counter, gtu.kr_counter, gtu.total_run_hours, gtu.run_hours,
+              gtu.hours_since_kr, gtu.end_maintenance) for gtu in model.gtus],
+            model.total_energy_generated, model.total_salary_cost, model.total_maintenance_cost,
+            model.hot_reserve and model.hot_reserve.id, model.cold_reserve and model.cold_reserve.id)
+
+
+@pytest.mark.parametrize("lf", [load_factors, RESERVE_HEAVY])
+def test_generate_matches_hourly_dispatch(lf):
+    specs = dict(gtu_specs, **{'ТО_периодичность': 300, 'КР_периодичность': 700})
+    model = GTESModel(specs, lf)
+    reference = GTESModel(specs, lf)
+    current_time = START
+    for required, hours in [(20.0, 744), (3.5, 1), (60.0, 2000), (0.0, 24), (7.25, 3000)]:
+        actual_mw, fuel = model.generate(required, current_time, hours)
+        energy = 0.0
+        for hour in range(hours):
+            energy += reference.step(current_time + datetime.timedelta(hours=hour),
+                                     reference.dispatch(required))
+        assert actual_mw == energy / hours
+        assert fuel == energy * GTESModel.fuel_per_MWh
+        assert fleet_state(model) == fleet_state(reference)
+        current_time += datetime.timedelta(hours=hours)
+
+@pytest.mark.parametrize("step", [0.05, 0.1, 0.6, 1 / 3, 0.5, 0.123456789])
+@pytest.mark.parametrize("value", [0.0, 0.1, 1234.5])
+def test_sequential_sum_matches_hourly_addition(step, value):
+    steps = np.full(70001, step)
+    steps[0] = value
+    expected = np.add.accumulate(steps)
+    for k in (0, 1, 7, 1000, 40000):
+        assert sequential_sum(value, step, k) == expected[k]
+    for threshold in (1500, 3000.05):
+        k = steps_to_reach(value, step, threshold)
+        assert expected[k] >= threshold and (k == 1 or expected[k - 1] < threshold)
+
+
+@pytest.mark.parametrize("lf, hours", [(0.6, 2500), (0.3, 5000), (0.8, 1875), (0.75, 2000),
+                                       (0.6, 2501)])
+def test_fleet_batch_matches_model_on_threshold_hour(lf, hours):
+    # Горизонт кончается на часе, в котором lf * k ровно равно порогу ТО (1500)
+    end = START + datetime.timedelta(hours=hours - 1)
+    rows = [[lf] * gtu_specs['кол-во'], [lf] + load_factors[1:]]
+    cost = GTESFleetBatch(gtu_specs).simulate(rows, START, end)
+    reference = [simulate(row, "loop", end)[0] for row in rows]
+    assert cost.tolist() == pytest.approx(reference, rel=1e-9)
+
+
+def test_fleet_batch_reuses_coupled_rows():
+    # Варианты с резервами (загрузка ниже 0.15) запоминаются целиком
+    end = START + datetime.timedelta(days=400)
+    coupled = [0.6, 0.1, 0.0] + [0.7] * (gtu_specs['кол-во'] - 3)
+    rows = [coupled, [0.5] * gtu_specs['кол-во'], coupled]
+    batch = GTESFleetBatch(gtu_specs, cache_size=4)
+    first = batch.simulate(rows, START, end)
+    assert (batch.row_hits, batch.row_misses) == (1, 1)
+    assert batch.simulate(rows[:1], START, end).tolist() == first[:1].tolist()
+    assert (batch.row_hits, batch.row_misses) == (2, 1)
+    assert first[0] == pytest.approx(simulate(coupled, "loop", end)[0], rel=1e-9)
+
+
+@pytest.mark.parametrize("engine", GTESModel.engines)
+def test_checkpoint_resume_matches_uninterrupted_run(engine, tmp_path):
+    # Расчет с остановкой посреди ТО и продолжением из файла совпадает с расчетом без остановки
+    end = START + datetime.timedelta(days=500)
+    middle = START + datetime.timedelta(hours=1550)  # ГТУ 7 на ТО
+    reference = simulate(RESERVE_HEAVY[:4] + load_factors[4:], engine, end)
+
+    path = tmp_path / "gtes.npz"
+    model = GTESModel(gtu_specs, RESERVE_HEAVY[:4] + load_factors[4:], engine=engine)
+    model.simulate(START, middle, checkpoint_path=path, checkpoint_hours=400)
+    restored = GTESModel.load_checkpoint(path)
+    assert restored.current_time == middle + datetime.timedelta(hours=1)
+    cost = restored.resume(end)
+    state = [(gtu.status_code, gtu.to_counter, gtu.kr_counter, gtu.total_run_hours,
+              gtu.run_hours, gtu.hours_since_kr) for gtu in restored.gtus]
+    reserves = (restored.hot_reserve and restored.hot_reserve.id,
+                restored.cold_reserve and restored.cold_reserve.id)
+    assert (cost, state, reserves) == reference
+
+
+def test_load_checkpoint_rejects_other_files(tmp_path):
+    path = tmp_path / "other.npz"
+    np.savez(path, values=np.arange(3))
+    with pytest.raises(ValueError):
+        GTESModel.load_checkpoint(path)
@@ -0,0 +1,31 @@
+import datetime
+import json
+
+from PowerPlantModel import GTESModel, gtu_specs, load_factors
+from Profiling import profile
+
+START = datetime.datetime(2024, 1, 1)
+END = START + datetime.timedelta(hours=2999)
+
+
+def test_profile_counts_phases_and_restores_methods(tmp_path):
+    original = GTESModel.step, GTESModel._pick_reserve
+    model = GTESModel(gtu_specs, load_factors)
+    reference = GTESModel(gtu_specs, load_factors).simulate(START, END)
+    path = tmp_path / "profile.json"
+
+    profiler = profile(model, START, END, path=path)
+    assert model.total_cost() == reference
+    assert (GTESModel.step, GTESModel._pick_reserve) == original
+    assert profiler.hours == 3000
+
+    report = json.loads(path.read_text(encoding="utf-8"))
+    assert report["model"] == "GTESModel" and report["engine"] == "loop"
+    phases = {phase["method"]: phase for phase in report["phases"]}
+    assert phases["GTESModel.step"]["calls"] == 3000
+    assert phases["GTESModel.step"]["calls_per_hour"] == 1
+    # Вывод в ТО/КР вызывается внутри step: его время не входит в собственное время step
+    step = phases["GTESModel.step"]
+    assert step["own_seconds"] <= step["seconds"]
+    assert phases["GTESModel.perform_maintenance"]["calls"] > 0
+    assert "GTESModel._simulate_numpy" not in phases
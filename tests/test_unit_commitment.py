@@ -0,0 +1,102 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from LineFromGrid import PowerGridModel, build_consumers
+from UnitCommitment import UnitCommitment, hourly_demand, maintenance_availability
+
+START = datetime.datetime(2024, 1, 1)
+
+# Две ГТУ по 10 МВт, ТО каждые 10 моточасов, пуск из холодного резерва - 1 час
+SMALL_SPECS = {
+    'мощность': 10,
+    'кол-во': 2,
+    'ТО_периодичность': 10,
+    'ТО_стоимость': 100,
+    'КР_периодичность': 1000,
+    'КР_стоимость': 1000,
+    'время_запуска_из_холодного_резерва': 1,
+}
+
+
+def planner(**kwargs):
+    params = dict(reserve=0, min_load=0.3, no_load_share=0.5, fuel_per_MWh=1, fuel_price=1,
+                  initial_online=1)
+    params.update(kwargs)
+    return UnitCommitment(SMALL_SPECS, **params)
+
+
+def test_solve_small_case_by_hand():
+    # Холостой ход включенной ГТУ 1 * 10 * 0.5 = 5 руб/ч, пуск - 1 час холостого хода = 5.
+    # Спрос 4 МВт покрывает только одна ГТУ (две дали бы загрузку 0.2 < 0.3), 12 МВт - две.
+    # Держать вторую ГТУ в горячем резерве в часы 1 и 3 - 5 руб/ч, пуск перед часом 2 - 5,
+    # поэтому вторая ГТУ запускается один раз и сразу останавливается: 5 + (5 + 10) + 5 = 25
+    schedule = planner().solve([4, 12, 4])
+    assert schedule.working.tolist() == [1, 2, 1]
+    assert schedule.hot_reserve.tolist() == [0, 0, 0]
+    assert schedule.load_factor.tolist() == [0.4, 0.6, 0.4]
+    costs = schedule.costs
+    assert costs["пуски"] == 1
+    # Холостой ход 4 ГТУ*ч * 5 + 20 МВт*ч * 0.5 + пуск 5
+    assert costs["топливо, м3"] == 35
+    # Износ: 2 моточаса * (100 / 10 + 1000 / 1000)
+    assert costs["износ (ТО/КР)"] == 22
+    assert costs["итого"] == pytest.approx(20 * 5.6 + 35 + 22)
+
+
+def test_reserve_keeps_second_unit_hot():
+    # Резерв в мощность одной ГТУ: вторая ГТУ все время на холостом ходу
+    schedule = planner(reserve=10).solve([4, 4])
+    assert schedule.working.tolist() == [1, 1]
+    assert schedule.hot_reserve.tolist() == [1, 1]
+
+
+def test_unavailable_units_make_hour_infeasible():
+    with pytest.raises(ValueError):
+        planner().solve([4, 12], available=[2, 1])
+
+
+def test_parameters_are_required():
+    with pytest.raises(ValueError, match="fuel_price"):
+        UnitCommitment(SMALL_SPECS, min_load=0.3, no_load_share=0.5, fuel_per_MWh=1)
+    specs = dict(SMALL_SPECS, **{'минимальная_загрузка': 0.3, 'доля_холостого_хода': 0.5,
+                                 'удельный_расход_топлива': 1, 'цена_топлива': 1})
+    assert UnitCommitment(specs).min_load == 0.3
+
+
+def test_availability_follows_maintenance_schedule():
+    # ГТУ 0 с загрузкой 1 набирает 10 моточасов к часу 9 и уходит на ТО на 72 часа,
+    # после возврата в час 81 снова набирает 10 моточасов к часу 91
+    end = START + datetime.timedelta(hours=99)
+    available = maintenance_availability(START, end, SMALL_SPECS, [1.0, 0.0])
+    expected = np.full(100, 2)
+    expected[9:81] = 1
+    expected[91:] = 1
+    assert available.tolist() == expected.tolist()
+
+
+def test_generation_needed_leaves_network_untouched():
+    consumers = build_consumers()
+    network = PowerGridModel(consumers)
+    demands = {consumer.name: consumer.calculate_power_demand(START) for consumer in consumers}
+    reference = network.calc_generation_needed(demands)
+    state = ([(line.power_loss, line.voltage_drop, line.total_power_loss)
+              for line in network.power_lines],
+             [consumer.total_power_consumption for consumer in consumers],
+             network.total_power_loss_kwh)
+    assert network.generation_needed(demands) == reference
+    assert ([(line.power_loss, line.voltage_drop, line.total_power_loss)
+             for line in network.power_lines],
+            [consumer.total_power_consumption for consumer in consumers],
+            network.total_power_loss_kwh) == state
+
+
+def test_hourly_demand_leaves_consumers_untouched():
+    consumers = build_consumers()
+    times, demand = hourly_demand(START, START + datetime.timedelta(days=40), consumers)
+    assert len(times) == len(demand) == 40 * 24 + 1
+    assert [consumer.total_power_consumption for consumer in consumers] == [0] * len(consumers)
+    reference = PowerGridModel(build_consumers()).generation_needed(
+        {consumer.name: consumer.calculate_power_demand(START) for consumer in consumers})
+    assert demand[0] == reference
@@ -0,0 +1,35 @@
+import networkx as nx
+import pytest
+
+import Visualization
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    Visualization._layouts.clear()
+    Visualization._views.clear()
+    yield
+    Visualization._layouts.clear()
+    Visualization._views.clear()
+
+
+def test_schematic_caches_are_bounded():
+    graphs = [nx.path_graph(n) for n in range(2, 3 + Visualization.SCHEMATIC_CACHE_SIZE)]
+    for G in graphs:
+        Visualization.schematic_layout(G)
+        Visualization.schematic_view(G)
+    assert len(Visualization._layouts) == Visualization.SCHEMATIC_CACHE_SIZE
+    assert len(Visualization._views) == Visualization.SCHEMATIC_CACHE_SIZE
+    # Вытеснена самая старая схема, последняя берётся из кэша
+    assert Visualization.topology_key(graphs[0]) not in Visualization._layouts
+    assert Visualization.schematic_view(graphs[-1]) is Visualization.schematic_view(graphs[-1])
+
+
+def test_schematic_layout_reuses_recent_topology():
+    first = nx.path_graph(3)
+    positions = Visualization.schematic_layout(first)
+    for n in range(4, 3 + Visualization.SCHEMATIC_CACHE_SIZE):
+        Visualization.schematic_layout(nx.path_graph(n))
+        # Повторное обращение продлевает жизнь записи
+        assert Visualization.schematic_layout(first) is positions
+    assert Visualization.schematic_layout(first) is positions